@@ -0,0 +1,158 @@
+"""Booking contention benchmark.
+
+Creates ``--slots`` schedule blocks in a scratch SQLite database and has
+``--contenders`` threads or processes race to book each one in turn, every
+contender holding its own connection. Reports booking attempts/sec and checks
+that every slot ended up with exactly one appointment.
+
+    python benchmarks/bench_booking_contention.py --contenders 8 --slots 200
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, create_engine, select
+
+from renova.credentials import Credential
+from renova.db import SQLITE_PRAGMAS, create_sqlite_engine
+from renova.main.client import ClientContext, SlotTakenError
+from renova.migrations import migrate
+from renova.models.appointments import Appointment, ScheduleBlock
+from renova.models.therapists import Therapist
+from renova.seed import SeedConfig, seed
+
+
+def setup(url: str, contenders: int, slots: int) -> list[int]:
+    engine = create_engine(url)
+    migrate(engine)
+    # One therapist and the contenders, who get client ids 1 to ``contenders``.
+    seed(
+        engine,
+        SeedConfig(
+            therapists=1,
+            clients=contenders,
+            weeks=0,
+            patient_files=0,
+            products=0,
+            receipts=0,
+        ),
+    )
+    with Session(engine) as session:
+        therapist_id = session.exec(select(Therapist.id)).one()
+        start = datetime(2025, 1, 6, 9)
+        session.execute(
+            insert(ScheduleBlock),
+            [
+                {
+                    "therapist_id": therapist_id,
+                    "start_datetime": start + timedelta(hours=i),
+                    "end_datetime": start + timedelta(hours=i + 1),
+                }
+                for i in range(slots)
+            ],
+        )
+        session.commit()
+        ids = session.exec(select(ScheduleBlock.id).order_by(ScheduleBlock.id)).all()
+    engine.dispose()
+    return list(ids)
+
+
+def contend(url: str, client_id: int, block_ids: list[int], barrier) -> Counter:
+    engine = create_sqlite_engine(url, pragmas=SQLITE_PRAGMAS)
+    outcomes: Counter = Counter()
+    with Session(engine) as session:
+        ctx = ClientContext(None, session, Credential(id=client_id, type="client"))
+        for block_id in block_ids:
+            schedule_block = ctx.get_schedule_block(block_id)
+            barrier.wait()
+            try:
+                ctx.book_appointment(schedule_block)
+                outcomes["booked"] += 1
+            except SlotTakenError:
+                outcomes["taken"] += 1
+    engine.dispose()
+    return outcomes
+
+
+def process_contender(url, client_id, block_ids, barrier, results):
+    results.put(contend(url, client_id, block_ids, barrier))
+
+
+def run(kind: str, url: str, contenders: int, block_ids: list[int]) -> Counter:
+    total: Counter = Counter()
+    if kind == "threads":
+        barrier = threading.Barrier(contenders)
+        lock = threading.Lock()
+
+        def worker(client_id: int):
+            outcomes = contend(url, client_id, block_ids, barrier)
+            with lock:
+                total.update(outcomes)
+
+        threads = [
+            threading.Thread(target=worker, args=(i + 1,)) for i in range(contenders)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return total
+
+    mp = multiprocessing.get_context("fork")
+    barrier = mp.Barrier(contenders)
+    results = mp.Queue()
+    processes = [
+        mp.Process(
+            target=process_contender, args=(url, i + 1, block_ids, barrier, results)
+        )
+        for i in range(contenders)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        total.update(results.get())
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contenders", type=int, default=8)
+    parser.add_argument("--slots", type=int, default=200)
+    args = parser.parse_args()
+
+    for kind in ("threads", "processes"):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/bench.db"
+            block_ids = setup(url, args.contenders, args.slots)
+            start = time.perf_counter()
+            outcomes = run(kind, url, args.contenders, block_ids)
+            elapsed = time.perf_counter() - start
+
+            engine = create_engine(url)
+            with Session(engine) as session:
+                per_slot = session.exec(
+                    select(func.count())
+                    .select_from(Appointment)
+                    .group_by(Appointment.schedule_block_id)
+                ).all()
+            engine.dispose()
+            assert outcomes["booked"] == len(per_slot) == args.slots, outcomes
+            assert set(per_slot) == {1}, per_slot
+            attempts = outcomes["booked"] + outcomes["taken"]
+            print(
+                f"{kind:<9} attempts/sec={attempts / elapsed:.0f}"
+                f" bookings/sec={outcomes['booked'] / elapsed:.0f}"
+                f" taken={outcomes['taken']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
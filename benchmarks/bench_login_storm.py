@@ -0,0 +1,119 @@
+"""Login storm benchmark.
+
+Drives the app in process through httpx while ``--concurrency`` clients log in
+as fast as they can, and measures logins/sec together with the latency of an
+unrelated page (``GET /login``) sampled during the storm.
+
+    python benchmarks/bench_login_storm.py --workers 0 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def storm(app, duration: float, concurrency: int) -> dict[str, float]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    cookies = {"csrftoken": "bench"}
+    headers = {"X-CSRF-Token": "bench"}
+    logins = 0
+    probes: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def login(client):
+        nonlocal logins
+        while time.perf_counter() < deadline:
+            response = await client.post(
+                "/login",
+                data={"email": "storm@example.com", "password": "some password"},
+                headers=headers,
+            )
+            if response.status_code in (200, 303):
+                logins += 1
+
+    async def probe(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/login")
+            probes.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", cookies=cookies
+    ) as client:
+        await asyncio.gather(
+            probe(client), *(login(client) for _ in range(concurrency))
+        )
+
+    return {
+        "logins_per_sec": logins / duration,
+        "probe_p50_ms": percentile(probes, 0.50) * 1000,
+        "probe_p99_ms": percentile(probes, 0.99) * 1000,
+        "probe_mean_ms": statistics.fmean(probes) * 1000 if probes else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        action="append",
+        help="hashing pool size to benchmark (0 hashes on the threadpool)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DB_URL", f"sqlite:///{tmp}/bench.db")
+
+        from renova.db import init_db, make_session
+        from renova.hashing import HASHING, hash_password
+        from renova.main import app
+        from renova.models.clients import Client
+
+        init_db()
+        with make_session() as session:
+            session.add(
+                Client(
+                    first_name="storm",
+                    last_name="client",
+                    date_of_birth=date(2000, 1, 1),
+                    gender="neutral",
+                    pronouns="they/them",
+                    email_address="storm@example.com",
+                    phone_number="(514) 999-9999",
+                    address="nowhere",
+                    hash=hash_password("some password"),
+                )
+            )
+            session.commit()
+
+        for workers in args.workers or [0, HASHING.workers]:
+            HASHING.shutdown()
+            HASHING.workers = workers
+            HASHING.pending = max(workers, 1) * 16 + args.concurrency
+            result = asyncio.run(storm(app, args.duration, args.concurrency))
+            print(
+                f"workers={workers:<3} "
+                + " ".join(f"{key}={value:.2f}" for key, value in result.items())
+            )
+        HASHING.shutdown()
+
+
+if __name__ == "__main__":
+    main()
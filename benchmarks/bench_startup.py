@@ -0,0 +1,108 @@
+"""Startup benchmark.
+
+Starts the server against an already migrated database and measures the time
+from launching the process to the first successful ``GET /login``. Compares
+plain uvicorn (templates compiled lazily on first use) with ``renova serve``,
+cold and with a populated template bytecode cache.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(command: list[str], port: int, env: dict[str, str]):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{command} exited with {process.returncode}")
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/login", timeout=1)
+                if response.status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = os.environ | {
+            "DB_URL": f"sqlite:///{tmp}/bench.db",
+            "DB_PROFILE": "production",
+        }
+        subprocess.run(
+            [sys.executable, "-c", "from renova.migrations import migrate; migrate()"],
+            env=env,
+            check=True,
+        )
+        cache = os.path.join(tmp, "templates")
+
+        def uvicorn(port: int) -> list[str]:
+            return [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                f"--port={port}",
+                "--log-level=warning",
+                "renova.main:app",
+            ]
+
+        def serve(port: int, template_cache: str) -> list[str]:
+            return [
+                sys.executable,
+                "-m",
+                "renova",
+                "serve",
+                f"--bind=127.0.0.1:{port}",
+                "--workers=1",
+                f"--template-cache={template_cache}",
+            ]
+
+        port = free_port()
+        time_to_first_request(serve(port, cache), port, env)  # fill the cache
+
+        modes = {
+            "uvicorn": lambda port, run: uvicorn(port),
+            "serve (cold)": lambda port, run: serve(port, f"{cache}-cold-{run}"),
+            "serve (warm)": lambda port, run: serve(port, cache),
+        }
+        for name, command in modes.items():
+            samples = []
+            for run in range(args.runs):
+                port = free_port()
+                samples.append(time_to_first_request(command(port, run), port, env))
+            print(
+                f"{name:<13} median={statistics.median(samples) * 1000:.0f}ms"
+                f" min={min(samples) * 1000:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Therapist search benchmark.
+
+Loads ``--therapists`` rows into a scratch SQLite database and compares the
+old ``LIKE '%search%'`` lookup with the FTS5 index for a set of typeahead
+prefixes.
+
+    python benchmarks/bench_therapist_search.py --therapists 100000
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlmodel import Session, col, create_engine, or_, select
+
+from renova.migrations import migrate
+from renova.models.therapists import StatusOfWork, Therapist, search_therapists
+
+SYLLABLES = (
+    "an ba be bo ca ce da de do el fa ga ge ha il jo ka la le li lo ma me mi mo"
+    " na ne no ol pa ra re ri ro sa se si ta te ti to va vi yo za"
+).split()
+SEARCHES = ["jo", "mar", "lema", "jo ma", "ka ri", "sanoli", "xyq", "q"]
+
+
+def like(search: str):
+    return (
+        select(Therapist)
+        .where(
+            or_(
+                col(Therapist.first_name).contains(search),
+                col(Therapist.last_name).contains(search),
+            )
+        )
+        .limit(10)
+    )
+
+
+def seed(session: Session, count: int, rng: random.Random) -> None:
+    def name() -> str:
+        return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).capitalize()
+
+    rows = [
+        {
+            "first_name": name(),
+            "last_name": name(),
+            "date_of_birth": date(1980, 1, 1),
+            "gender": "neutral",
+            "pronouns": "they/them",
+            "email_address": f"therapist{i}@example.com",
+            "phone_number": "(514) 999-9999",
+            "address": "nowhere",
+            "hash": "",
+            "license_number": str(i),
+            "hiring_date": date(2020, 1, 1),
+            "years_of_experience": rng.randint(0, 30),
+            "void_cheque": "",
+            "status_of_work": StatusOfWork.fulltime,
+        }
+        for i in range(count)
+    ]
+    session.execute(insert(Therapist), rows)
+    session.commit()
+
+
+def timed(session: Session, statement, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.exec(statement).all()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--therapists", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".db") as file:
+        engine = create_engine(f"sqlite:///{file.name}")
+        migrate(engine)
+        with Session(engine) as session:
+            start = time.perf_counter()
+            seed(session, args.therapists, random.Random(args.seed))
+            print(
+                f"seeded {args.therapists} therapists"
+                f" in {time.perf_counter() - start:.1f}s"
+            )
+            print(f"{'search':<10} {'like ms':>10} {'fts ms':>10}")
+            for search in SEARCHES:
+                print(
+                    f"{search!r:<10}"
+                    f" {timed(session, like(search), args.repeat):>10.2f}"
+                    f" {timed(session, search_therapists(search), args.repeat):>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
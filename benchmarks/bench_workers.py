@@ -0,0 +1,211 @@
+"""Worker scaling benchmark.
+
+Runs ``renova serve`` with each ``--workers`` count against a seeded scratch
+database and drives it over HTTP with ``--concurrency`` clients for
+``--duration`` seconds per route: the therapist dashboard, the booking page,
+and a book/unbook write loop in which every client owns one block. Reports
+requests/sec, p99 latency and every non-2xx status seen.
+
+    python benchmarks/bench_workers.py --workers 1 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import httpx
+import jwt
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(clients: int) -> tuple[int, list[int], list[int]]:
+    from sqlalchemy import insert
+    from sqlmodel import select
+
+    from renova.db import make_session
+    from renova.migrations import migrate
+    from renova.models.appointments import ScheduleBlock, start_of_week
+    from renova.models.clients import Client
+    from renova.models.therapists import StatusOfWork, Therapist
+
+    migrate()
+    with make_session() as session:
+        therapist = Therapist(
+            first_name="busy",
+            last_name="therapist",
+            date_of_birth=date(1980, 1, 1),
+            gender="neutral",
+            pronouns="they/them",
+            email_address="busy@example.com",
+            phone_number="(514) 999-9999",
+            address="nowhere",
+            license_number="nan",
+            hiring_date=date(2020, 1, 1),
+            years_of_experience=0,
+            void_cheque="",
+            status_of_work=StatusOfWork.fulltime,
+            hash="",
+        )
+        session.add(therapist)
+        session.flush()
+        week = datetime.combine(start_of_week(), datetime.min.time())
+        session.execute(
+            insert(ScheduleBlock),
+            [
+                {
+                    "therapist_id": therapist.id,
+                    "start_datetime": week + timedelta(days=day, hours=hour),
+                    "end_datetime": week + timedelta(days=day, hours=hour + 1),
+                }
+                for day in range(7)
+                for hour in range(9, 17)
+            ],
+        )
+        session.execute(
+            insert(Client),
+            [
+                {
+                    "first_name": "client",
+                    "last_name": str(i),
+                    "date_of_birth": date(2000, 1, 1),
+                    "gender": "neutral",
+                    "pronouns": "they/them",
+                    "email_address": f"client{i}@example.com",
+                    "phone_number": "(514) 999-9999",
+                    "address": "nowhere",
+                    "hash": "",
+                }
+                for i in range(clients)
+            ],
+        )
+        session.commit()
+        client_ids = session.exec(select(Client.id).order_by(Client.id)).all()
+        block_ids = session.exec(
+            select(ScheduleBlock.id).order_by(ScheduleBlock.id)
+        ).all()
+        return therapist.id, list(client_ids), list(block_ids)
+
+
+def cookies_for(id: int, type: str) -> dict[str, str]:
+    from renova.credentials import TOKEN_SECRET
+
+    token = jwt.encode({"id": id, "type": type}, key=TOKEN_SECRET, algorithm="HS256")
+    return {"credential": token, "csrftoken": "bench"}
+
+
+async def load(base: str, duration: float, requests) -> dict[str, float]:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def run(cookies, request):
+        async with httpx.AsyncClient(
+            base_url=base,
+            timeout=30,
+            cookies=cookies,
+            headers={"X-CSRF-Token": "bench"},
+        ) as client:
+            while time.perf_counter() < deadline:
+                for method, url in request:
+                    start = time.perf_counter()
+                    response = await client.request(
+                        method,
+                        url,
+                        data={"weekday": 0, "hour": 9} if method == "PUT" else None,
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] += 1
+
+    await asyncio.gather(*(run(cookies, request) for cookies, request in requests))
+    latencies.sort()
+    errors = {status: n for status, n in statuses.items() if not 200 <= status < 300}
+    return {
+        "req_per_sec": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, action="append")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    workers = args.workers or [1, os.cpu_count() or 1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["DB_PROFILE"] = "production"
+        therapist_id, client_ids, block_ids = seed(args.concurrency)
+        therapist = cookies_for(therapist_id, "therapist")
+        clients = [cookies_for(id, "client") for id in client_ids]
+        routes = {
+            "dashboard": [(therapist, [("GET", "/dashboard")])] * args.concurrency,
+            "booking": [
+                (cookies, [("GET", f"/booking/{therapist_id}")]) for cookies in clients
+            ],
+            "book+unbook": [
+                (
+                    cookies,
+                    [
+                        ("PUT", f"/appointments/{block_id}"),
+                        ("DELETE", f"/appointments/{block_id}?weekday=0&hour=9"),
+                    ],
+                )
+                for cookies, block_id in zip(clients, block_ids)
+            ],
+        }
+
+        print(f"{os.cpu_count()} CPUs, concurrency={args.concurrency}")
+        for count in workers:
+            port = free_port()
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "renova",
+                    "serve",
+                    f"--bind=127.0.0.1:{port}",
+                    f"--workers={count}",
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            base = f"http://127.0.0.1:{port}"
+            try:
+                while True:
+                    try:
+                        if httpx.get(f"{base}/login").status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        time.sleep(0.05)
+                for route, requests in routes.items():
+                    result = asyncio.run(load(base, args.duration, requests))
+                    print(
+                        f"workers={count:<3} {route:<12}"
+                        f" req/s={result['req_per_sec']:.0f}"
+                        f" p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms"
+                        f" errors={result['errors']}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
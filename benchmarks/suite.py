@@ -0,0 +1,439 @@
+"""Load benchmark suite for the hot routes.
+
+``run`` seeds a scratch database with ``--seed``-determined data, drives the
+ASGI app in process through httpx with ``--concurrency`` clients, and writes
+throughput and p50/p95/p99 latency per route to a JSON file. Every route is
+sent the same number of requests (a fixed fraction of it for the expensive
+ones), after ``--warmup`` unmeasured requests, so two runs do the same work.
+
+``compare`` reads two such files and flags every route whose latency rose, or
+whose throughput fell, by more than ``--threshold``; it exits with status 1 if
+any did.
+
+    python benchmarks/suite.py run --output before.json
+    python benchmarks/suite.py run --output after.json
+    python benchmarks/suite.py compare before.json after.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+import jwt
+
+SYLLABLES = (
+    "an ba be bo ca ce da de do el fa ga ge ha il jo ka la le li lo ma me mi mo"
+    " na ne no ol pa ra re ri ro sa se si ta te ti to va vi yo za"
+).split()
+PASSWORD = "some password"
+HOURS = range(9, 17)
+
+
+@dataclass
+class Data:
+    therapists: list[int]
+    clients: list[int]
+    owner: int
+    free_blocks: list[tuple[int, int, int]]  # id, weekday, hour
+
+
+@dataclass
+class Route:
+    name: str
+    user: str | None
+    request: Callable[[random.Random, Data], tuple[str, str, dict | None]]
+    share: float = 1.0
+
+
+ROUTES = [
+    Route("GET /home", "client", lambda rng, data: ("GET", "/home", None)),
+    Route("GET /booking", "client", lambda rng, data: ("GET", "/booking", None)),
+    Route(
+        "GET /booking/{id}",
+        "client",
+        lambda rng, data: ("GET", f"/booking/{rng.choice(data.therapists)}", None),
+    ),
+    Route(
+        "GET /search_therapists",
+        "client",
+        lambda rng, data: (
+            "GET",
+            f"/search_therapists?search={rng.choice(SYLLABLES)}",
+            None,
+        ),
+    ),
+    Route("GET /dashboard", "therapist", lambda rng, data: ("GET", "/dashboard", None)),
+    Route("PUT /appointments/{id}", "client", lambda rng, data: book(data)),
+    Route(
+        "POST /login",
+        None,
+        lambda rng, data: (
+            "POST",
+            "/login",
+            {
+                "email": f"client{rng.choice(data.clients)}@example.com",
+                "password": PASSWORD,
+            },
+        ),
+        share=0.2,
+    ),
+    Route(
+        "GET /admin/inventory_report",
+        "owner",
+        lambda rng, data: ("GET", "/admin/inventory_report", None),
+        share=0.1,
+    ),
+]
+
+
+def book(data: Data) -> tuple[str, str, dict]:
+    # Every request books a different free block, so none of them conflict.
+    block_id, weekday, hour = data.free_blocks.pop()
+    return "PUT", f"/appointments/{block_id}", {"weekday": weekday, "hour": hour}
+
+
+def seed(args, rng: random.Random) -> Data:
+    from sqlalchemy import insert
+    from sqlmodel import select
+
+    from renova.db import init_db, make_session
+    from renova.hashing import hash_password
+    from renova.models.appointments import Appointment, ScheduleBlock, start_of_week
+    from renova.models.clients import Client
+    from renova.models.products import InventoryProduct
+    from renova.models.therapists import StatusOfWork, Therapist
+    from renova.models.users import Owner
+
+    def name() -> str:
+        return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).capitalize()
+
+    person = {
+        "date_of_birth": date(1990, 1, 1),
+        "gender": "neutral",
+        "pronouns": "they/them",
+        "phone_number": "(514) 999-9999",
+        "address": "nowhere",
+    }
+    # One hash for everyone: seeding should not take minutes of argon2.
+    hash = hash_password(PASSWORD)
+
+    init_db()
+    with make_session() as session:
+        session.execute(
+            insert(Therapist),
+            [
+                person
+                | {
+                    "first_name": name(),
+                    "last_name": name(),
+                    "email_address": f"therapist{i}@example.com",
+                    "hash": hash,
+                    "license_number": str(i),
+                    "hiring_date": date(2020, 1, 1),
+                    "years_of_experience": rng.randint(0, 30),
+                    "void_cheque": "",
+                    "status_of_work": StatusOfWork.fulltime,
+                }
+                for i in range(args.therapists)
+            ],
+        )
+        session.execute(
+            insert(Client),
+            [
+                person
+                | {
+                    "first_name": name(),
+                    "last_name": name(),
+                    "email_address": f"client{i + 1}@example.com",
+                    "hash": hash,
+                }
+                for i in range(args.clients)
+            ],
+        )
+        owner = Owner(
+            **person,
+            first_name="own",
+            last_name="er",
+            email_address="owner@example.com",
+            hash=hash,
+        )
+        session.add(owner)
+        session.execute(
+            insert(InventoryProduct),
+            [
+                {
+                    "name": f"product {i:08}",
+                    "quantity": rng.randint(0, 500),
+                    "supplier": name(),
+                    "price": rng.randint(1, 10_000),
+                }
+                for i in range(args.products)
+            ],
+        )
+        therapist_ids = session.exec(select(Therapist.id).order_by(Therapist.id)).all()
+        client_ids = session.exec(select(Client.id).order_by(Client.id)).all()
+
+        week = datetime.combine(start_of_week(), datetime.min.time())
+        session.execute(
+            insert(ScheduleBlock),
+            [
+                {
+                    "therapist_id": therapist_id,
+                    "start_datetime": week + timedelta(weeks=w, days=d, hours=h),
+                    "end_datetime": week + timedelta(weeks=w, days=d, hours=h + 1),
+                }
+                for therapist_id in therapist_ids
+                for w in range(args.weeks)
+                for d in range(1, 6)
+                for h in HOURS
+            ],
+        )
+        blocks = session.exec(
+            select(ScheduleBlock.id, ScheduleBlock.start_datetime).order_by(
+                ScheduleBlock.id
+            )
+        ).all()
+        booked = rng.sample(
+            range(len(blocks)), min(len(blocks), args.clients * args.appointments)
+        )
+        session.execute(
+            insert(Appointment),
+            [
+                {
+                    "schedule_block_id": blocks[b].id,
+                    "client_id": client_ids[i % len(client_ids)],
+                }
+                for i, b in enumerate(booked)
+            ],
+        )
+        session.commit()
+        owner_id = owner.id
+
+    taken = set(booked)
+    free = [
+        (block.id, (block.start_datetime.weekday() + 1) % 7, block.start_datetime.hour)
+        for i, block in enumerate(blocks)
+        if i not in taken
+    ]
+    rng.shuffle(free)
+    needed = args.requests + args.warmup
+    if len(free) < needed:
+        raise SystemExit(f"only {len(free)} free blocks to book, need {needed}")
+    return Data(list(therapist_ids), list(client_ids), owner_id, free)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def drive(app, route: Route, data: Data, args, rng: random.Random) -> dict:
+    import httpx
+
+    from renova.credentials import TOKEN_SECRET
+
+    total = max(1, int(args.requests * route.share))
+    warmup = max(1, int(args.warmup * route.share))
+    requests = [route.request(rng, data) for _ in range(warmup + total)]
+    users = {"client": data.clients, "therapist": data.therapists}
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    transport = httpx.ASGITransport(app=app)
+
+    def client_for(user_id: int | None) -> httpx.AsyncClient:
+        cookies = {"csrftoken": "bench"}
+        if user_id is not None:
+            cookies["credential"] = jwt.encode(
+                {"id": user_id, "type": route.user}, TOKEN_SECRET, "HS256"
+            )
+        return httpx.AsyncClient(
+            transport=transport,
+            base_url="http://bench",
+            cookies=cookies,
+            headers={"X-CSRF-Token": "bench"},
+        )
+
+    async def worker(user_id: int | None, measured: bool):
+        async with client_for(user_id) as http:
+            while queue:
+                method, url, form = queue.pop()
+                start = time.perf_counter()
+                response = await http.request(method, url, data=form)
+                if measured:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] += 1
+
+    def user() -> int | None:
+        if route.user == "owner":
+            return data.owner
+        return rng.choice(users[route.user]) if route.user else None
+
+    queue = requests[total:]
+    await asyncio.gather(*(worker(user(), False) for _ in range(args.concurrency)))
+    queue = requests[:total]
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(user(), True) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "req_per_sec": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": {str(status): n for status, n in statuses.items() if status >= 400},
+    }
+
+
+async def drive_all(app, routes: list[Route], data: Data, args, rng) -> dict:
+    # One event loop for every route: the async engine's pooled connections
+    # belong to the loop that opened them.
+    results = {}
+    for route in routes:
+        result = results[route.name] = await drive(app, route, data, args, rng)
+        print(
+            f"{route.name:<28} req/s={result['req_per_sec']:8.1f}"
+            f" p50={result['p50_ms']:7.2f}ms p95={result['p95_ms']:7.2f}ms"
+            f" p99={result['p99_ms']:7.2f}ms errors={result['errors']}"
+        )
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> int:
+    rng = random.Random(args.seed)
+    selected = [r for r in ROUTES if not args.route or r.name in args.route]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_URL"] = f"sqlite:///{tmp}/bench.db"
+
+        from renova.hashing import HASHING
+        from renova.main import app
+
+        data = seed(args, rng)
+        try:
+            results = asyncio.run(drive_all(app, selected, data, args, rng))
+        finally:
+            HASHING.shutdown()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "func"},
+        },
+        "routes": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"wrote {args.output}")
+    return 1 if any(result["errors"] for result in results.values()) else 0
+
+
+# Metric name and whether a higher value is worse.
+COMPARED = [
+    ("req_per_sec", False),
+    ("p50_ms", True),
+    ("p95_ms", True),
+    ("p99_ms", True),
+]
+
+
+def compare(args) -> int:
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+    before_args, after_args = baseline["meta"]["args"], candidate["meta"]["args"]
+    for key in sorted(before_args.keys() & after_args.keys() - {"output", "route"}):
+        if before_args[key] != after_args[key]:
+            print(
+                f"warning: runs differ in --{key}: {before_args[key]} != {after_args[key]}"
+            )
+    baseline, candidate = baseline["routes"], candidate["routes"]
+
+    regressions = 0
+    for route in [route for route in baseline if route in candidate]:
+        before, after = baseline[route], candidate[route]
+        for metric, higher_is_worse in COMPARED:
+            change = after[metric] / before[metric] - 1 if before[metric] else 0.0
+            worse = (
+                change > args.threshold if higher_is_worse else -change > args.threshold
+            )
+            regressions += worse
+            print(
+                f"{'REGRESSED' if worse else 'ok':<10}{route:<28}{metric:<12}"
+                f"{before[metric]:10.2f} -> {after[metric]:10.2f} ({change:+.1%})"
+            )
+        if after["errors"] and not before["errors"]:
+            regressions += 1
+            print(f"{'REGRESSED':<10}{route:<28}{'errors':<12}{after['errors']}")
+    for route in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{'skipped':<10}{route} (only in one run)")
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark the routes")
+    run_parser.set_defaults(func=run)
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--therapists", type=int, default=200)
+    run_parser.add_argument("--clients", type=int, default=2000)
+    run_parser.add_argument("--weeks", type=int, default=4)
+    run_parser.add_argument(
+        "--appointments", type=int, default=5, help="booked appointments per client"
+    )
+    run_parser.add_argument("--products", type=int, default=10_000)
+    run_parser.add_argument("--requests", type=int, default=500)
+    run_parser.add_argument("--warmup", type=int, default=50)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument(
+        "--route",
+        action="append",
+        choices=[route.name for route in ROUTES],
+        help="only benchmark these routes",
+    )
+
+    compare_parser = commands.add_parser("compare", help="compare two runs")
+    compare_parser.set_defaults(func=compare)
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
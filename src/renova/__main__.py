@@ -0,0 +1,3 @@
+from renova.cli import main
+
+main()
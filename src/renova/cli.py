@@ -0,0 +1,62 @@
+import argparse
+import os
+
+from renova.db import ENGINE
+from renova.migrations import migrate
+from renova.models.rollups import rebuild_rollups
+
+
+def backfill_rollups(args: argparse.Namespace) -> None:
+    migrate()
+    with ENGINE.begin() as connection:
+        rebuild_rollups(connection)
+
+
+def serve(args: argparse.Namespace) -> None:
+    from renova.server import Server
+
+    Server(
+        template_cache=args.template_cache,
+        bind=args.bind,
+        workers=args.workers,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests // 10,
+        graceful_timeout=args.graceful_timeout,
+    ).run()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="renova")
+    commands = parser.add_subparsers(required=True)
+
+    backfill = commands.add_parser(
+        "backfill-rollups", help="rebuild the daily spend and stock rollup tables"
+    )
+    backfill.set_defaults(run=backfill_rollups)
+
+    server = commands.add_parser(
+        "serve", help="run the production server with pre-forked workers"
+    )
+    server.add_argument("--bind", default=os.getenv("BIND", "0.0.0.0:8080"))
+    server.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: $WEB_CONCURRENCY or the CPU count)",
+    )
+    server.add_argument(
+        "--max-requests",
+        type=int,
+        default=10000,
+        help="recycle a worker after this many requests, 0 to never recycle",
+    )
+    server.add_argument("--graceful-timeout", type=int, default=30)
+    server.add_argument(
+        "--template-cache",
+        default=os.getenv("RENOVA_TEMPLATE_CACHE"),
+        help="directory for compiled template bytecode",
+    )
+    server.set_defaults(run=serve)
+
+    args = parser.parse_args(argv)
+    args.run(args)
@@ -1,38 +1,110 @@
-from typing import Annotated
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, Request
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from renova.credentials import Credential, authenticate
-from renova.db import DBSession
+from renova.db import AsyncDBSession, DBSession, ReadDBSession
 from renova.models.clients import Client
 from renova.models.therapists import Therapist
 from renova.models.users import Owner, User
 
+USER_TYPES: dict[str, type[User]] = {
+    "therapist": Therapist,
+    "client": Client,
+    "owner": Owner,
+}
+
+
+class IdentityCache:
+    """Bounded LRU of user column snapshots shared across requests.
+
+    Entries are keyed by ``(credential.type, credential.id)`` and expire after
+    ``ttl`` seconds. A ``ttl`` of zero disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, int], tuple[float, dict[str, Any]]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: tuple[str, int]) -> dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: tuple[str, int], data: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: tuple[str, int]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+IDENTITY_CACHE = IdentityCache(
+    maxsize=int(os.getenv("RENOVA_IDENTITY_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("RENOVA_IDENTITY_CACHE_TTL", 0)),
+)
+
+
+def identity_key(user_type: type[User], id: int) -> tuple[str, int]:
+    return user_type.__name__.lower(), id
+
 
 class Context:
     def __init__(
-        self, request: Request, session: Session, credential: Credential | None
+        self,
+        request: Request,
+        session: Session,
+        credential: Credential | None,
+        read_session: Session | None = None,
     ):
         self.request = request
         self.session = session
+        self.read_session = read_session or session
         self.credential = credential
+        self._users: dict[tuple[str, int], User] = {}
 
     @property
     def user(self) -> User:
         credential = self.credential
         if credential is None:
             raise HTTPException(401, "unauthorized")
-
-        match self.credential:
-            case "therapist":
-                return self._get_user(Therapist, credential.id)
-            case "client":
-                return self._get_user(Client, credential.id)
-            case "owner":
-                return self._get_user(Owner, credential.id)
-            case _:
-                raise HTTPException(403, "forbidden")
+        if (user_type := USER_TYPES.get(credential.type)) is None:
+            raise HTTPException(403, "forbidden")
+        return self._get_user(user_type, credential.id)
 
     @property
     def owner(self) -> Owner:
@@ -59,31 +131,129 @@ class Context:
         return self._get_user(Client, self.credential.id)
 
     def _get_user[T: User](self, user_type: type[T], id: int) -> T:
-        try:
-            return self.session.exec(select(user_type).where(user_type.id == id)).one()
-        except Exception as e:
-            raise HTTPException(403, "forbidden") from e
+        # Users are read through the read session, so that a request only
+        # checks out the write connection once it writes. Write with their ids.
+        key = identity_key(user_type, id)
+        if (user := self._users.get(key)) is not None:
+            return user  # type: ignore[return-value]
+
+        if (data := IDENTITY_CACHE.get(key)) is not None:
+            cached = user_type(**data)
+            make_transient_to_detached(cached)
+            user = self.read_session.merge(cached, load=False)
+        else:
+            try:
+                user = self.read_session.exec(
+                    select(user_type).where(user_type.id == id)
+                ).one()
+            except Exception as e:
+                raise HTTPException(403, "forbidden") from e
+            IDENTITY_CACHE.put(key, user.model_dump())
+
+        self._users[key] = user
+        return user
+
+    def _invalidate_user(self, user: User) -> None:
+        if user.id is None:
+            return
+        IDENTITY_CACHE.invalidate(identity_key(type(user), user.id))
 
     @property
     def authenticated(self) -> bool:
         return self.credential is not None
 
 
+def check_type(credential: Credential, user_type: type[User]) -> None:
+    """Reject ``credential`` unless it is one for a ``user_type``: ids are only
+    unique within a type."""
+    if credential.type != identity_key(user_type, credential.id)[0]:
+        raise HTTPException(403, "forbidden")
+
+
 def get_context[C: Context](context_type: type[C], *, auth: type[User] | None | bool):
     def on_auth(
         request: Request,
         session: DBSession,
+        read_session: ReadDBSession,
         credential: Annotated[
             Credential | None, Depends(authenticate(required=bool(auth)))
         ],
     ) -> C:
-        ctx = context_type(request, session, credential)
+        ctx = context_type(request, session, credential, read_session)
         if (
             credential
             and isinstance(auth, type)
             and auth is not User
         ):
+            check_type(credential, auth)
             ctx._get_user(auth, credential.id)
         return ctx
 
     return on_auth
+
+
+class AsyncContext(Context):
+    """Context over an ``AsyncSession``.
+
+    Identity is resolved up front by ``get_async_context``, so the ``user``,
+    ``client``, ``therapist`` and ``owner`` properties never touch the database.
+    """
+
+    session: AsyncSession  # type: ignore[assignment]
+
+    def __init__(
+        self, request: Request, session: AsyncSession, credential: Credential | None
+    ):
+        super().__init__(request, session, credential)  # type: ignore[arg-type]
+
+    def _get_user[T: User](self, user_type: type[T], id: int) -> T:
+        if (user := self._users.get(identity_key(user_type, id))) is None:
+            raise HTTPException(403, "forbidden")
+        return user  # type: ignore[return-value]
+
+    async def _load_user[T: User](self, user_type: type[T], id: int) -> T:
+        key = identity_key(user_type, id)
+        if (user := self._users.get(key)) is not None:
+            return user  # type: ignore[return-value]
+
+        if (data := IDENTITY_CACHE.get(key)) is not None:
+            cached = user_type(**data)
+            make_transient_to_detached(cached)
+            user = await self.session.merge(cached, load=False)
+        else:
+            try:
+                user = (
+                    await self.session.exec(select(user_type).where(user_type.id == id))
+                ).one()
+            except Exception as e:
+                raise HTTPException(403, "forbidden") from e
+            IDENTITY_CACHE.put(key, user.model_dump())
+
+        self._users[key] = user
+        return user
+
+
+def get_async_context[C: AsyncContext](
+    context_type: type[C], *, auth: type[User] | None | bool
+):
+    async def on_auth(
+        request: Request,
+        session: AsyncDBSession,
+        credential: Annotated[
+            Credential | None, Depends(authenticate(required=bool(auth)))
+        ],
+    ) -> C:
+        ctx = context_type(request, session, credential)
+        if credential is None:
+            return ctx
+        if isinstance(auth, type) and auth is not User:
+            check_type(credential, auth)
+            await ctx._load_user(auth, credential.id)
+        if (user_type := USER_TYPES.get(credential.type)) is not None:
+            try:
+                await ctx._load_user(user_type, credential.id)
+            except HTTPException:
+                pass
+        return ctx
+
+    return on_auth
@@ -1,16 +1,117 @@
 import os
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from importlib import import_module
-from typing import Annotated
+from typing import Annotated, Any
 
 from fastapi import Depends
+from sqlalchemy import URL, Connection, Engine, event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-__all__ = ["make_session", "get_session", "init_db", "DBSession"]
+__all__ = [
+    "make_session",
+    "get_session",
+    "get_read_session",
+    "make_async_session",
+    "get_async_session",
+    "init_db",
+    "dispose_engines",
+    "upsert",
+    "DBSession",
+    "ReadDBSession",
+    "AsyncDBSession",
+]
+
+# The supported backends: writes rely on INSERT ... ON CONFLICT (see
+# ``upsert``), which MySQL does not have.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+# Connect-time PRAGMAs for the production storage profile. WAL lets readers
+# proceed while a write is in progress, and busy_timeout makes writers queue on
+# the database lock instead of failing immediately with "database is locked".
+SQLITE_PRAGMAS: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT", 5000)),
+    "temp_store": "MEMORY",
+}
+SQLITE_READER_PRAGMAS: dict[str, Any] = SQLITE_PRAGMAS | {"query_only": "ON"}
+
+
+def split_url(url: str | URL) -> tuple[URL, URL]:
+    """Return the sync and async URLs for ``url``, whichever driver it names."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() == ASYNC_DRIVERS.get(backend):
+        return url.set(drivername=backend), url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver known for {backend}")
+    return url, url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def upsert(bind: Session | Connection, model: type[SQLModel]):
+    """An ``INSERT`` into ``model`` supporting ``ON CONFLICT`` on ``bind``'s
+    dialect."""
+    dialect = (bind.get_bind() if isinstance(bind, Session) else bind).dialect.name
+    match dialect:
+        case "sqlite":
+            return sqlite.insert(model)
+        case "postgresql":
+            return postgresql.insert(model)
+        case _:
+            raise NotImplementedError(f"upserts are not supported on {dialect}")
+
+
+def set_pragmas(engine: Engine, pragmas: dict[str, Any]) -> Engine:
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
+
+
+def create_sqlite_engine(
+    url: str | URL, *, pragmas: dict[str, Any] = SQLITE_PRAGMAS, **kwargs
+) -> Engine:
+    return set_pragmas(create_engine(url, **kwargs), pragmas)
 
 
 DB_URL = os.getenv("DB_URL", "sqlite:////var/lib/renova/renova.db")
-ENGINE = create_engine(DB_URL, echo=bool(os.getenv("DEBUG", False)))
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+DB_READERS = int(os.getenv("DB_READERS", 8))
+ECHO = bool(os.getenv("DEBUG", False))
+SYNC_DB_URL, ASYNC_DB_URL = split_url(DB_URL)
+
+if DB_PROFILE == "production" and SYNC_DB_URL.get_backend_name() == "sqlite":
+    # SQLite allows a single writer at a time, so the write engine holds exactly
+    # one connection and everything read-only goes through the reader pool.
+    ENGINE = create_sqlite_engine(
+        SYNC_DB_URL, echo=ECHO, pool_size=1, max_overflow=0, pool_timeout=30
+    )
+    READ_ENGINE = create_sqlite_engine(
+        SYNC_DB_URL,
+        pragmas=SQLITE_READER_PRAGMAS,
+        echo=ECHO,
+        pool_size=DB_READERS,
+        max_overflow=0,
+    )
+    # Async sessions only read, like READ_ENGINE: a second pool of writers
+    # would contend with ENGINE for the database lock.
+    ASYNC_ENGINE = create_async_engine(
+        ASYNC_DB_URL, echo=ECHO, pool_size=DB_READERS, max_overflow=0
+    )
+    set_pragmas(ASYNC_ENGINE.sync_engine, SQLITE_READER_PRAGMAS)
+else:
+    ENGINE = create_engine(SYNC_DB_URL, echo=ECHO)
+    READ_ENGINE = ENGINE
+    ASYNC_ENGINE = create_async_engine(ASYNC_DB_URL, echo=ECHO)
 
 
 @contextmanager
@@ -24,9 +125,35 @@ def get_session():
         yield session
 
 
+def get_read_session(session: Annotated[Session, Depends(get_session)]):
+    if READ_ENGINE is ENGINE:
+        yield session
+        return
+    with Session(READ_ENGINE) as read_session:
+        yield read_session
+
+
+@asynccontextmanager
+async def make_async_session():
+    async with AsyncSession(ASYNC_ENGINE, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_session():
+    async with make_async_session() as session:
+        yield session
+
+
+def dispose_engines() -> None:
+    """Forget pooled connections without closing them, as a forked worker must."""
+    for engine in {ENGINE, READ_ENGINE, ASYNC_ENGINE.sync_engine}:
+        engine.dispose(close=False)
+
+
 def init_db():
-    import_module("renova.models")
-    SQLModel.metadata.create_all(ENGINE)
+    import_module("renova.migrations").migrate(ENGINE)
 
 
 DBSession = Annotated[Session, Depends(get_session)]
+ReadDBSession = Annotated[Session, Depends(get_read_session)]
+AsyncDBSession = Annotated[AsyncSession, Depends(get_async_session)]
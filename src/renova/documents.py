@@ -0,0 +1,109 @@
+"""Content-addressed storage of medical document files on local disk.
+
+A file is stored once, under the SHA-256 of its content, as
+``<root>/<first two hex digits>/<the rest>``; storing the same bytes again
+writes nothing new. Uploads are streamed: chunks are hashed as they arrive and
+written to a temporary file in the store, at most ``BUFFER_SIZE`` bytes held at
+a time, and the file is moved into place only once it is complete and synced.
+The database keeps the hash, size and MIME type, never the contents.
+
+Files are never deleted, since several documents may share one.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterable
+
+from starlette.concurrency import run_in_threadpool
+
+__all__ = [
+    "DocumentStore",
+    "DocumentTooLargeError",
+    "DOCUMENTS",
+    "INLINE_TYPES",
+    "StoredFile",
+]
+
+BUFFER_SIZE = 1024 * 1024
+# Types safe to display from our own origin; anything else is sent as a download.
+INLINE_TYPES = frozenset(
+    {"application/pdf", "image/png", "image/jpeg", "image/gif", "image/webp"}
+)
+HASH = re.compile(r"[0-9a-f]{64}")
+
+
+class DocumentTooLargeError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    content_hash: str
+    size: int
+
+
+class DocumentStore:
+    def __init__(self, root: Path | str, max_size: int):
+        self.root = Path(root)
+        self.max_size = max_size
+
+    def path(self, content_hash: str) -> Path:
+        if not HASH.fullmatch(content_hash):
+            raise ValueError(f"invalid content hash {content_hash!r}")
+        return self.root / content_hash[:2] / content_hash[2:]
+
+    async def put(self, chunks: AsyncIterable[bytes]) -> StoredFile:
+        """Store the concatenation of ``chunks``.
+
+        Raises ``DocumentTooLargeError`` as soon as more than ``max_size`` bytes
+        have arrived; nothing is stored then.
+        """
+        incoming = self.root / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=incoming)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(fd, "wb") as file:
+                buffer = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise DocumentTooLargeError(
+                            f"document is larger than {self.max_size} bytes"
+                        )
+                    digest.update(chunk)
+                    buffer += chunk
+                    if len(buffer) >= BUFFER_SIZE:
+                        await run_in_threadpool(file.write, buffer)
+                        buffer = bytearray()
+                await run_in_threadpool(write_and_sync, file, buffer)
+            stored = StoredFile(digest.hexdigest(), size)
+            path = self.path(stored.content_hash)
+            if path.exists():
+                os.unlink(name)
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(name, path)
+            return stored
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(name)
+            raise
+
+
+def write_and_sync(file, data: bytes) -> None:
+    file.write(data)
+    file.flush()
+    os.fsync(file.fileno())
+
+
+DOCUMENTS = DocumentStore(
+    os.getenv("RENOVA_DOCUMENT_DIR", "/var/lib/renova/documents"),
+    max_size=int(os.getenv("RENOVA_DOCUMENT_MAX_BYTES", 100 * 1024 * 1024)),
+)
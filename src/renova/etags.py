@@ -0,0 +1,42 @@
+import hashlib
+from pathlib import Path
+
+from fastapi import Request, Response
+
+from renova.__about__ import __version__
+
+TEMPLATES = Path(__file__).parent / "main" / "templates"
+
+
+def build_id(version: str = __version__, templates: Path = TEMPLATES) -> str:
+    """Short digest of the package version and every template's source."""
+    digest = hashlib.sha256(version.encode())
+    for path in sorted(templates.rglob("*.html")):
+        digest.update(str(path.relative_to(templates)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+# Part of every ETag, so that a deploy changing the pages invalidates them.
+BUILD = build_id()
+
+
+def make_etag(*parts: object) -> str:
+    return 'W/"' + "-".join(str(part) for part in (BUILD, *parts)) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether ``If-None-Match`` already names ``etag`` (weak comparison)."""
+    if (header := request.headers.get("If-None-Match")) is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    # Private and always revalidated: the pages are per user and cheap to check.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
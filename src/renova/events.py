@@ -0,0 +1,146 @@
+"""In-process pub/sub of schedule changes.
+
+Writes record the start times of the schedule cells they touch with
+``publish_on_commit``; once the session commits, those are published on the
+therapist's topic of ``EVENTS``. Subscribers are the dashboards' server-sent
+event streams, which re-render just those cells.
+
+Every subscription has a bounded queue. A subscriber that falls behind is not
+sent the backlog: its queue is dropped and it is told to refresh the whole
+grid instead, so a slow connection never holds more than ``queue_size``
+events. The number of subscriptions is bounded per topic and in total.
+
+The broker lives in one process. With several workers, a dashboard only hears
+of the writes served by its own worker as they happen; its stream checks the
+therapist's schedule version on every keep-alive and refreshes the whole grid
+when another worker has changed it.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from threading import Lock
+from typing import Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+__all__ = [
+    "Broker",
+    "BrokerFullError",
+    "EVENTS",
+    "REFRESH",
+    "Subscription",
+    "publish_on_commit",
+]
+
+# Published instead of a start time when every cell may have changed.
+REFRESH = None
+
+
+class BrokerFullError(RuntimeError):
+    pass
+
+
+class Subscription:
+    def __init__(self, topic: Hashable, queue_size: int):
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+        self._queue: asyncio.Queue[datetime | None] = asyncio.Queue(queue_size)
+
+    def _put(self, item: datetime | None) -> None:
+        # Runs on the subscriber's loop.
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> set[datetime | None]:
+        """Wait for changes and return all of those pending, coalesced.
+
+        Returns ``{REFRESH}`` if the queue overflowed since the last call.
+        """
+        items = {await self._queue.get()}
+        while not self._queue.empty():
+            items.add(self._queue.get_nowait())
+        if self.overflowed:
+            self.overflowed = False
+            return {REFRESH}
+        return items
+
+
+class Broker:
+    def __init__(self, max_subscribers: int, per_topic: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.per_topic = per_topic
+        self.queue_size = queue_size
+        self._topics: dict[Hashable, set[Subscription]] = {}
+        self._count = 0
+        self._lock = Lock()
+
+    def subscribe(self, topic: Hashable) -> Subscription:
+        """Subscribe to ``topic``; must be called from the subscriber's loop."""
+        with self._lock:
+            subscribers = self._topics.setdefault(topic, set())
+            if (
+                self._count >= self.max_subscribers
+                or len(subscribers) >= self.per_topic
+            ):
+                raise BrokerFullError(f"too many subscribers for {topic}")
+            subscription = Subscription(topic, self.queue_size)
+            subscribers.add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic, set())
+            if subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+            if not subscribers:
+                self._topics.pop(subscription.topic, None)
+
+    def publish(self, topic: Hashable, *items: datetime | None) -> None:
+        """Publish ``items`` to ``topic``; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            for item in items:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription._put, item)
+                except RuntimeError:  # the subscriber's loop has closed
+                    self.unsubscribe(subscription)
+                    break
+
+    def __len__(self) -> int:
+        return self._count
+
+
+EVENTS = Broker(
+    max_subscribers=int(os.getenv("RENOVA_SSE_MAX_SUBSCRIBERS", 1000)),
+    per_topic=int(os.getenv("RENOVA_SSE_MAX_PER_THERAPIST", 8)),
+    queue_size=int(os.getenv("RENOVA_SSE_QUEUE_SIZE", 64)),
+)
+
+
+def publish_on_commit(
+    session: Session, therapist_id: int | None, *starts: datetime | None
+) -> None:
+    """Publish changes to the cells at ``starts`` once ``session`` commits."""
+    if therapist_id is None:
+        return
+    pending = session.info.setdefault("schedule_events", {})
+    pending.setdefault(therapist_id, set()).update(starts)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session) -> None:
+    for therapist_id, starts in session.info.pop("schedule_events", {}).items():
+        EVENTS.publish(therapist_id, *starts)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session: Session, previous_transaction) -> None:
+    session.info.pop("schedule_events", None)
@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from threading import Lock
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+__all__ = ["HashingPool", "HASHING", "hash_password", "verify_password"]
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.hash(password)
+
+
+def verify_password(hash: str, password: str) -> tuple[bool, bool]:
+    """Return whether ``password`` matches ``hash`` and whether it needs a rehash."""
+    try:
+        password_hasher.verify(hash, password)
+    except (InvalidHashError, VerificationError):
+        return False, False
+    return True, password_hasher.check_needs_rehash(hash)
+
+
+class HashingPool:
+    """Process pool that keeps argon2 off the event loop and the shared threadpool.
+
+    At most ``workers`` hashes run at once and at most ``pending`` may be queued;
+    callers past that bound get a 503 instead of piling onto the queue. With
+    ``workers=0`` hashes run on Starlette's threadpool instead.
+    """
+
+    def __init__(self, workers: int, pending: int):
+        self.workers = workers
+        self.pending = pending
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._lock = Lock()
+
+    @property
+    def executor(self) -> Executor | None:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return self._executor
+
+    async def _submit[R](self, fn, *args) -> R:
+        with self._lock:
+            if self._in_flight >= self.pending:
+                raise HTTPException(
+                    503, "too many logins in progress", headers={"Retry-After": "1"}
+                )
+            self._in_flight += 1
+        try:
+            if (executor := self.executor) is None:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, fn, *args
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, hash: str, password: str) -> tuple[bool, bool]:
+        return await self._submit(verify_password, hash, password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+HASH_WORKERS = int(os.getenv("RENOVA_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+HASHING = HashingPool(
+    workers=HASH_WORKERS,
+    pending=int(os.getenv("RENOVA_HASH_PENDING", max(HASH_WORKERS, 1) * 16)),
+)
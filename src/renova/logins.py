@@ -1,42 +1,62 @@
 from argon2 import PasswordHasher
-from argon2.exceptions import InvalidHashError
 from fastapi import HTTPException
 from pydantic import EmailStr
 from sqlalchemy.exc import NoResultFound
 from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
 
 from renova.context import Context
+from renova.hashing import HASHING, password_hasher, verify_password
 from renova.models.users import User
 
 
 class LoginContext(Context):
-    password_hasher = PasswordHasher()
+    password_hasher: PasswordHasher = password_hasher
 
     def login[T: User](self, user_type: type[T], email: EmailStr, password) -> T:
+        user = self._find_user(user_type, email)
+        if not self.verify(user, password):
+            raise HTTPException(401, "wrong password")
+
+        return user
+
+    async def login_async[T: User](
+        self, user_type: type[T], email: EmailStr, password
+    ) -> T:
+        user = await run_in_threadpool(self._find_user, user_type, email)
+        if not await self.verify_async(user, password):
+            raise HTTPException(401, "wrong password")
+
+        return user
+
+    def _find_user[T: User](self, user_type: type[T], email: EmailStr) -> T:
         try:
-            user = self.session.exec(
+            return self.session.exec(
                 select(user_type).where(user_type.email_address == email)
             ).one()
         except NoResultFound as e:
             raise HTTPException(401, f"{user_type.__name__} {email} not found") from e
 
-        if not self.verify(user, password):
-            raise HTTPException(401, "wrong password")
-
-        return user
-
     def hash(self, password: str) -> str:
         return self.password_hasher.hash(password)
 
-    def verify(self, user: User, password: str) -> bool:
-        try:
-            self.password_hasher.verify(user.hash, password)
-        except InvalidHashError:
-            return False
+    async def hash_async(self, password: str) -> str:
+        return await HASHING.hash(password)
 
-        if self.password_hasher.check_needs_rehash(user.hash):
-            user.hash = self.hash(password)
-            self.session.add(user)
-            self.session.commit()
-
-        return True
+    def verify(self, user: User, password: str) -> bool:
+        valid, needs_rehash = verify_password(user.hash, password)
+        if valid and needs_rehash:
+            self._rehash(user, self.hash(password))
+        return valid
+
+    async def verify_async(self, user: User, password: str) -> bool:
+        valid, needs_rehash = await HASHING.verify(user.hash, password)
+        if valid and needs_rehash:
+            await run_in_threadpool(self._rehash, user, await self.hash_async(password))
+        return valid
+
+    def _rehash(self, user: User, hash: str) -> None:
+        user.hash = hash
+        self.session.add(user)
+        self.session.commit()
+        self._invalidate_user(user)
@@ -4,11 +4,15 @@ from typing import Annotated
 
 from fastapi import Depends, FastAPI, Request, Response
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from starlette.exceptions import HTTPException
 
 from renova.context import Context, get_context
 from renova.credentials import Credential, authenticate
-from renova.db import init_db
+from renova.hashing import HASHING
+from renova.metrics import MetricsMiddleware
+from renova.migrations import migrate
 from renova.redirects import redirect
 from renova.security import check_csrf
 
@@ -20,11 +24,13 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    migrate()
     yield
+    HASHING.shutdown()
 
 
 app = FastAPI(lifespan=lifespan, dependencies=[Depends(check_csrf)])
+app.add_middleware(MetricsMiddleware)
 app.include_router(therapist.router)
 app.include_router(client.router)
 app.include_router(admin.router)
@@ -33,6 +39,28 @@ app.include_router(login.router)
 app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
 
 
+@app.exception_handler(OperationalError)
+async def database_busy(request: Request, exc: OperationalError):
+    # Another process held the SQLite write lock for longer than busy_timeout.
+    # Nothing was written, so the client can safely try again.
+    if "database is locked" not in str(exc.orig):
+        raise exc
+    return busy(request)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_busy(request: Request, exc: PoolTimeoutError):
+    # No write connection came free within pool_timeout; nothing was written.
+    return busy(request)
+
+
+def busy(request: Request) -> Response:
+    logger.warning("database busy on %s %s", request.method, request.url.path)
+    return Response(
+        "database busy, try again", status_code=503, headers={"Retry-After": "1"}
+    )
+
+
 @app.get("/")
 def get_index(
     request: Request,
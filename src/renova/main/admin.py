@@ -1,25 +1,35 @@
 import csv
-from collections import defaultdict
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from enum import Enum
 from io import StringIO
-from typing import IO, Annotated
+from typing import Annotated, Callable, Iterator, Sequence
 
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import StreamingResponse
-from sqlalchemy import func
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import Result, Row, extract, func
 from sqlmodel import select
+from starlette.concurrency import iterate_in_threadpool
 
 from renova.context import Context, get_context
-from renova.credentials import authenticate
+from renova.main.fragments import FRAGMENTS
 from renova.main.templates import templates
+from renova.metrics import METRICS, counter
 from renova.models.products import InventoryProduct
-from renova.models.receipts import InventoryReceipt
+from renova.models.receipts import InventoryReceipt, InventoryReceiptItem
+from renova.models.rollups import DailySpend, DailyStock, add_to_rollup
 from renova.models.therapists import StatusOfWork, Therapist
+from renova.models.users import Owner
+
+
+class ExpenseGrouping(str, Enum):
+    product = "product"
+    supplier = "supplier"
+    month = "month"
 
 
 class OwnerContext(Context):
     def get_unconfirmed_therapists(self):
-        return self.session.exec(
+        return self.read_session.exec(
             select(Therapist).where(Therapist.status_of_work == StatusOfWork.pending)
         ).all()
 
@@ -27,6 +37,7 @@ class OwnerContext(Context):
         therapist.confirm(status)
         self.session.add(therapist)
         self.session.commit()
+        self._invalidate_user(therapist)
 
     def add_product(self, name: str, quantity: int, supplier: str, price: int):
         inventory_product = InventoryProduct(
@@ -43,59 +54,220 @@ class OwnerContext(Context):
         ).one()
         inventory_product.add(count)
         self.session.add(inventory_product)
+        add_to_rollup(self.session, DailyStock, date.today(), name, adjusted=count)
         self.session.commit()
 
-    def generate_inventory_report(self) -> IO[str]:
-        f = StringIO()
-        writer = csv.writer(f)
-        writer.writerows(
-            self.session.exec(
+    def record_receipt(
+        self, day: date, store_name: str, items: list[InventoryReceiptItem]
+    ) -> InventoryReceipt:
+        receipt = InventoryReceipt(date=day, store_name=store_name, items=items)
+        self.session.add(receipt)
+        for item in items:
+            add_to_rollup(
+                self.session,
+                DailySpend,
+                day,
+                item.name,
+                count=item.count,
+                spend=item.count * item.price,
+            )
+            add_to_rollup(self.session, DailyStock, day, item.name, received=item.count)
+        self.session.commit()
+        self.session.refresh(receipt)
+        return receipt
+
+    def get_daily_spend(
+        self, start_date: date, end_date: date, product_name: str | None = None
+    ) -> Sequence[Row[tuple[date, int, int]]]:
+        statement = select(
+            DailySpend.day, func.sum(DailySpend.count), func.sum(DailySpend.spend)
+        ).where(DailySpend.day >= start_date, DailySpend.day < end_date)
+        if product_name is not None:
+            statement = statement.where(DailySpend.product_name == product_name)
+        return self.read_session.exec(
+            statement.group_by(DailySpend.day).order_by(DailySpend.day)
+        ).all()
+
+    def get_stock_movements(
+        self, start_date: date, end_date: date, product_name: str | None = None
+    ) -> Sequence[DailyStock]:
+        statement = select(DailyStock).where(
+            DailyStock.day >= start_date, DailyStock.day < end_date
+        )
+        if product_name is not None:
+            statement = statement.where(DailyStock.product_name == product_name)
+        return self.read_session.exec(
+            statement.order_by(DailyStock.day, DailyStock.product_name)
+        ).all()
+
+    def generate_inventory_report(self, chunk_size: int = 1000) -> Iterator[bytes]:
+        yield from csv_chunks(
+            self.read_session.exec(
                 select(
                     InventoryProduct.name,
                     func.sum(InventoryProduct.quantity),
-                ).group_by(InventoryProduct.name)
-            ).all()
-        )
-        return f
-
-    def generate_expense_report(self, start_date: date, end_date: date) -> IO[str]:
-        receipts = self.session.exec(
-            select(InventoryReceipt).where(
-                start_date <= InventoryReceipt.date and InventoryReceipt.date < end_date
+                )
+                .group_by(InventoryProduct.name)
+                .execution_options(yield_per=chunk_size)
             )
-        ).all()
-        expenses = defaultdict(lambda: 0)
-        for receipt in receipts:
-            for item in receipt.items:
-                expenses[item.name] += item.count * item.price
+        )
 
-        f = StringIO()
-        csv.writer(f).writerows(expenses.items())
-        return f
+    def generate_expense_report(
+        self,
+        start_date: date,
+        end_date: date,
+        group_by: ExpenseGrouping = ExpenseGrouping.product,
+        chunk_size: int = 1000,
+    ) -> Iterator[bytes]:
+        # Months are grouped on year and month, which every backend can
+        # extract, and only formatted as YYYY-MM here.
+        keys = {
+            ExpenseGrouping.product: [InventoryReceiptItem.name],
+            ExpenseGrouping.supplier: [InventoryReceiptItem.supplier_name],
+            ExpenseGrouping.month: [
+                extract("year", InventoryReceipt.date),
+                extract("month", InventoryReceipt.date),
+            ],
+        }[group_by]
+        yield from csv_chunks(
+            self.read_session.exec(
+                select(
+                    *keys,
+                    func.sum(InventoryReceiptItem.count * InventoryReceiptItem.price),
+                )
+                .select_from(InventoryReceiptItem)
+                .join(InventoryReceipt)
+                .where(
+                    InventoryReceipt.date >= start_date,
+                    InventoryReceipt.date < end_date,
+                )
+                .group_by(*keys)
+                .order_by(*keys)
+                .execution_options(yield_per=chunk_size)
+            ),
+            month_row if group_by == ExpenseGrouping.month else tuple,
+        )
 
 
-router = APIRouter(prefix="/admin")
+def month_row(row: Row) -> tuple:
+    year, month, total = row
+    return f"{int(year):04}-{int(month):02}", total
 
 
-@router.get("", dependencies=[Depends(authenticate(required=True))])
-def get_admin_dashboard(
-    request: Request,
-):
-    return templates.TemplateResponse(request, "pages/admin.html")
+def csv_chunks(
+    rows: Result, format_row: Callable[[Row], Sequence] = tuple
+) -> Iterator[bytes]:
+    """Encode ``rows``, each passed through ``format_row``, as CSV, one chunk per
+    ``yield_per`` partition."""
+    f = StringIO()
+    writer = csv.writer(f)
+    for partition in rows.partitions():
+        writer.writerows(map(format_row, partition))
+        yield f.getvalue().encode()
+        f.seek(0)
+        f.truncate()
 
 
-@router.get("/inventory_report")
-def get_report(
-    ctx: Annotated[OwnerContext, Depends(get_context(OwnerContext, auth=True))],
-):
-    def stream():
-        with ctx.generate_inventory_report() as f:
-            yield from f
+def csv_download(content: Iterator[bytes], name: str) -> StreamingResponse:
+    async def stream():
+        async for chunk in iterate_in_threadpool(content):
+            yield chunk
 
     return StreamingResponse(
         content=stream(),
         media_type="text/csv",
         headers={
-            "Content-Disposition": f"attachment; filename={datetime.now().isoformat(sep="T", timespec="seconds")}.csv"
+            "Content-Disposition": f"attachment; filename={name}-{datetime.now().isoformat(sep="T", timespec="seconds")}.csv"
+        },
+    )
+
+
+OwnerCTX = Annotated[OwnerContext, Depends(get_context(OwnerContext, auth=Owner))]
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("")
+def get_admin_dashboard(ctx: OwnerCTX):
+    today = date.today()
+    return templates.TemplateResponse(
+        ctx.request,
+        "pages/admin.html",
+        context={
+            "authenticated": ctx.authenticated,
+            "start_date": today - timedelta(days=30),
+            "end_date": today + timedelta(days=1),
+        },
+    )
+
+
+@router.get("/daily_spend")
+def get_daily_spend(
+    ctx: OwnerCTX,
+    start_date: date,
+    end_date: date,
+    product_name: str | None = None,
+):
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/rollup_table.html",
+        context={
+            "columns": ["day", "units", "spend"],
+            "rows": ctx.get_daily_spend(start_date, end_date, product_name),
+        },
+    )
+
+
+@router.get("/stock_movements")
+def get_stock_movements(
+    ctx: OwnerCTX,
+    start_date: date,
+    end_date: date,
+    product_name: str | None = None,
+):
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/rollup_table.html",
+        context={
+            "columns": ["day", "product", "received", "adjusted"],
+            "rows": [
+                (m.day, m.product_name, m.received, m.adjusted)
+                for m in ctx.get_stock_movements(start_date, end_date, product_name)
+            ],
         },
     )
+
+
+@router.get("/inventory_report")
+async def get_report(ctx: OwnerCTX):
+    return csv_download(ctx.generate_inventory_report(), "inventory")
+
+
+@router.get("/expense_report")
+async def get_expense_report(
+    ctx: OwnerCTX,
+    start_date: date,
+    end_date: date,
+    group_by: ExpenseGrouping = ExpenseGrouping.product,
+):
+    return csv_download(
+        ctx.generate_expense_report(start_date, end_date, group_by), "expenses"
+    )
+
+
+@router.get("/metrics")
+def get_metrics(ctx: OwnerCTX):
+    body = (
+        METRICS.render()
+        + counter(
+            "renova_fragment_cache_hits_total",
+            "Schedule cells served from the fragment cache.",
+            FRAGMENTS.hits,
+        )
+        + counter(
+            "renova_fragment_cache_misses_total",
+            "Schedule cells rendered on a fragment cache miss.",
+            FRAGMENTS.misses,
+        )
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -1,19 +1,50 @@
 from datetime import date, datetime, timedelta
-from typing import Annotated, Sequence
+from typing import Annotated, Literal, Sequence
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse
+from sqlalchemy import exists, insert, literal
 from sqlmodel import col, or_, select
 
-from renova.context import Context, get_context
-from renova.models.appointments import Appointment, ScheduleBlock
+from renova.context import AsyncContext, Context, get_async_context, get_context
+from renova.db import upsert
+from renova.etags import cache_headers, etag_matches, make_etag, not_modified
+from renova.events import publish_on_commit
+from renova.models.appointments import (
+    Appointment,
+    AppointmentPage,
+    AppointmentStatus,
+    AvailabilityRule,
+    Schedule,
+    ScheduleBlock,
+    parse_page_key,
+    start_of_week,
+)
 from renova.models.clients import Client
-from renova.models.therapists import Therapist
+from renova.models.therapists import (
+    Therapist,
+    bump_schedule_version,
+    match_expression,
+    search_therapists,
+)
 
+from .fragments import invalidate_blocks
 from .templates import templates
 
 router = APIRouter()
 
 
+HOME_PAGE_SIZE = 12
+
+
+class SlotTakenError(ValueError):
+    pass
+
+
+class SlotInPastError(ValueError):
+    pass
+
+
 class ClientContext(Context):
     def get_therapist(self, therapist_id: int) -> Therapist | None:
         return self.session.get(Therapist, therapist_id)
@@ -26,43 +57,113 @@ class ClientContext(Context):
         return [b for b in therapist.schedule if b.appointment is None]
 
     def find_therapists(self, search: str) -> Sequence[Therapist]:
-        if not search:
-            therapists = self.session.exec(select(Therapist).limit(10)).all()
-        else:
-            therapists = self.session.exec(
-                select(Therapist)
-                .where(
-                    or_(
-                        col(Therapist.first_name).contains(search),
-                        col(Therapist.last_name).contains(search),
-                    ),
-                )
-                .limit(10)
-            ).all()
-        print(therapists)
-        return therapists
+        if not search.strip():
+            return self.read_session.exec(select(Therapist).limit(10)).all()
+        if not match_expression(search):
+            # Nothing searchable, such as only punctuation: nothing matches.
+            return []
+        if self.read_session.get_bind().dialect.name == "sqlite":
+            return self.read_session.exec(search_therapists(search)).all()
+        return self.read_session.exec(
+            select(Therapist)
+            .where(
+                or_(
+                    col(Therapist.first_name).contains(search),
+                    col(Therapist.last_name).contains(search),
+                ),
+            )
+            .limit(10)
+        ).all()
 
     def get_schedule_block(self, schedule_block_id: int) -> ScheduleBlock | None:
         return self.session.get(ScheduleBlock, schedule_block_id)
 
     def book_appointment(self, schedule_block: ScheduleBlock) -> Appointment:
-        if schedule_block.appointment is not None:
-            raise ValueError(f"schedule block {schedule_block.id} is already book")
-        appointment = Appointment(schedule_block=schedule_block, client=self.client)
-        self.session.add(appointment)
+        """Book ``schedule_block`` with a single conditional insert.
+
+        Raises ``SlotTakenError`` when the block already has an appointment,
+        including one committed by a concurrent request.
+        """
+        booked = self.session.execute(
+            upsert(self.session, Appointment)
+            .values(
+                schedule_block_id=schedule_block.id,
+                client_id=self.client.id,
+                appointment_status=AppointmentStatus.pending,
+            )
+            .on_conflict_do_nothing(index_elements=["schedule_block_id"])
+        ).rowcount
+        if not booked:
+            error = SlotTakenError(
+                f"schedule block {schedule_block.id} is already booked"
+            )
+            # Also undoes whatever the caller wrote towards this booking.
+            self.session.rollback()
+            raise error
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(
+            self.session,
+            schedule_block.therapist_id,
+            schedule_block.start_datetime,
+        )
         self.session.commit()
-        self.session.refresh(self.client)
-        self.session.refresh(appointment)
         self.session.refresh(schedule_block)
-        return appointment
+        return schedule_block.appointment
+
+    def book_slot(self, therapist: Therapist, start: datetime) -> ScheduleBlock:
+        """Book the free slot at ``start`` that ``therapist``'s rules offer.
 
-    def get_appointments(self) -> list[Appointment]:
-        return self.client.appointments
+        The slot's ``ScheduleBlock`` is written here, unless the therapist
+        already created it by hand; it is rolled back with the booking if the
+        slot turns out to be taken.
+        """
+        if start < datetime.now():
+            raise SlotInPastError(f"cannot book a slot in the past: {start}")
+        rules = self.session.exec(
+            AvailabilityRule.query(
+                therapist.id, start.date(), start.date() + timedelta(days=1)
+            )
+        )
+        if not any(rule.covers(start) for rule in rules):
+            raise IndexError(f"therapist {therapist.id} is not available at {start}")
+        columns = ScheduleBlock.__table__.c
+        self.session.execute(
+            insert(ScheduleBlock).from_select(
+                ["therapist_id", "start_datetime", "end_datetime"],
+                select(
+                    literal(therapist.id, columns.therapist_id.type),
+                    literal(start, columns.start_datetime.type),
+                    literal(start + timedelta(hours=1), columns.end_datetime.type),
+                ).where(
+                    ~exists().where(
+                        columns.therapist_id == therapist.id,
+                        columns.start_datetime == start,
+                    )
+                ),
+            )
+        )
+        schedule_block = self.session.exec(
+            select(ScheduleBlock).where(
+                ScheduleBlock.therapist_id == therapist.id,
+                ScheduleBlock.start_datetime == start,
+            )
+        ).one()
+        self.book_appointment(schedule_block)
+        return schedule_block
 
     def cancel_appointment(self, appointment: Appointment) -> None:
         schedule_block = appointment.schedule_block
         appointment.cancel()
         self.session.add(appointment)
+        invalidate_blocks(self.session, appointment.schedule_block_id)
+        if schedule_block is not None:
+            bump_schedule_version(self.session, schedule_block.therapist_id)
+            publish_on_commit(
+                self.session,
+                schedule_block.therapist_id,
+                schedule_block.start_datetime,
+            )
         self.session.commit()
         self.session.refresh(schedule_block)
         if schedule_block is not None:
@@ -70,70 +171,107 @@ class ClientContext(Context):
 
     def delete_appointment(self, schedule_block: ScheduleBlock) -> None:
         self.session.delete(schedule_block.appointment)
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(
+            self.session, schedule_block.therapist_id, schedule_block.start_datetime
+        )
         self.session.commit()
         self.session.refresh(schedule_block)
-        self.session.refresh(self.client)
 
     def get_start_of_week(self, day: date | None = None) -> date:
-        today = day or date.today()
-        return today - timedelta((today.weekday() + 1) % 7)
+        return start_of_week(day)
 
     def get_blocks(
-        self, therapist: Therapist, day: date | None = None
-    ) -> list[list[ScheduleBlock | None]]:
-        start_of_week = datetime.combine(
-            self.get_start_of_week(day), datetime.min.time()
+        self, therapist: Therapist, day: date | None = None, weeks: int = 1
+    ) -> Schedule:
+        return Schedule.load(self.read_session, therapist.id, day, weeks)
+
+
+class AsyncClientContext(AsyncContext):
+    async def get_therapist(self, therapist_id: int) -> Therapist | None:
+        return await self.session.get(Therapist, therapist_id)
+
+    async def get_appointment_page(
+        self,
+        upcoming: bool,
+        after: tuple[datetime, int] | None = None,
+        size: int = HOME_PAGE_SIZE,
+    ) -> AppointmentPage:
+        """One page of the client's upcoming appointments, soonest first, or
+        past ones, latest first, in one query."""
+        now = datetime.now()
+        statement = Appointment.query(
+            client_id=self.client.id,
+            start=now if upcoming else None,
+            end=None if upcoming else now,
+            latest_first=not upcoming,
+            after=after,
         )
-        blocks: list[list[ScheduleBlock | None]] = [
-            [None for _ in range(24)] for _ in range(7)
-        ]
-        for block in self.session.exec(
-            select(ScheduleBlock).where(
-                ScheduleBlock.therapist_id == therapist.id,
-                ScheduleBlock.start_datetime > start_of_week,
-                ScheduleBlock.end_datetime < start_of_week + timedelta(weeks=1),
-            )
-        ).all():
-            blocks[(block.start_datetime.weekday() + 1) % 7][
-                block.start_datetime.hour
-            ] = block
-        return blocks
+        appointments = (await self.session.exec(statement.limit(size + 1))).all()
+        return AppointmentPage.of(appointments, size, latest_first=not upcoming)
+
+    def get_start_of_week(self, day: date | None = None) -> date:
+        return start_of_week(day)
+
+    async def get_blocks(
+        self, therapist: Therapist, day: date | None = None, weeks: int = 1
+    ) -> Schedule:
+        return await Schedule.load_async(self.session, therapist.id, day, weeks)
 
 
 ClientCTX = Annotated[ClientContext, Depends(get_context(ClientContext, auth=Client))]
+AsyncClientCTX = Annotated[
+    AsyncClientContext, Depends(get_async_context(AsyncClientContext, auth=Client))
+]
 
 
 @router.get("/home")
-def get_home_page(ctx: Annotated[Context, Depends(get_context(Context, auth=Client))]):
-    print(ctx.client.appointments)
+async def get_home_page(ctx: AsyncClientCTX):
     return templates.TemplateResponse(
         ctx.request,
         "pages/home.html",
         context={
             "authenticated": ctx.authenticated,
-            "appointments": ctx.client.appointments,
+            "upcoming": await ctx.get_appointment_page(upcoming=True),
+            "past": await ctx.get_appointment_page(upcoming=False),
             "user": ctx.client,
         },
     )
 
 
+@router.get("/home/appointments")
+async def get_home_appointments(
+    ctx: AsyncClientCTX,
+    when: Literal["upcoming", "past"],
+    after: str | None = None,
+):
+    try:
+        key = None if after is None else parse_page_key(after)
+    except ValueError as e:
+        raise HTTPException(400, f"invalid page key {after!r}") from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/appointment_page.html",
+        context={"page": await ctx.get_appointment_page(when == "upcoming", key)},
+    )
+
+
 @router.delete("/home/appointments/{schedule_block_id}")
 def delete_appointment_from_home(
     ctx: ClientCTX,
     schedule_block_id: int,
 ):
-    if (schedule_block := ctx.get_schedule_block(schedule_block_id)) is None:
-        raise HTTPException(404, f"schedule block {schedule_block} not found")
+    schedule_block = ctx.get_schedule_block(schedule_block_id)
+    if (
+        schedule_block is None
+        or schedule_block.appointment is None
+        or schedule_block.appointment.client_id != ctx.client.id
+    ):
+        raise HTTPException(404, f"appointment {schedule_block_id} not found")
     ctx.delete_appointment(schedule_block)
-    return templates.TemplateResponse(
-        ctx.request,
-        "components/appointment_list.html",
-        context={
-            "authenticated": ctx.authenticated,
-            "appointments": ctx.client.appointments,
-            "user": ctx.client,
-        },
-    )
+    # The button swaps its item out with this empty response.
+    return HTMLResponse("")
 
 
 @router.get("/booking")
@@ -160,10 +298,21 @@ def get_search_therapists(ctx: ClientCTX, search: str):
 
 
 @router.get("/booking/{therapist_id}")
-def get_booking_schedule_page(ctx: ClientCTX, therapist_id: int):
-    if (therapist := ctx.get_therapist(therapist_id)) is None:
+async def get_booking_schedule_page(ctx: AsyncClientCTX, therapist_id: int):
+    if (therapist := await ctx.get_therapist(therapist_id)) is None:
         raise HTTPException(404, f"therapist {therapist_id} not found")
     start_of_week = ctx.get_start_of_week()
+    # The page shows which booked slots are the viewer's own, so it is per
+    # client as well as per therapist and week.
+    etag = make_etag(
+        "booking",
+        therapist.id,
+        therapist.schedule_version,
+        start_of_week.isoformat(),
+        ctx.client.id,
+    )
+    if etag_matches(ctx.request, etag):
+        return not_modified(etag)
     return templates.TemplateResponse(
         ctx.request,
         "pages/booking_schedule.html",
@@ -172,10 +321,11 @@ def get_booking_schedule_page(ctx: ClientCTX, therapist_id: int):
             "client": ctx.client,
             "therapist": therapist,
             "date": start_of_week,
-            "blocks": ctx.get_blocks(therapist, start_of_week),
+            "blocks": await ctx.get_blocks(therapist, start_of_week),
             "ctx": ctx,
             "scheduling": True,
         },
+        headers=cache_headers(etag),
     )
 
 
@@ -190,6 +340,39 @@ def put_appointments(
         raise HTTPException(404, f"schedule block {schedule_block} not found")
     try:
         ctx.book_appointment(schedule_block)
+    except SlotTakenError as e:
+        raise HTTPException(409, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/appointment_block.html",
+        context={
+            "schedule_block": schedule_block,
+            "weekday": weekday,
+            "ctx": ctx,
+            "hour": hour,
+            "scheduling": True,
+        },
+    )
+
+
+@router.post("/booking/{therapist_id}/slots")
+def post_booking_slot(
+    ctx: ClientCTX,
+    therapist_id: int,
+    start: Annotated[datetime, Form()],
+    weekday: Annotated[int, Form()],
+    hour: Annotated[int, Form()],
+):
+    if (therapist := ctx.get_therapist(therapist_id)) is None:
+        raise HTTPException(404, f"therapist {therapist_id} not found")
+    try:
+        schedule_block = ctx.book_slot(therapist, start)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except SlotTakenError as e:
+        raise HTTPException(409, str(e)) from e
+    except SlotInPastError as e:
+        raise HTTPException(422, str(e)) from e
     except ValueError as e:
         raise HTTPException(403) from e
     return templates.TemplateResponse(
@@ -0,0 +1,155 @@
+"""Rendered-fragment cache for schedule grid cells.
+
+A week grid includes the same cell template 56 times, and most cells do not
+change between renders. ``cell`` renders one of them through ``FRAGMENTS``,
+keyed by the template, the block's id and ``version``, the viewer's role and
+the cell's position. Context write methods call ``invalidate_blocks``, which
+bumps the version in the database (so other workers miss too) and drops the
+local entries.
+"""
+
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Iterable
+
+from jinja2 import Environment, pass_environment
+from markupsafe import Markup
+from sqlalchemy import update
+from sqlmodel import Session, col
+
+from renova.models.appointments import ScheduleBlock
+
+__all__ = ["FragmentCache", "FRAGMENTS", "cell", "invalidate_blocks"]
+
+
+class FragmentCache:
+    """Bounded LRU of rendered fragments, indexed by schedule block id."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[Hashable, ...], tuple[int | None, str]] = (
+            OrderedDict()
+        )
+        self._by_block: dict[int, set[tuple[Hashable, ...]]] = {}
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: tuple[Hashable, ...]) -> str | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple[Hashable, ...], block_id: int | None, html: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (block_id, html)
+            self._entries.move_to_end(key)
+            if block_id is not None:
+                self._by_block.setdefault(block_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._forget(*self._entries.popitem(last=False))
+
+    def invalidate(self, block_ids: Iterable[int]) -> None:
+        with self._lock:
+            for block_id in block_ids:
+                for key in self._by_block.pop(block_id, ()):
+                    self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_block.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _forget(self, key: tuple[Hashable, ...], entry: tuple[int | None, str]):
+        block_id = entry[0]
+        if block_id is not None and (keys := self._by_block.get(block_id)):
+            keys.discard(key)
+            if not keys:
+                del self._by_block[block_id]
+
+
+FRAGMENTS = FragmentCache(maxsize=int(os.getenv("RENOVA_FRAGMENT_CACHE_SIZE", 4096)))
+
+
+def role_of(role: str, schedule_block: ScheduleBlock | None, ctx: Any) -> str:
+    """Refine ``role`` by whatever about the viewer changes the cell's markup."""
+    if role != "client" or schedule_block is None:
+        return role
+    appointment = schedule_block.appointment
+    if appointment is None:
+        return role
+    return "client:own" if appointment.client_id == ctx.client.id else "client:other"
+
+
+@pass_environment
+def cell(
+    env: Environment,
+    template: str,
+    schedule_block: ScheduleBlock | None,
+    weekday: int,
+    hour: int,
+    role: str,
+    *,
+    oob: bool = False,
+    **context: Any,
+) -> Markup:
+    """Render ``template`` for one grid cell, reusing a cached copy if possible."""
+    if schedule_block is None:
+        block_key: tuple[Hashable, ...] = (None,)
+    elif schedule_block.id is None:
+        block_key = (None, schedule_block.therapist_id, schedule_block.start_datetime)
+    else:
+        block_key = (schedule_block.id, schedule_block.version)
+    key = (
+        template,
+        *block_key,
+        role_of(role, schedule_block, context.get("ctx")),
+        weekday,
+        hour,
+        oob,
+    )
+    if (html := FRAGMENTS.get(key)) is None:
+        html = env.get_template(template).render(
+            schedule_block=schedule_block,
+            weekday=weekday,
+            hour=hour,
+            oob=oob,
+            **context,
+        )
+        FRAGMENTS.put(key, schedule_block.id if schedule_block else None, html)
+    return Markup(html)
+
+
+def invalidate_blocks(session: Session, *block_ids: int | None) -> None:
+    """Mark the cells of ``block_ids`` as changed, in this process and others.
+
+    The version bump is part of the caller's transaction, so it has to be
+    called before the commit.
+    """
+    ids = [block_id for block_id in block_ids if block_id is not None]
+    if not ids:
+        return
+    session.execute(
+        update(ScheduleBlock)
+        .where(col(ScheduleBlock.id).in_(ids))
+        .values(version=ScheduleBlock.version + 1)
+    )
+    FRAGMENTS.invalidate(ids)
@@ -25,13 +25,13 @@ def get_login(request: Request):
 
 
 @router.post("/login")
-def post_login(
+async def post_login(
     login_ctx: Annotated[LoginContext, Depends(get_context(LoginContext, auth=False))],
     email: Annotated[EmailStr, Form()],
     password: Annotated[str, Form()],
     redirect_url: Annotated[HttpUrl | None, Query()] = None,
 ):
-    client = login_ctx.login(Client, email, password)
+    client = await login_ctx.login_async(Client, email, password)
     return login(
         client,
         redirect(
@@ -52,14 +52,14 @@ def get_dashboard_login(
 
 
 @router.post("/dashboard/login")
-def post_dashboard_login(
+async def post_dashboard_login(
     ctx: Annotated[LoginContext, Depends(get_context(LoginContext, auth=False))],
     request: Request,
     email: Annotated[EmailStr, Form()],
     password: Annotated[str, Form()],
     redirect_url: Annotated[HttpUrl | None, Query()] = None,
 ):
-    therapist = ctx.login(Therapist, email, password)
+    therapist = await ctx.login_async(Therapist, email, password)
     return login(
         therapist,
         redirect(
@@ -4,6 +4,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel, EmailStr, Field, HttpUrl
+from starlette.concurrency import run_in_threadpool
 
 from renova.context import get_context
 from renova.credentials import login
@@ -34,10 +35,17 @@ class TherapistSignupForm(UserSignupForm):
 
 class SignupContext(LoginContext):
     def create_client(self, form: UserSignupForm) -> Client:
-        data = form.model_dump()
+        return self._create_client(form, self.hash(form.password))
+
+    async def create_client_async(self, form: UserSignupForm) -> Client:
+        hash = await self.hash_async(form.password)
+        return await run_in_threadpool(self._create_client, form, hash)
+
+    def _create_client(self, form: UserSignupForm, hash: str) -> Client:
+        data = form.model_dump(exclude={"password"})
         client = Client(
             email_address=data.pop("email_address"),
-            hash=self.hash(data.pop("password")),
+            hash=hash,
             **data,
         )
         self.session.add(client)
@@ -46,10 +54,17 @@ class SignupContext(LoginContext):
         return client
 
     def create_therapist(self, form: UserSignupForm) -> Therapist:
-        data = form.model_dump()
+        return self._create_therapist(form, self.hash(form.password))
+
+    async def create_therapist_async(self, form: UserSignupForm) -> Therapist:
+        hash = await self.hash_async(form.password)
+        return await run_in_threadpool(self._create_therapist, form, hash)
+
+    def _create_therapist(self, form: UserSignupForm, hash: str) -> Therapist:
+        data = form.model_dump(exclude={"password"})
         therapist = Therapist(
             email_address=data.pop("email_address"),
-            hash=self.hash(data.pop("password")),
+            hash=hash,
             hiring_date=date.today(),
             **data,
         )
@@ -83,13 +98,13 @@ def get_component_therapist_signup_form(
 
 
 @router.post("/signup/therapist")
-def post_therapist_signup(
+async def post_therapist_signup(
     ctx: Annotated[SignupContext, Depends(get_context(SignupContext, auth=False))],
     *,
     redirect_url: Annotated[HttpUrl | None, Query()] = None,
     form: Annotated[TherapistSignupForm, Form()],
 ):
-    therapist = ctx.create_therapist(form)
+    therapist = await ctx.create_therapist_async(form)
     return login(
         therapist,
         redirect(
@@ -115,14 +130,14 @@ def get_component_client_signup_form(
 
 
 @router.post("/signup/client")
-def post_signup(
+async def post_signup(
     ctx: Annotated[SignupContext, Depends(get_context(SignupContext, auth=False))],
     request: Request,
     *,
     redirect_url: Annotated[HttpUrl | None, Query()] = None,
     form: Annotated[UserSignupForm, Form()],
 ):
-    client = ctx.create_client(form)
+    client = await ctx.create_client_async(form)
     redirect_str = (
         str(redirect_url) if redirect_url else ctx.request.url_for("get_home_page")
     )
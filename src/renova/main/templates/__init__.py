@@ -1,5 +1,30 @@
+import os
+
 from fastapi.templating import Jinja2Templates
-from jinja2 import Environment, PackageLoader
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
 
+from renova.main.fragments import cell
+from renova.metrics import TimedTemplate
+from renova.models.appointments import GRID_HOURS
 
 templates = Jinja2Templates(env=Environment(loader=PackageLoader("renova.main")))
+templates.env.template_class = TimedTemplate
+templates.env.globals["cell"] = cell
+templates.env.globals["grid_hours"] = GRID_HOURS
+
+
+def warm_templates(cache_dir: str | None = None) -> int:
+    """Compile every template up front and stop checking them for changes.
+
+    With ``cache_dir`` the compiled bytecode is also kept on disk, so the next
+    boot loads it instead of compiling again. Returns the number of templates.
+    """
+    env = templates.env
+    env.auto_reload = False
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -1,37 +1,116 @@
+import asyncio
 from datetime import date, datetime, timedelta
-from typing import Annotated
+from mimetypes import guess_extension
+from typing import Annotated, Iterable, Literal, Sequence
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, update
 from sqlalchemy.exc import NoResultFound
-from sqlmodel import select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import col, select
 
-from renova.context import Context, get_context
-from renova.models.appointments import Appointment, ScheduleBlock
+from renova.context import AsyncContext, Context, get_async_context, get_context
+from renova.documents import (
+    DOCUMENTS,
+    INLINE_TYPES,
+    DocumentTooLargeError,
+    StoredFile,
+)
+from renova.etags import cache_headers, etag_matches, make_etag, not_modified
+from renova.events import EVENTS, REFRESH, BrokerFullError, publish_on_commit
+from renova.models.appointments import (
+    GRID_HOURS,
+    Appointment,
+    AppointmentPage,
+    AppointmentStatus,
+    AvailabilityRule,
+    Schedule,
+    ScheduleBlock,
+    parse_page_key,
+    start_of_week,
+)
 from renova.models.clients import Client
-from renova.models.patient_files import PatientFile
-from renova.models.therapists import Therapist
+from renova.models.patient_files import (
+    MedicalChart,
+    MedicalDocument,
+    PatientFile,
+    Timeline,
+    TimelineEntry,
+    TimelineKey,
+    parse_timeline_key,
+)
+from renova.models.therapists import Therapist, bump_schedule_version
 from renova.redirects import redirect
 from renova.security import check_csrf
 
+from .fragments import invalidate_blocks
 from .templates import templates
 
+APPOINTMENT_PAGE_SIZE = 20
+TIMELINE_PAGE_SIZE = 20
+
 
 class NotPrimaryTherapistError(RuntimeError):
     pass
 
 
+class ScheduleConflictError(ValueError):
+    pass
+
+
+class CreateBlock(BaseModel):
+    op: Literal["create"]
+    weekday: Annotated[int, Field(ge=0, lt=7)]
+    hour: Annotated[int, Field(ge=0, lt=24)]
+
+
+class DeleteBlock(BaseModel):
+    op: Literal["delete"]
+    schedule_block_id: int
+
+
+class ConfirmBlock(BaseModel):
+    op: Literal["confirm"]
+    schedule_block_id: int
+
+
+ScheduleOperation = Annotated[
+    CreateBlock | DeleteBlock | ConfirmBlock, Field(discriminator="op")
+]
+
+
+class ScheduleBatch(BaseModel):
+    week: date | None = None
+    operations: list[ScheduleOperation]
+
+
 class TherapistContext(Context):
     def get_schedule_block(self, schedule_block_id: int) -> ScheduleBlock:
+        """One of the therapist's blocks; other therapists' are not found."""
         try:
             return self.session.exec(
-                select(ScheduleBlock).where(ScheduleBlock.id == schedule_block_id)
+                select(ScheduleBlock).where(
+                    ScheduleBlock.id == schedule_block_id,
+                    ScheduleBlock.therapist_id == self.therapist.id,
+                )
             ).one()
         except NoResultFound as e:
             raise IndexError(f"schedule block {schedule_block_id} not found") from e
 
     def confirm_appointment(self, appointment: Appointment):
+        schedule_block = appointment.schedule_block
+        if schedule_block.therapist_id != self.therapist.id:
+            raise IndexError(f"schedule block {schedule_block.id} not found")
         appointment.confirm()
         self.session.add(appointment)
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(
+            self.session, schedule_block.therapist_id, schedule_block.start_datetime
+        )
         self.session.commit()
 
     def get_client(self, client_id: int) -> Client:
@@ -47,31 +126,244 @@ class TherapistContext(Context):
         appointment.confirm()
         self.session.add(schedule_block)
         self.session.add(appointment)
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(
+            self.session, schedule_block.therapist_id, schedule_block.start_datetime
+        )
         self.session.commit()
         return appointment
 
     def create_schedule_block(self, start: datetime):
         end = start + timedelta(hours=1)
         schedule_block = ScheduleBlock(
-            therapist=self.therapist, start_datetime=start, end_datetime=end
+            therapist_id=self.therapist.id, start_datetime=start, end_datetime=end
         )
         self.session.add(schedule_block)
+        bump_schedule_version(self.session, self.therapist.id)
+        publish_on_commit(self.session, self.therapist.id, start)
         self.session.commit()
         self.session.refresh(schedule_block)
         return schedule_block
 
     def delete_schedule_block(self, schedule_block_id: int):
-        schedule_block = self.session.get(ScheduleBlock, schedule_block_id)
+        schedule_block = self.get_schedule_block(schedule_block_id)
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(
+            self.session, schedule_block.therapist_id, schedule_block.start_datetime
+        )
         self.session.delete(schedule_block)
         self.session.commit()
 
     def update_schedule_block(
         self, schedule_block: ScheduleBlock, start: datetime, end: datetime
     ):
+        if schedule_block.therapist_id != self.therapist.id:
+            raise IndexError(f"schedule block {schedule_block.id} not found")
+        publish_on_commit(
+            self.session, schedule_block.therapist_id, schedule_block.start_datetime
+        )
         schedule_block.start_datetime = start
         schedule_block.end_datetime = end
         self.session.add(schedule_block)
+        invalidate_blocks(self.session, schedule_block.id)
+        bump_schedule_version(self.session, schedule_block.therapist_id)
+        publish_on_commit(self.session, schedule_block.therapist_id, start)
+        self.session.commit()
+
+    def get_appointments(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        statuses: Iterable[AppointmentStatus] | None = None,
+        *,
+        latest_first: bool = False,
+        after: tuple[datetime, int] | None = None,
+        size: int = APPOINTMENT_PAGE_SIZE,
+    ) -> AppointmentPage:
+        """A page of the therapist's appointments starting in ``[start, end)``,
+        optionally only those with one of ``statuses``."""
+        statement = Appointment.query(
+            therapist_id=self.therapist.id,
+            start=start,
+            end=end,
+            statuses=statuses,
+            latest_first=latest_first,
+            after=after,
+        )
+        appointments = self.read_session.exec(statement.limit(size + 1)).all()
+        return AppointmentPage.of(appointments, size, latest_first)
+
+    def get_pending_appointments(
+        self, after: tuple[datetime, int] | None = None
+    ) -> AppointmentPage:
+        """Upcoming appointments still waiting for confirmation, soonest first."""
+        return self.get_appointments(
+            datetime.now(), statuses=[AppointmentStatus.pending], after=after
+        )
+
+    def get_todays_appointments(self, day: date | None = None) -> Sequence[Appointment]:
+        """The sessions of ``day`` (today by default) that were not cancelled."""
+        start = datetime.combine(day or date.today(), datetime.min.time())
+        return self.read_session.exec(
+            Appointment.query(
+                therapist_id=self.therapist.id,
+                start=start,
+                end=start + timedelta(days=1),
+                statuses=[AppointmentStatus.pending, AppointmentStatus.confirmed],
+            )
+        ).all()
+
+    def get_availability_rules(self) -> Sequence[AvailabilityRule]:
+        return self.read_session.exec(
+            select(AvailabilityRule)
+            .where(AvailabilityRule.therapist_id == self.therapist.id)
+            .order_by(AvailabilityRule.weekday, AvailabilityRule.start_hour)
+        ).all()
+
+    def add_availability_rules(
+        self,
+        weekdays: Sequence[int],
+        start_hour: int,
+        end_hour: int,
+        valid_from: date,
+        valid_until: date | None = None,
+    ) -> list[AvailabilityRule]:
+        if start_hour >= end_hour:
+            raise ValueError("availability must end after it starts")
+        if valid_until is not None and valid_until < valid_from:
+            raise ValueError("availability must end after it starts")
+        rules = [
+            AvailabilityRule(
+                therapist_id=self.therapist.id,
+                weekday=weekday,
+                start_hour=start_hour,
+                end_hour=end_hour,
+                valid_from=valid_from,
+                valid_until=valid_until,
+            )
+            for weekday in sorted(set(weekdays))
+        ]
+        self.session.add_all(rules)
+        bump_schedule_version(self.session, self.therapist.id)
+        publish_on_commit(self.session, self.therapist.id, REFRESH)
         self.session.commit()
+        return rules
+
+    def delete_availability_rule(self, rule_id: int) -> None:
+        rule = self.session.get(AvailabilityRule, rule_id)
+        if rule is None or rule.therapist_id != self.therapist.id:
+            raise IndexError(f"availability rule {rule_id} not found")
+        self.session.delete(rule)
+        bump_schedule_version(self.session, self.therapist.id)
+        publish_on_commit(self.session, self.therapist.id, REFRESH)
+        self.session.commit()
+
+    def apply_schedule_batch(
+        self, week: date, operations: Sequence[ScheduleOperation]
+    ) -> list[tuple[int, int]]:
+        """Apply ``operations`` in one transaction.
+
+        Returns the ``(weekday, hour)`` cells of ``week`` that changed. Raises
+        ``IndexError`` for blocks that are not this therapist's and
+        ``ScheduleConflictError`` when a new block would overlap another one or
+        a booked block would be deleted.
+        """
+        therapist_id = self.therapist.id
+        start_of_week = datetime.combine(week, datetime.min.time())
+        creates = [
+            start_of_week + timedelta(days=op.weekday, hours=op.hour)
+            for op in operations
+            if isinstance(op, CreateBlock)
+        ]
+        deletes = {
+            op.schedule_block_id for op in operations if isinstance(op, DeleteBlock)
+        }
+        confirms = {
+            op.schedule_block_id for op in operations if isinstance(op, ConfirmBlock)
+        }
+
+        targets: dict[int, ScheduleBlock] = {}
+        if deletes or confirms:
+            targets = {
+                block.id: block
+                for block in self.session.exec(
+                    select(ScheduleBlock)
+                    .where(
+                        ScheduleBlock.therapist_id == therapist_id,
+                        col(ScheduleBlock.id).in_(deletes | confirms),
+                    )
+                    .options(selectinload(ScheduleBlock.appointment))
+                )
+            }
+        if missing := (deletes | confirms) - targets.keys():
+            raise IndexError(f"schedule blocks {sorted(missing)} not found")
+        if booked := sorted(i for i in deletes if targets[i].appointment is not None):
+            raise ScheduleConflictError(f"schedule blocks {booked} are booked")
+        if unbooked := sorted(i for i in confirms if targets[i].appointment is None):
+            raise IndexError(f"appointments for schedule blocks {unbooked} not found")
+
+        if creates:
+            if len(set(creates)) != len(creates):
+                raise ScheduleConflictError("the batch creates the same block twice")
+            # Blocks never span more than a day, which bounds the index range.
+            first, last = min(creates), max(creates) + timedelta(hours=1)
+            existing = self.session.exec(
+                select(
+                    ScheduleBlock.id,
+                    ScheduleBlock.start_datetime,
+                    ScheduleBlock.end_datetime,
+                ).where(
+                    ScheduleBlock.therapist_id == therapist_id,
+                    ScheduleBlock.start_datetime > first - timedelta(days=1),
+                    ScheduleBlock.start_datetime < last,
+                    ScheduleBlock.end_datetime > first,
+                )
+            ).all()
+            for start in creates:
+                end = start + timedelta(hours=1)
+                for id, other_start, other_end in existing:
+                    if id not in deletes and other_start < end and start < other_end:
+                        raise ScheduleConflictError(
+                            f"{start.isoformat()} overlaps schedule block {id}"
+                        )
+            self.session.execute(
+                insert(ScheduleBlock),
+                [
+                    {
+                        "therapist_id": therapist_id,
+                        "start_datetime": start,
+                        "end_datetime": start + timedelta(hours=1),
+                    }
+                    for start in creates
+                ],
+            )
+        if deletes:
+            self.session.execute(
+                delete(ScheduleBlock).where(col(ScheduleBlock.id).in_(deletes))
+            )
+        if confirms:
+            self.session.execute(
+                update(Appointment)
+                .where(col(Appointment.schedule_block_id).in_(confirms))
+                .values(appointment_status=AppointmentStatus.confirmed)
+            )
+        invalidate_blocks(self.session, *deletes, *confirms)
+        bump_schedule_version(self.session, therapist_id)
+        publish_on_commit(
+            self.session,
+            therapist_id,
+            *creates,
+            *(block.start_datetime for block in targets.values()),
+        )
+        self.session.commit()
+
+        cells = [((start - start_of_week).days, start.hour) for start in creates]
+        for block in targets.values():
+            if 0 <= (day := (block.start_datetime - start_of_week).days) < 7:
+                cells.append((day, block.start_datetime.hour))
+        return sorted(set(cells))
 
     def update_patient_file(
         self,
@@ -85,13 +377,13 @@ class TherapistContext(Context):
         client = self.get_client(client_id)
         if (
             client.patient_file is not None
-            and client.patient_file.primary_therapist != self.user
+            and client.patient_file.primary_therapist_id != self.therapist.id
         ):
             raise NotPrimaryTherapistError(
-                f"therapist {self.user.id} is not the primary therapist of client {client_id}"
+                f"therapist {self.therapist.id} is not the primary therapist of client {client_id}"
             )
         client.patient_file = PatientFile(
-            primary_therapist=self.therapist,
+            primary_therapist_id=self.therapist.id,
             admission_date=admission_date,
             insurance_number=insurance_number,
             blood_type=blood_type,
@@ -102,37 +394,112 @@ class TherapistContext(Context):
         self.session.commit()
         return client.patient_file
 
-    def get_start_of_week(self, day: date | None = None) -> date:
-        today = day or date.today()
-        return today - timedelta((today.weekday() + 1) % 7)
+    def get_patient_file(self, client_id: int) -> PatientFile:
+        """The file of one of the therapist's patients, with its client."""
+        patient_file = self.read_session.exec(
+            select(PatientFile)
+            .where(PatientFile.client_id == client_id)
+            .options(joinedload(PatientFile.client))
+        ).one_or_none()
+        if patient_file is None:
+            raise IndexError(f"patient file of client {client_id} not found")
+        if patient_file.primary_therapist_id != self.therapist.id:
+            raise NotPrimaryTherapistError(
+                f"therapist {self.therapist.id} is not the primary therapist of client {client_id}"
+            )
+        return patient_file
+
+    def get_timeline(
+        self,
+        client_id: int,
+        after: TimelineKey | None = None,
+        size: int = TIMELINE_PAGE_SIZE,
+    ) -> Timeline:
+        self.get_patient_file(client_id)
+        return Timeline.load(self.read_session, client_id, after, size)
+
+    def get_chart(self, client_id: int, chart_id: int) -> MedicalChart:
+        self.get_patient_file(client_id)
+        chart = self.read_session.exec(
+            select(MedicalChart).where(
+                MedicalChart.id == chart_id, MedicalChart.client_id == client_id
+            )
+        ).one_or_none()
+        if chart is None:
+            raise IndexError(f"chart {chart_id} of client {client_id} not found")
+        return chart
 
-    def get_blocks(self, day: date | None = None) -> list[list[ScheduleBlock | None]]:
-        start_of_week = datetime.combine(
-            self.get_start_of_week(day), datetime.min.time()
+    def get_document(self, client_id: int, document_id: int) -> MedicalDocument:
+        self.get_patient_file(client_id)
+        document = self.read_session.exec(
+            select(MedicalDocument).where(
+                MedicalDocument.id == document_id,
+                MedicalDocument.client_id == client_id,
+            )
+        ).one_or_none()
+        if document is None:
+            raise IndexError(f"document {document_id} of client {client_id} not found")
+        return document
+
+    def add_document(
+        self,
+        client_id: int,
+        hospital_name: str,
+        date: datetime,
+        mime_type: str,
+        stored: StoredFile,
+    ) -> MedicalDocument:
+        """Record a document whose file is already in ``DOCUMENTS``."""
+        self.get_patient_file(client_id)
+        document = MedicalDocument(
+            client_id=client_id,
+            date=date,
+            hospital_name=hospital_name,
+            content_hash=stored.content_hash,
+            size=stored.size,
+            mime_type=mime_type,
         )
-        blocks: list[list[ScheduleBlock | None]] = [
-            [None for _ in range(24)] for _ in range(7)
-        ]
-        for block in self.session.exec(
-            select(ScheduleBlock).where(
-                ScheduleBlock.therapist_id == self.therapist.id,
-                ScheduleBlock.start_datetime > start_of_week,
-                ScheduleBlock.end_datetime < start_of_week + timedelta(weeks=1),
+        self.session.add(document)
+        self.session.commit()
+        self.session.refresh(document)
+        return document
+
+    def get_start_of_week(self, day: date | None = None) -> date:
+        return start_of_week(day)
+
+    def get_blocks(self, day: date | None = None, weeks: int = 1) -> Schedule:
+        return Schedule.load(self.read_session, self.therapist.id, day, weeks)
+
+
+class AsyncTherapistContext(AsyncContext):
+    def get_start_of_week(self, day: date | None = None) -> date:
+        return start_of_week(day)
+
+    async def get_blocks(self, day: date | None = None, weeks: int = 1) -> Schedule:
+        return await Schedule.load_async(self.session, self.therapist.id, day, weeks)
+
+    async def get_schedule_version(self) -> int:
+        # Read afresh: the identity cache may hold an older snapshot.
+        return (
+            await self.session.exec(
+                select(Therapist.schedule_version).where(
+                    Therapist.id == self.therapist.id
+                )
             )
-        ).all():
-            blocks[(block.start_datetime.weekday() + 1) % 7][
-                block.start_datetime.hour
-            ] = block
-        return blocks
+        ).one()
+
 
+WEEKDAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+SSE_KEEPALIVE = 15.0
 
 router = APIRouter()
 
 
 @router.get("/dashboard")
-def get_dashboard(
+async def get_dashboard(
     ctx: Annotated[
-        TherapistContext, Depends(get_context(TherapistContext, auth=False))
+        AsyncTherapistContext,
+        Depends(get_async_context(AsyncTherapistContext, auth=False)),
     ],
 ):
     if not ctx.authenticated:
@@ -144,6 +511,14 @@ def get_dashboard(
             ),
         )
     start_of_week = ctx.get_start_of_week()
+    etag = make_etag(
+        "dashboard",
+        ctx.therapist.id,
+        await ctx.get_schedule_version(),
+        start_of_week.isoformat(),
+    )
+    if etag_matches(ctx.request, etag):
+        return not_modified(etag)
     return templates.TemplateResponse(
         ctx.request,
         "pages/dashboard.html",
@@ -151,8 +526,82 @@ def get_dashboard(
             "authenticated": ctx.authenticated,
             "therapist": ctx.therapist,
             "date": start_of_week,
-            "blocks": ctx.get_blocks(),
+            "blocks": await ctx.get_blocks(),
         },
+        headers=cache_headers(etag),
+    )
+
+
+def changed_cells(week: date, starts: set[datetime | None]) -> list[tuple[int, int]]:
+    if REFRESH in starts:
+        return [(day, hour) for day in range(7) for hour in GRID_HOURS]
+    cells = set()
+    for start in starts:
+        day = (start.date() - week).days
+        if 0 <= day < 7 and start.hour in GRID_HOURS:
+            cells.add((day, start.hour))
+    return sorted(cells)
+
+
+def sse_message(event: str, data: str) -> str:
+    lines = "".join(f"data: {line}\n" for line in data.splitlines())
+    return f"event: {event}\n{lines}\n"
+
+
+@router.get("/dashboard/events")
+async def get_dashboard_events(
+    ctx: Annotated[
+        AsyncTherapistContext,
+        Depends(get_async_context(AsyncTherapistContext, auth=Therapist)),
+    ],
+):
+    therapist_id = ctx.therapist.id
+    await ctx.session.close()
+
+    async def stream():
+        try:
+            subscription = EVENTS.subscribe(therapist_id)
+        except BrokerFullError:
+            # Ask the browser to come back later rather than hold a connection.
+            yield "retry: 30000\n\n"
+            return
+        try:
+            yield "retry: 5000\n\n"
+            version = await ctx.get_schedule_version()
+            await ctx.session.close()
+            while True:
+                try:
+                    starts = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE)
+                except TimeoutError:
+                    # Writes served by other workers are not published here,
+                    # but they all bump the schedule version.
+                    current = await ctx.get_schedule_version()
+                    await ctx.session.close()
+                    if current == version:
+                        yield ": keep-alive\n\n"
+                        continue
+                    starts = {REFRESH}
+                week = ctx.get_start_of_week()
+                # Read before the blocks, so a write in between shows up later,
+                # and even when no cell changed, so the next tick doesn't see
+                # this write as one from another worker.
+                version = await ctx.get_schedule_version()
+                if not (cells := changed_cells(week, starts)):
+                    await ctx.session.close()
+                    continue
+                blocks = await Schedule.load_async(ctx.session, therapist_id, week)
+                await ctx.session.close()
+                html = templates.get_template("components/schedule_cells.html").render(
+                    blocks=blocks, cells=cells
+                )
+                yield sse_message("schedule", html)
+        finally:
+            EVENTS.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -180,6 +629,31 @@ def post_schedules(
     )
 
 
+@router.post("/schedule/batch")
+def post_schedule_batch(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    batch: ScheduleBatch,
+):
+    week = ctx.get_start_of_week(batch.week)
+    try:
+        cells = ctx.apply_schedule_batch(week, batch.operations)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except ScheduleConflictError as e:
+        raise HTTPException(409, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/schedule_cells.html",
+        context={
+            "therapist": ctx.therapist,
+            "blocks": ctx.get_blocks(week),
+            "cells": cells,
+        },
+    )
+
+
 @router.put("/schedule/{schedule_block_id}/confirm")
 def put_schedule_block_confirm(
     ctx: Annotated[
@@ -189,7 +663,11 @@ def put_schedule_block_confirm(
     weekday: Annotated[int, Form()],
     hour: Annotated[int, Form()],
 ):
-    if (schedule_block := ctx.get_schedule_block(schedule_block_id)) is None or schedule_block.appointment is None:
+    try:
+        schedule_block = ctx.get_schedule_block(schedule_block_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    if schedule_block.appointment is None:
         raise HTTPException(404, f"appointment for schedule block {schedule_block_id} not found")
     ctx.confirm_appointment(schedule_block.appointment)
     return templates.TemplateResponse(
@@ -213,7 +691,10 @@ def delete_schedules(
     weekday: Annotated[int, Query()],
     hour: Annotated[int, Query()],
 ):
-    ctx.delete_schedule_block(schedule_block_id)
+    try:
+        ctx.delete_schedule_block(schedule_block_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
     return templates.TemplateResponse(
         ctx.request,
         "components/schedule_block.html",
@@ -226,6 +707,107 @@ def delete_schedules(
     )
 
 
+@router.get("/dashboard/appointments")
+def get_dashboard_appointments(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    view: Literal["all", "pending", "today"] = "all",
+    start: date | None = None,
+    end: Annotated[date | None, Query(description="exclusive")] = None,
+    status: Annotated[list[AppointmentStatus] | None, Query()] = None,
+    latest_first: bool = False,
+    after: str | None = None,
+):
+    try:
+        key = None if after is None else parse_page_key(after)
+    except ValueError as e:
+        raise HTTPException(400, f"invalid page key {after!r}") from e
+    match view:
+        case "pending":
+            page = ctx.get_pending_appointments(key)
+        case "today":
+            page = AppointmentPage(ctx.get_todays_appointments(), False, None)
+        case _:
+            page = ctx.get_appointments(
+                start and datetime.combine(start, datetime.min.time()),
+                end and datetime.combine(end, datetime.min.time()),
+                status,
+                latest_first=latest_first,
+                after=key,
+            )
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/therapist_appointments.html",
+        context={
+            "page": page,
+            "view": view,
+            # A "more" button asks for the next page only, to append in place.
+            "next_page": after is not None,
+            "more": page.next and ctx.request.url.include_query_params(after=page.next),
+        },
+    )
+
+
+def render_availability(ctx: TherapistContext):
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/availability_rules.html",
+        context={
+            "rules": ctx.get_availability_rules(),
+            "weekdays": WEEKDAYS,
+            "today": date.today(),
+        },
+    )
+
+
+@router.get("/availability")
+def get_availability(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+):
+    return render_availability(ctx)
+
+
+@router.post("/availability")
+def post_availability(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    weekdays: Annotated[list[Annotated[int, Field(ge=0, lt=7)]], Form()],
+    start_hour: Annotated[int, Form(ge=0, lt=24)],
+    end_hour: Annotated[int, Form(gt=0, le=24)],
+    valid_from: Annotated[date, Form()],
+    valid_until: Annotated[date | None, Form()] = None,
+):
+    try:
+        ctx.add_availability_rules(
+            weekdays, start_hour, end_hour, valid_from, valid_until
+        )
+    except ValueError as e:
+        raise HTTPException(422, str(e)) from e
+    response = render_availability(ctx)
+    response.headers["HX-Refresh"] = "true"
+    return response
+
+
+@router.delete("/availability/{rule_id}")
+def delete_availability(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    rule_id: int,
+):
+    try:
+        ctx.delete_availability_rule(rule_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    response = render_availability(ctx)
+    response.headers["HX-Refresh"] = "true"
+    return response
+
+
 @router.put("/clients/{client_id}/patient_file", dependencies=[Depends(check_csrf)])
 def put_patient_file(
     ctx: Annotated[TherapistContext, Depends(get_context(TherapistContext, auth=True))],
@@ -248,3 +830,146 @@ def put_patient_file(
     return templates.TemplateResponse(
         request, "components/patient_file.html", context={"patient_file": patient_file}
     )
+
+
+@router.get("/clients/{client_id}/patient_file")
+def get_patient_file(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    client_id: int,
+):
+    try:
+        patient_file = ctx.get_patient_file(client_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except NotPrimaryTherapistError as e:
+        raise HTTPException(403, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/patient_file.html",
+        context={"patient_file": patient_file},
+    )
+
+
+@router.get("/clients/{client_id}/timeline")
+def get_patient_timeline(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    client_id: int,
+    after: str | None = None,
+):
+    try:
+        key = None if after is None else parse_timeline_key(after)
+    except ValueError as e:
+        raise HTTPException(400, f"invalid page key {after!r}") from e
+    try:
+        timeline = ctx.get_timeline(client_id, key)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except NotPrimaryTherapistError as e:
+        raise HTTPException(403, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/patient_timeline.html",
+        context={
+            "client_id": client_id,
+            "timeline": timeline,
+            "more": timeline.next
+            and ctx.request.url.include_query_params(after=timeline.next),
+        },
+    )
+
+
+@router.get("/clients/{client_id}/charts/{chart_id}")
+def get_chart_note(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    client_id: int,
+    chart_id: int,
+):
+    try:
+        chart = ctx.get_chart(client_id, chart_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except NotPrimaryTherapistError as e:
+        raise HTTPException(403, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request, "components/chart_note.html", context={"chart": chart}
+    )
+
+
+@router.post("/clients/{client_id}/documents", status_code=201)
+async def post_document(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    client_id: int,
+    hospital_name: str,
+    document_date: Annotated[datetime | None, Query(alias="date")] = None,
+    content_type: Annotated[str, Header()] = "application/octet-stream",
+):
+    """Upload a document; the request body is the file itself.
+
+    The file is streamed to ``DOCUMENTS`` before the write connection is taken,
+    which then only inserts the row.
+    """
+    try:
+        await run_in_threadpool(ctx.get_patient_file, client_id)
+        stored = await DOCUMENTS.put(ctx.request.stream())
+        document = await run_in_threadpool(
+            ctx.add_document,
+            client_id,
+            hospital_name,
+            document_date or datetime.now(),
+            content_type.partition(";")[0].strip().lower(),
+            stored,
+        )
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except NotPrimaryTherapistError as e:
+        raise HTTPException(403, str(e)) from e
+    except DocumentTooLargeError as e:
+        raise HTTPException(413, str(e)) from e
+    return templates.TemplateResponse(
+        ctx.request,
+        "components/patient_timeline.html",
+        context={
+            "client_id": client_id,
+            "timeline": Timeline([TimelineEntry("document", document)], None),
+        },
+        status_code=201,
+    )
+
+
+@router.get("/clients/{client_id}/documents/{document_id}")
+def get_document(
+    ctx: Annotated[
+        TherapistContext, Depends(get_context(TherapistContext, auth=Therapist))
+    ],
+    client_id: int,
+    document_id: int,
+):
+    try:
+        document = ctx.get_document(client_id, document_id)
+    except IndexError as e:
+        raise HTTPException(404, str(e)) from e
+    except NotPrimaryTherapistError as e:
+        raise HTTPException(403, str(e)) from e
+    if document.content_hash is None:
+        raise HTTPException(404, f"document {document_id} has no file")
+    # The MIME type is whatever the uploader claimed: only types that cannot
+    # run script are shown in the browser, the rest are downloaded.
+    mime_type = document.mime_type or "application/octet-stream"
+    inline = mime_type in INLINE_TYPES
+    # Served straight from disk, with Range requests and, where the server
+    # supports it, without copying through Python.
+    return FileResponse(
+        DOCUMENTS.path(document.content_hash),
+        media_type=mime_type if inline else "application/octet-stream",
+        filename=f"document-{document.id}{guess_extension(mime_type) or ''}",
+        content_disposition_type="inline" if inline else "attachment",
+        headers={"X-Content-Type-Options": "nosniff"},
+    )
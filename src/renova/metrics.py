@@ -0,0 +1,249 @@
+"""Per-request instrumentation, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and, through a context variable,
+collects what the request did underneath it: SQL statements and their time
+(from cursor events on every ``Engine``, so the reader pool and the async
+engine count too), top-level Jinja render time (templates are
+``TimedTemplate``) and the size of the response body. Each of those goes into
+a histogram labelled with the method and the matched route path, never the raw
+URL, so the number of series stays bounded. Every template render is also
+timed on its own, labelled with the template name.
+
+Metrics are kept per process; with several workers each one reports its own.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Iterable, Iterator
+
+from jinja2 import Template
+from sqlalchemy import Engine, event
+
+__all__ = [
+    "Histogram",
+    "Metrics",
+    "METRICS",
+    "MetricsMiddleware",
+    "TimedTemplate",
+    "counter",
+]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        """Cumulative ``(le, count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield format_value(bound), total
+
+
+class Metrics:
+    """Histograms by metric name and label values."""
+
+    def __init__(self):
+        self._families: dict[str, tuple[str, tuple[float, ...]]] = {}
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+        self._lock = Lock()
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float]) -> None:
+        self._families[name] = (help, tuple(buckets))
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if (histogram := self._histograms.get(key)) is None:
+                histogram = Histogram(self._families[name][1])
+                self._histograms[key] = histogram
+            histogram.observe(value)
+
+    def get(self, name: str, **labels: str) -> Histogram | None:
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (help, _) in self._families.items():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+                for (family, labels), histogram in sorted(self._histograms.items()):
+                    if family != name:
+                        continue
+                    for le, count in histogram.samples():
+                        lines.append(
+                            f"{name}_bucket{format_labels(labels + (('le', le),))}"
+                            f" {count}"
+                        )
+                    lines.append(
+                        f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}"
+                    )
+                    lines.append(
+                        f"{name}_count{format_labels(labels)} {histogram.count}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+def format_value(value: float | str) -> str:
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    pairs = ",".join(f'{name}="{value}"' for name, value in escaped)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def counter(name: str, help: str, value: float) -> str:
+    """Render a single unlabelled counter."""
+    return (
+        f"# HELP {name} {help}\n# TYPE {name} counter\n{name} {format_value(value)}\n"
+    )
+
+
+METRICS = Metrics()
+METRICS.histogram(
+    "renova_request_duration_seconds", "Wall time per request.", LATENCY_BUCKETS
+)
+METRICS.histogram(
+    "renova_request_sql_statements", "SQL statements per request.", COUNT_BUCKETS
+)
+METRICS.histogram(
+    "renova_request_sql_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS
+)
+METRICS.histogram(
+    "renova_request_template_seconds",
+    "Time spent rendering templates per request.",
+    LATENCY_BUCKETS,
+)
+METRICS.histogram(
+    "renova_response_size_bytes", "Response body size per request.", SIZE_BUCKETS
+)
+METRICS.histogram(
+    "renova_template_render_seconds", "Render time per template.", LATENCY_BUCKETS
+)
+
+
+@dataclass
+class RequestStats:
+    sql_statements: int = 0
+    sql_seconds: float = 0.0
+    template_seconds: float = 0.0
+    rendering: int = 0
+
+
+# Mutated in place, so work done in the threadpool (which runs on a copy of
+# the context) still adds up on the request's stats.
+_stats: ContextVar[RequestStats | None] = ContextVar(
+    "renova_request_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _stats.get() is not None:
+        conn.info.setdefault("renova_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_execute(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _failed_execute(exception_context):
+    # A failed statement never reaches after_cursor_execute; its start time must
+    # still come off the stack, or later statements pair with the wrong one.
+    if (conn := exception_context.connection) is not None:
+        _finish_execute(conn)
+
+
+def _finish_execute(conn) -> None:
+    if not (starts := conn.info.get("renova_query_start")):
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if (stats := _stats.get()) is not None:
+        stats.sql_statements += 1
+        stats.sql_seconds += elapsed
+
+
+class TimedTemplate(Template):
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        stats = _stats.get()
+        start = time.perf_counter()
+        if stats is not None:
+            stats.rendering += 1
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if stats is not None:
+                stats.rendering -= 1
+                # Templates rendered from within another are already counted.
+                if not stats.rendering:
+                    stats.template_seconds += elapsed
+            METRICS.observe(
+                "renova_template_render_seconds",
+                elapsed,
+                template=self.name or "<string>",
+            )
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _stats.set(stats)
+        size = 0
+        start = time.perf_counter()
+
+        async def send_counting(message):
+            nonlocal size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counting)
+        finally:
+            _stats.reset(token)
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            labels = {"method": scope["method"], "route": route}
+            for name, value in (
+                ("renova_request_duration_seconds", time.perf_counter() - start),
+                ("renova_request_sql_statements", stats.sql_statements),
+                ("renova_request_sql_seconds", stats.sql_seconds),
+                ("renova_request_template_seconds", stats.template_seconds),
+                ("renova_response_size_bytes", size),
+            ):
+                METRICS.observe(name, value, **labels)
@@ -0,0 +1,215 @@
+"""Versioned schema migrations.
+
+A fresh database is created from the models and stamped with the latest
+version. An existing database is brought forward by running every migration
+newer than the version recorded in ``schema_version``; one created before
+migrations existed starts from version 0. Migrations run against the schema as
+it was before them, so they check for what already exists instead of assuming.
+"""
+
+from importlib import import_module
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import Executable
+from sqlmodel import SQLModel
+
+from renova.db import ENGINE
+from renova.models.rollups import rebuild_rollups
+
+__all__ = ["migration", "migrate", "current_version", "query_plan"]
+
+type Migration = Callable[[Connection], None]
+
+MIGRATIONS: dict[int, Migration] = {}
+# Migrations that also run on a freshly created database, for schema objects
+# create_all cannot build (triggers, virtual tables).
+ON_CREATE: set[int] = set()
+
+
+def migration(version: int, *, on_create: bool = False):
+    def register(fn: Migration) -> Migration:
+        if version in MIGRATIONS:
+            raise ValueError(f"duplicate migration {version}")
+        MIGRATIONS[version] = fn
+        if on_create:
+            ON_CREATE.add(version)
+        return fn
+
+    return register
+
+
+def create_tables(connection: Connection, *tables: str) -> None:
+    SQLModel.metadata.create_all(
+        connection,
+        tables=[SQLModel.metadata.tables[name] for name in tables],
+        checkfirst=True,
+    )
+
+
+def add_column(connection: Connection, table: str, column: str) -> None:
+    if column in {c["name"] for c in inspect(connection).get_columns(table)}:
+        return
+    definition = CreateColumn(SQLModel.metadata.tables[table].c[column])
+    connection.execute(
+        text(f"ALTER TABLE {table} ADD COLUMN {definition.compile(connection)}")
+    )
+
+
+def create_indexes(connection: Connection, *tables: str) -> None:
+    for name in tables:
+        for index in SQLModel.metadata.tables[name].indexes:
+            index.create(connection, checkfirst=True)
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table("schema_version"):
+        return 0
+    return (
+        connection.execute(text("SELECT max(version) FROM schema_version")).scalar()
+        or 0
+    )
+
+
+def stamp(connection: Connection, version: int) -> None:
+    connection.execute(
+        text("INSERT INTO schema_version (version) VALUES (:version)"),
+        {"version": version},
+    )
+
+
+def migrate(engine: Engine = ENGINE) -> int:
+    import_module("renova.models")
+    head = max(MIGRATIONS)
+    with engine.begin() as connection:
+        version = current_version(connection)
+        if version == head:
+            return version
+
+        if version == 0:
+            fresh = not inspect(connection).get_table_names()
+            connection.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS schema_version"
+                    " (version INTEGER NOT NULL)"
+                )
+            )
+            if fresh:
+                SQLModel.metadata.create_all(connection)
+                for number in sorted(ON_CREATE):
+                    MIGRATIONS[number](connection)
+                stamp(connection, head)
+                return head
+
+        for number in sorted(MIGRATIONS):
+            if number <= version:
+                continue
+            MIGRATIONS[number](connection)
+            stamp(connection, number)
+            version = number
+    return version
+
+
+def query_plan(connection: Connection, statement: Executable) -> list[str]:
+    """Return the SQLite ``EXPLAIN QUERY PLAN`` details for ``statement``."""
+    compiled = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    return [
+        row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+    ]
+
+
+@migration(1)
+def baseline(connection: Connection) -> None:
+    SQLModel.metadata.create_all(connection, checkfirst=True)
+
+
+@migration(2)
+def index_hot_queries(connection: Connection) -> None:
+    create_indexes(
+        connection,
+        "scheduleblock",
+        "appointment",
+        "therapist",
+        "inventoryreceipt",
+        "inventoryreceiptitem",
+        "patientfile",
+    )
+
+
+@migration(3, on_create=True)
+def therapist_search_index(connection: Connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS therapist_fts USING fts5(
+            first_name,
+            last_name,
+            content='therapist',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS therapist_fts_insert AFTER INSERT ON therapist
+        BEGIN
+            INSERT INTO therapist_fts (rowid, first_name, last_name)
+            VALUES (new.id, new.first_name, new.last_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS therapist_fts_delete AFTER DELETE ON therapist
+        BEGIN
+            INSERT INTO therapist_fts (therapist_fts, rowid, first_name, last_name)
+            VALUES ('delete', old.id, old.first_name, old.last_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS therapist_fts_update
+        AFTER UPDATE OF first_name, last_name ON therapist
+        BEGIN
+            INSERT INTO therapist_fts (therapist_fts, rowid, first_name, last_name)
+            VALUES ('delete', old.id, old.first_name, old.last_name);
+            INSERT INTO therapist_fts (rowid, first_name, last_name)
+            VALUES (new.id, new.first_name, new.last_name);
+        END
+        """,
+        "INSERT INTO therapist_fts (therapist_fts) VALUES ('rebuild')",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+@migration(4)
+def daily_rollups(connection: Connection) -> None:
+    create_tables(connection, "dailyspend", "dailystock")
+    rebuild_rollups(connection)
+
+
+@migration(5)
+def availability_rules(connection: Connection) -> None:
+    create_tables(connection, "availabilityrule")
+
+
+@migration(6)
+def schedule_block_version(connection: Connection) -> None:
+    add_column(connection, "scheduleblock", "version")
+
+
+@migration(7)
+def therapist_schedule_version(connection: Connection) -> None:
+    add_column(connection, "therapist", "schedule_version")
+
+
+@migration(8)
+def patient_timeline_indexes(connection: Connection) -> None:
+    create_indexes(connection, "medicalchart", "medicaldocument")
+
+
+@migration(9)
+def medical_document_files(connection: Connection) -> None:
+    for column in ("content_hash", "size", "mime_type"):
+        add_column(connection, "medicaldocument", column)
@@ -1,6 +1,11 @@
 from .clients import Client
 from .therapists import StatusOfWork, Therapist
-from .appointments import Appointment, AppointmentStatus, ScheduleBlock
+from .appointments import (
+    Appointment,
+    AppointmentStatus,
+    AvailabilityRule,
+    ScheduleBlock,
+)
 from .patient_files import (
     Allergy,
     EmergencyContact,
@@ -14,6 +19,7 @@ from .patient_files import (
 from .receipts import InventoryReceipt, InventoryReceiptItem
 from .specializations import Specialization
 from .products import InventoryProduct
+from .rollups import DailySpend, DailyStock
 
 __all__ = [
     "InventoryReceipt",
@@ -22,6 +28,7 @@ __all__ = [
     "Therapist",
     "Appointment",
     "AppointmentStatus",
+    "AvailabilityRule",
     "ScheduleBlock",
     "Allergy",
     "EmergencyContact",
@@ -34,4 +41,6 @@ __all__ = [
     "Specialization",
     "StatusOfWork",
     "InventoryProduct",
+    "DailySpend",
+    "DailyStock",
 ]
@@ -1,8 +1,13 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Iterable, Iterator, Sequence
 
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index, tuple_
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlmodel import Field, Relationship, Session, SQLModel, col, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 from renova.models.therapists import Therapist
 from renova.models.clients import Client
 
@@ -18,7 +23,7 @@ class Appointment(SQLModel, table=True):
         int | None, Field(foreign_key="scheduleblock.id", primary_key=True)
     ] = None
     schedule_block: "ScheduleBlock" = Relationship(back_populates="appointment")
-    client_id: Annotated[int | None, Field(foreign_key="client.id")] = None
+    client_id: Annotated[int | None, Field(foreign_key="client.id", index=True)] = None
     client: "Client" = Relationship(back_populates="appointments")
     appointment_status: AppointmentStatus = AppointmentStatus.pending
 
@@ -31,13 +36,111 @@ class Appointment(SQLModel, table=True):
     def reschedule(self, schedule_block: "ScheduleBlock"):
         self.schedule_block = schedule_block
 
+    @staticmethod
+    def query(
+        *,
+        client_id: int | None = None,
+        therapist_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        statuses: Iterable[AppointmentStatus] | None = None,
+        latest_first: bool = False,
+        after: tuple[datetime, int] | None = None,
+    ) -> SelectOfScalar["Appointment"]:
+        """Appointments starting in ``[start, end)``, filtered in SQL.
+
+        Results are ordered and paged on ``(start_datetime, schedule_block_id)``:
+        ``after`` is the key of the previous page's last appointment. The block,
+        its therapist and the client are joined in, so rendering the results
+        loads nothing else.
+        """
+        begins = ScheduleBlock.start_datetime
+        key = tuple_(begins, Appointment.schedule_block_id)
+        statement = (
+            select(Appointment)
+            .join(Appointment.schedule_block)
+            .join(ScheduleBlock.therapist)
+            .join(Appointment.client)
+            .options(
+                contains_eager(Appointment.schedule_block).contains_eager(
+                    ScheduleBlock.therapist
+                ),
+                contains_eager(Appointment.client),
+            )
+        )
+        if client_id is not None:
+            statement = statement.where(Appointment.client_id == client_id)
+        if therapist_id is not None:
+            statement = statement.where(ScheduleBlock.therapist_id == therapist_id)
+        if start is not None:
+            statement = statement.where(begins >= start)
+        if end is not None:
+            statement = statement.where(begins < end)
+        if statuses is not None:
+            statement = statement.where(
+                col(Appointment.appointment_status).in_(list(statuses))
+            )
+        if latest_first:
+            statement = statement.order_by(
+                col(begins).desc(), col(Appointment.schedule_block_id).desc()
+            )
+            if after is not None:
+                statement = statement.where(key < tuple_(*after))
+        else:
+            statement = statement.order_by(begins, Appointment.schedule_block_id)
+            if after is not None:
+                statement = statement.where(key > tuple_(*after))
+        return statement
+
+
+@dataclass
+class AppointmentPage:
+    appointments: Sequence[Appointment]
+    latest_first: bool
+    # Passed back as ``after`` to get the next page; None on the last page.
+    next: str | None
+
+    @classmethod
+    def of(
+        cls, appointments: Sequence[Appointment], size: int, latest_first: bool
+    ) -> "AppointmentPage":
+        """Page of the first ``size`` of ``appointments``, fetched with a
+        limit of ``size + 1`` to tell whether there is a next page."""
+        page = appointments[:size]
+        more = len(appointments) > size
+        return cls(page, latest_first, page_key(page[-1]) if more else None)
+
+
+def page_key(appointment: Appointment) -> str:
+    return (
+        f"{appointment.schedule_block.start_datetime.isoformat()}"
+        f",{appointment.schedule_block_id}"
+    )
+
+
+def parse_page_key(key: str) -> tuple[datetime, int]:
+    """Inverse of ``page_key``; raises ``ValueError`` on a malformed key."""
+    start, _, schedule_block_id = key.rpartition(",")
+    return datetime.fromisoformat(start), int(schedule_block_id)
+
 
 class ScheduleBlock(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_scheduleblock_therapist_id_start_datetime",
+            "therapist_id",
+            "start_datetime",
+        ),
+    )
+
     id: Annotated[int | None, Field(primary_key=True)] = None
     therapist_id: Annotated[int | None, Field(foreign_key="therapist.id")] = None
     therapist: "Therapist" = Relationship(back_populates="schedule")
     start_datetime: datetime
     end_datetime: datetime
+    # Bumped on every change to the block or its appointment; keys rendered
+    # fragments of the block.
+    version: Annotated[int, Field(sa_column_kwargs={"server_default": "0"})] = 0
     appointment: Appointment | None = Relationship(back_populates="schedule_block")
 
     def create_appointment(self, client: Client) -> Appointment:
@@ -50,3 +153,187 @@ class ScheduleBlock(SQLModel, table=True):
         )
 
         return self.appointment
+
+
+class AvailabilityRule(SQLModel, table=True):
+    """A therapist's recurring weekly availability.
+
+    The therapist is free every ``weekday`` (0 is Sunday, like ``Schedule``
+    days) from ``start_hour`` to ``end_hour``, between ``valid_from`` and
+    ``valid_until`` inclusive. Free slots are computed from the rules; a
+    ``ScheduleBlock`` is only written once a slot is booked.
+    """
+
+    id: Annotated[int | None, Field(primary_key=True)] = None
+    therapist_id: Annotated[
+        int | None, Field(foreign_key="therapist.id", index=True)
+    ] = None
+    weekday: Annotated[int, Field(ge=0, lt=7)]
+    start_hour: Annotated[int, Field(ge=0, lt=24)]
+    end_hour: Annotated[int, Field(gt=0, le=24)]
+    valid_from: date
+    valid_until: date | None = None
+
+    def applies_to(self, day: date) -> bool:
+        return (
+            (day.weekday() + 1) % 7 == self.weekday
+            and self.valid_from <= day
+            and (self.valid_until is None or day <= self.valid_until)
+        )
+
+    def covers(self, start: datetime) -> bool:
+        return (
+            self.applies_to(start.date())
+            and start.minute == start.second == start.microsecond == 0
+            and self.start_hour <= start.hour < self.end_hour
+        )
+
+    def slots(self, day: date) -> Iterator[ScheduleBlock]:
+        """Unsaved one-hour blocks for ``day``, empty unless the rule applies."""
+        if not self.applies_to(day):
+            return
+        midnight = datetime.combine(day, datetime.min.time())
+        for hour in range(self.start_hour, self.end_hour):
+            start = midnight + timedelta(hours=hour)
+            yield ScheduleBlock(
+                therapist_id=self.therapist_id,
+                start_datetime=start,
+                end_datetime=start + timedelta(hours=1),
+            )
+
+    @staticmethod
+    def query(
+        therapist_id: int, start: date, end: date
+    ) -> SelectOfScalar["AvailabilityRule"]:
+        """Rules of ``therapist_id`` in effect on any day in ``[start, end)``."""
+        return select(AvailabilityRule).where(
+            AvailabilityRule.therapist_id == therapist_id,
+            AvailabilityRule.valid_from < end,
+            or_(
+                col(AvailabilityRule.valid_until).is_(None),
+                col(AvailabilityRule.valid_until) >= start,
+            ),
+        )
+
+
+# Hours of the schedule grids, passed to the templates as ``grid_hours``.
+GRID_HOURS = range(9, 17)
+
+
+def start_of_week(day: date | None = None) -> date:
+    today = day or date.today()
+    return today - timedelta((today.weekday() + 1) % 7)
+
+
+class ScheduleDay(dict[int, ScheduleBlock]):
+    """Hour-indexed blocks of one day; hours without a block map to ``None``."""
+
+    def __missing__(self, hour: int) -> None:
+        return None
+
+
+class Schedule:
+    """Sparse grid of a therapist's blocks, indexed as ``schedule[day][hour]``.
+
+    Days count from ``start`` (a Sunday), so a one-week schedule has days 0-6.
+    Hours left free by ``blocks`` are filled with unsaved blocks from the
+    availability ``rules``; those have no ``id`` until they are booked, and
+    those starting before ``now`` (the current time by default) are left out,
+    since they can no longer be booked. Blocks
+    are loaded with their appointment and client in a single query, and the
+    rules in a second one, so rendering the grid issues no further SQL.
+    """
+
+    def __init__(
+        self,
+        start: date,
+        blocks: Iterable[ScheduleBlock] = (),
+        weeks: int = 1,
+        rules: Iterable[AvailabilityRule] = (),
+        now: datetime | None = None,
+    ):
+        now = now or datetime.now()
+        self.start = start
+        self.weeks = weeks
+        self.days = [ScheduleDay() for _ in range(7 * weeks)]
+        for block in blocks:
+            offset = (block.start_datetime.date() - start).days
+            if 0 <= offset < len(self.days):
+                self.days[offset][block.start_datetime.hour] = block
+        rules = list(rules)
+        for offset, day in enumerate(self.days):
+            for rule in rules:
+                for slot in rule.slots(start + timedelta(days=offset)):
+                    if slot.start_datetime >= now:
+                        day.setdefault(slot.start_datetime.hour, slot)
+
+    def __getitem__(self, day: int) -> ScheduleDay:
+        return self.days[day]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __iter__(self) -> Iterator[ScheduleDay]:
+        return iter(self.days)
+
+    def week(self, n: int) -> list[ScheduleDay]:
+        return self.days[7 * n : 7 * (n + 1)]
+
+    @property
+    def blocks(self) -> list[ScheduleBlock]:
+        return [block for day in self.days for block in day.values()]
+
+    @staticmethod
+    def query(
+        therapist_id: int, start: date, weeks: int = 1
+    ) -> SelectOfScalar[ScheduleBlock]:
+        start_datetime = datetime.combine(start, datetime.min.time())
+        return (
+            select(ScheduleBlock)
+            .where(
+                ScheduleBlock.therapist_id == therapist_id,
+                ScheduleBlock.start_datetime >= start_datetime,
+                ScheduleBlock.start_datetime < start_datetime + timedelta(weeks=weeks),
+            )
+            .options(
+                joinedload(ScheduleBlock.appointment).joinedload(Appointment.client)
+            )
+        )
+
+    @classmethod
+    def load(
+        cls,
+        session: Session,
+        therapist_id: int,
+        day: date | None = None,
+        weeks: int = 1,
+        now: datetime | None = None,
+    ) -> "Schedule":
+        start = start_of_week(day)
+        end = start + timedelta(weeks=weeks)
+        return cls(
+            start,
+            session.exec(cls.query(therapist_id, start, weeks)),
+            weeks,
+            session.exec(AvailabilityRule.query(therapist_id, start, end)),
+            now,
+        )
+
+    @classmethod
+    async def load_async(
+        cls,
+        session: AsyncSession,
+        therapist_id: int,
+        day: date | None = None,
+        weeks: int = 1,
+        now: datetime | None = None,
+    ) -> "Schedule":
+        start = start_of_week(day)
+        end = start + timedelta(weeks=weeks)
+        return cls(
+            start,
+            await session.exec(cls.query(therapist_id, start, weeks)),
+            weeks,
+            await session.exec(AvailabilityRule.query(therapist_id, start, end)),
+            now,
+        )
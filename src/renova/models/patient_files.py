@@ -1,13 +1,19 @@
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Literal, Sequence
 
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index, tuple_
+from sqlalchemy.orm import defer
+from sqlmodel import Field, Relationship, Session, SQLModel, col, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from renova.models.therapists import Therapist
 from renova.models.clients import Client
 
 
 class MedicalChart(SQLModel, table=True):
+    __table_args__ = (Index("ix_medicalchart_client_id_date", "client_id", "date"),)
+
     id: Annotated[int | None, Field(primary_key=True)] = None
     client_id: Annotated[int | None, Field(foreign_key="patientfile.client_id")] = None
     date: datetime
@@ -15,10 +21,16 @@ class MedicalChart(SQLModel, table=True):
 
 
 class MedicalDocument(SQLModel, table=True):
+    __table_args__ = (Index("ix_medicaldocument_client_id_date", "client_id", "date"),)
+
     id: Annotated[int | None, Field(primary_key=True)] = None
     client_id: Annotated[int | None, Field(foreign_key="patientfile.client_id")] = None
     date: datetime
     hospital_name: str
+    # The file, if any, in renova.documents.DOCUMENTS.
+    content_hash: str | None = None
+    size: int | None = None
+    mime_type: str | None = None
 
 
 class Allergy(SQLModel, table=True):
@@ -61,16 +73,106 @@ class PatientFile(SQLModel, table=True):
         int | None, Field(foreign_key="client.id", primary_key=True)
     ] = None
     client: Client = Relationship(back_populates="patient_file")
-    primary_therapist_id: Annotated[int | None, Field(foreign_key="therapist.id")] = (
-        None
-    )
+    primary_therapist_id: Annotated[
+        int | None, Field(foreign_key="therapist.id", index=True)
+    ] = None
     primary_therapist: Therapist = Relationship(back_populates="patient_files")
     admission_date: datetime
     insurance_number: str
     blood_type: str
     is_active: bool
     discharge_date: datetime | None
-    medical_charts: list[MedicalChart] = Relationship()
-    medical_document: list[MedicalDocument] = Relationship()
+    # A file's history is unbounded: page through it with ``Timeline.load``.
+    medical_charts: list[MedicalChart] = Relationship(
+        sa_relationship_kwargs={"lazy": "raise"}
+    )
+    medical_document: list[MedicalDocument] = Relationship(
+        sa_relationship_kwargs={"lazy": "raise"}
+    )
     allergies: list[Allergy] = Relationship(link_model=PatientFileAllergyLink)
     medications: list[Medication] = Relationship(link_model=PatientFileMedicationLink)
+
+
+type TimelineKind = Literal["chart", "document"]
+type TimelineKey = tuple[datetime, TimelineKind, int]
+
+
+@dataclass
+class TimelineEntry:
+    kind: TimelineKind
+    record: MedicalChart | MedicalDocument
+
+    @property
+    def key(self) -> TimelineKey:
+        return self.record.date, self.kind, self.record.id
+
+
+@dataclass
+class Timeline:
+    """A page of a patient file's charts and documents, newest first.
+
+    Entries are ordered on ``(date, kind, id)``. Each kind is read with its own
+    query over the ``(client_id, date)`` index, limited to a page, and the two
+    are merged; a page costs two queries however long the history is. Chart
+    notes are not loaded, and touching one raises: they are read one at a time,
+    when asked for.
+    """
+
+    entries: Sequence[TimelineEntry]
+    # Passed back as ``after`` to get the next page; None on the last page.
+    next: str | None
+
+    @classmethod
+    def load(
+        cls, session: Session, client_id: int, after: TimelineKey | None, size: int
+    ) -> "Timeline":
+        entries = [
+            TimelineEntry(kind, record)
+            for kind, model in (("chart", MedicalChart), ("document", MedicalDocument))
+            for record in session.exec(
+                timeline_query(model, kind, client_id, after).limit(size + 1)
+            )
+        ]
+        entries.sort(key=lambda entry: entry.key, reverse=True)
+        page = entries[:size]
+        more = len(entries) > size
+        return cls(page, timeline_key(page[-1]) if more else None)
+
+
+def timeline_query(
+    model: type[MedicalChart] | type[MedicalDocument],
+    kind: TimelineKind,
+    client_id: int,
+    after: TimelineKey | None = None,
+) -> SelectOfScalar:
+    """``model``'s part of a client's timeline, strictly after ``after``."""
+    statement = (
+        select(model)
+        .where(model.client_id == client_id)
+        .order_by(col(model.date).desc(), col(model.id).desc())
+    )
+    if model is MedicalChart:
+        statement = statement.options(defer(MedicalChart.note, raiseload=True))
+    if after is not None:
+        date, after_kind, id = after
+        if kind == after_kind:
+            statement = statement.where(tuple_(model.date, model.id) < (date, id))
+        elif kind < after_kind:
+            # Sorts before ``after`` on the same date.
+            statement = statement.where(model.date <= date)
+        else:
+            statement = statement.where(model.date < date)
+    return statement
+
+
+def timeline_key(entry: TimelineEntry) -> str:
+    date, kind, id = entry.key
+    return f"{date.isoformat()},{kind},{id}"
+
+
+def parse_timeline_key(key: str) -> TimelineKey:
+    """Inverse of ``timeline_key``; raises ``ValueError`` on a malformed key."""
+    date, kind, id = key.split(",")
+    if kind not in ("chart", "document"):
+        raise ValueError(f"unknown timeline entry kind {kind!r}")
+    return datetime.fromisoformat(date), kind, int(id)
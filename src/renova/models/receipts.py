@@ -7,7 +7,7 @@ from sqlmodel import Field, Relationship, SQLModel
 class InventoryReceiptItem(SQLModel, table=True):
     id: Annotated[int | None, Field(default=None, primary_key=True)] = None
     receipt_id: Annotated[
-        int | None, Field(default=None, foreign_key="inventoryreceipt.id")
+        int | None, Field(default=None, foreign_key="inventoryreceipt.id", index=True)
     ]
     receipt: "InventoryReceipt" = Relationship(back_populates="items")
     name: str
@@ -18,7 +18,7 @@ class InventoryReceiptItem(SQLModel, table=True):
 
 class InventoryReceipt(SQLModel, table=True):
     id: Annotated[int | None, Field(default=None, primary_key=True)] = None
-    date: date
+    date: Annotated[date, Field(index=True)]
     store_name: str
     items: list[InventoryReceiptItem] = Relationship(back_populates="receipt")
 
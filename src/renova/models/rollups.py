@@ -0,0 +1,95 @@
+from datetime import date
+from typing import Annotated
+
+from sqlalchemy import Connection, delete, func, insert, true, update
+from sqlmodel import Field, Session, SQLModel, select
+
+from renova.db import upsert
+from renova.models.receipts import InventoryReceipt, InventoryReceiptItem
+
+__all__ = ["DailySpend", "DailyStock", "add_to_rollup", "rebuild_rollups"]
+
+
+class DailySpend(SQLModel, table=True):
+    """Receipt spend per product and day, maintained alongside the receipts."""
+
+    day: Annotated[date, Field(primary_key=True)]
+    product_name: Annotated[str, Field(primary_key=True)]
+    count: int = 0
+    spend: int = 0
+
+
+class DailyStock(SQLModel, table=True):
+    """Net stock movement per product and day.
+
+    ``received`` comes from receipts and can be rebuilt from them; ``adjusted``
+    comes from manual quantity adjustments and is only ever recorded here.
+    """
+
+    day: Annotated[date, Field(primary_key=True)]
+    product_name: Annotated[str, Field(primary_key=True)]
+    received: int = 0
+    adjusted: int = 0
+
+
+def add_to_rollup(
+    session: Session,
+    model: type[DailySpend] | type[DailyStock],
+    day: date,
+    product_name: str,
+    **amounts: int,
+) -> None:
+    """Add ``amounts`` to the ``(day, product_name)`` row of ``model``."""
+    statement = upsert(session, model).values(
+        day=day, product_name=product_name, **amounts
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["day", "product_name"],
+            set_={
+                name: getattr(model, name) + getattr(statement.excluded, name)
+                for name in amounts
+            },
+        )
+    )
+
+
+def rebuild_rollups(connection: Connection) -> None:
+    """Recompute every receipt-derived rollup column from the receipts."""
+    day = InventoryReceipt.date
+    name = InventoryReceiptItem.name
+    totals = (
+        select(
+            day,
+            name,
+            func.sum(InventoryReceiptItem.count),
+            func.sum(InventoryReceiptItem.count * InventoryReceiptItem.price),
+        )
+        .select_from(InventoryReceiptItem)
+        .join(InventoryReceipt)
+        # SQLite needs a WHERE clause to tell an upsert's SELECT from its ON.
+        .where(true())
+        .group_by(day, name)
+    )
+
+    connection.execute(delete(DailySpend))
+    connection.execute(
+        insert(DailySpend).from_select(
+            ["day", "product_name", "count", "spend"], totals
+        )
+    )
+
+    connection.execute(update(DailyStock).values(received=0))
+    received = upsert(connection, DailyStock).from_select(
+        ["day", "product_name", "received"],
+        totals.with_only_columns(day, name, func.sum(InventoryReceiptItem.count)),
+    )
+    connection.execute(
+        received.on_conflict_do_update(
+            index_elements=["day", "product_name"],
+            set_={"received": received.excluded.received},
+        )
+    )
+    connection.execute(
+        delete(DailyStock).where(DailyStock.received == 0, DailyStock.adjusted == 0)
+    )
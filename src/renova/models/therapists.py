@@ -1,8 +1,11 @@
+import re
 from datetime import date
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Annotated
 
-from sqlmodel import Relationship
+from sqlalchemy import Integer, column, table, update
+from sqlmodel import Field, Relationship, Session, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from renova.models.users import User
 
@@ -21,17 +24,55 @@ class Therapist(User, table=True):
     hiring_date: date
     years_of_experience: int
     void_cheque: str
-    status_of_work: StatusOfWork = StatusOfWork.pending
+    status_of_work: Annotated[StatusOfWork, Field(index=True)] = StatusOfWork.pending
+    # Bumped by every write to the therapist's schedule, availability or
+    # appointments; schedule pages derive their ETags from it.
+    schedule_version: Annotated[
+        int, Field(sa_column_kwargs={"server_default": "0"})
+    ] = 0
     schedule: list["ScheduleBlock"] = Relationship(back_populates="therapist")
     patient_files: list["PatientFile"] = Relationship(
         back_populates="primary_therapist"
     )
 
-    @property
-    def appointments(self):
-        return [s.appointment for s in self.schedule if s.appointment is not None]
-
     def confirm(self, status: StatusOfWork):
         if status == StatusOfWork.pending:
             return
         self.status_of_work = status
+
+
+def bump_schedule_version(session: Session, therapist_id: int | None) -> None:
+    """Mark ``therapist_id``'s schedule as changed in the current transaction."""
+    if therapist_id is None:
+        return
+    session.execute(
+        update(Therapist)
+        .where(Therapist.id == therapist_id)
+        .values(schedule_version=Therapist.schedule_version + 1)
+    )
+
+
+# External-content FTS5 index over therapist names, kept in sync by triggers
+# (see migration 3). It only exists on SQLite.
+therapist_fts = table(
+    "therapist_fts",
+    column("rowid", Integer),
+    column("rank"),
+    column("therapist_fts"),
+)
+
+
+def match_expression(search: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", search))
+
+
+def search_therapists(search: str, limit: int = 10) -> SelectOfScalar[Therapist]:
+    """Relevance-ranked prefix search over therapist names using FTS5."""
+    return (
+        select(Therapist)
+        .join(therapist_fts, therapist_fts.c.rowid == Therapist.id)
+        .where(therapist_fts.c.therapist_fts.op("MATCH")(match_expression(search)))
+        .order_by(therapist_fts.c.rank)
+        .limit(limit)
+    )
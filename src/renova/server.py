@@ -0,0 +1,55 @@
+"""Pre-forking production server.
+
+A gunicorn master imports ``renova.main:app`` once, brings the schema up to
+date, compiles every template and then forks uvicorn workers that share all of
+it copy-on-write. Workers restart after ``max_requests`` requests (with jitter
+so they do not all recycle at once) and get ``graceful_timeout`` seconds to
+finish in-flight requests on shutdown or reload (SIGTERM, SIGHUP).
+"""
+
+import os
+from typing import Any
+
+from gunicorn.app.base import BaseApplication
+
+from renova.db import ENGINE, dispose_engines
+from renova.migrations import migrate
+
+__all__ = ["Server", "default_workers"]
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def post_fork(server, worker) -> None:
+    # Connections opened by the master must never be used from a worker.
+    dispose_engines()
+
+
+class Server(BaseApplication):
+    def __init__(self, template_cache: str | None = None, **options: Any):
+        self.template_cache = template_cache
+        self.options = {
+            "worker_class": "uvicorn_worker.UvicornWorker",
+            "workers": default_workers(),
+            "preload_app": True,
+            "post_fork": post_fork,
+            "forwarded_allow_ips": "*",
+            "accesslog": "-",
+        } | {key: value for key, value in options.items() if value is not None}
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from renova.main import app
+        from renova.main.templates import warm_templates
+
+        # Migrate here, once, rather than racing in every worker's lifespan.
+        migrate()
+        ENGINE.dispose()
+        warm_templates(self.template_cache)
+        return app
@@ -1,44 +1,198 @@
+import os
+import sys
 import tempfile
+from collections import defaultdict
 from contextlib import contextmanager
-from importlib import import_module
+from datetime import date
 
+import greenlet
+import jwt
 import pytest
-from sqlmodel import Session, SQLModel, create_engine
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from renova.db import get_session
+import renova
+from renova.credentials import TOKEN_SECRET
+from renova.db import get_async_session, get_session
 from renova.logins import LoginContext
 from renova.main import app
 from renova.main.signup import SignupContext
+from renova.migrations import migrate
+from renova.models.therapists import StatusOfWork, Therapist
+from renova.models.users import User
 
 
 @contextmanager
 def get_mock_session():
     with tempfile.NamedTemporaryFile(delete=True) as file:
         engine = create_engine(f"sqlite:///{file.name}")
-        import_module("renova.models")
-
-        SQLModel.metadata.create_all(engine)
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{file.name}")
+        migrate(engine)
         with Session(engine) as session:
 
             def get_session_override():
                 return session
 
+            async def get_async_session_override():
+                async with AsyncSession(
+                    async_engine, expire_on_commit=False
+                ) as async_session:
+                    yield async_session
+
             try:
                 app.dependency_overrides[get_session] = get_session_override
+                app.dependency_overrides[get_async_session] = (
+                    get_async_session_override
+                )
                 yield session
             finally:
                 del app.dependency_overrides[get_session]
+                del app.dependency_overrides[get_async_session]
 
 
 @pytest.fixture
 def signup_ctx():
     with get_mock_session() as session:
-        ctx = SignupContext(session, None)
+        ctx = SignupContext(None, session, None)
         yield ctx
 
 
 @pytest.fixture
 def login_ctx():
     with get_mock_session() as session:
-        ctx = LoginContext(session, None)
+        ctx = LoginContext(None, session, None)
         yield ctx
+
+
+NAMES = {
+    "owner": ("own", "er"),
+    "therapist": ("thera", "pist"),
+    "client": ("cli", "ent"),
+}
+
+
+@pytest.fixture
+def make_user():
+    """Add a user of ``user_type`` to ``session``, committed and refreshed.
+
+    Details are placeholders, overridden by ``fields``; the email address is
+    ``<type>@example.com`` unless given, so pass one for a second user of a type::
+
+        therapist = make_user(session, Therapist)
+        other = make_user(session, Therapist, email_address="other@example.com")
+    """
+
+    def make[U: User](session: Session, user_type: type[U], **fields) -> U:
+        name = user_type.__name__.lower()
+        first_name, last_name = NAMES[name]
+        defaults = dict(
+            first_name=first_name,
+            last_name=last_name,
+            date_of_birth=date.today(),
+            gender="neutral",
+            pronouns="they/them",
+            email_address=f"{name}@example.com",
+            phone_number="(514) 999-9999",
+            address="nowhere",
+            hash="",
+        )
+        if user_type is Therapist:
+            defaults |= dict(
+                license_number="nan",
+                hiring_date=date.today(),
+                years_of_experience=0,
+                void_cheque="",
+                status_of_work=StatusOfWork.fulltime,
+            )
+        user = user_type(**defaults | fields)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+    return make
+
+
+@pytest.fixture
+def client_for():
+    """A ``TestClient`` logged in as ``user``, CSRF token included."""
+
+    def login(user: User) -> TestClient:
+        http = TestClient(app)
+        token = jwt.encode(
+            {"id": user.id, "type": type(user).__name__.lower()},
+            key=TOKEN_SECRET,
+            algorithm="HS256",
+        )
+        http.cookies.set("credential", token)
+        http.cookies.set("csrftoken", "token")
+        http.headers["X-CSRF-Token"] = "token"
+        return http
+
+    return login
+
+
+RENOVA_DIR = os.path.dirname(renova.__file__)
+TESTS_DIR = os.path.dirname(__file__)
+
+
+def call_site(frame) -> str:
+    """The innermost frame in renova code (templates included), else in a test.
+
+    Statements issued through the async engine run in a greenlet spawned by
+    SQLAlchemy, so the search continues into the frames it was spawned from.
+    """
+    current = greenlet.getcurrent()
+    fallback = None
+    while frame is not None or current is not None:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(RENOVA_DIR):
+                name = frame.f_code.co_name
+                return f"{os.path.relpath(filename, RENOVA_DIR)}:{frame.f_lineno} in {name}"
+            if fallback is None and filename.startswith(TESTS_DIR):
+                fallback = f"{os.path.relpath(filename, TESTS_DIR)}:{frame.f_lineno}"
+            frame = frame.f_back
+        current = current and current.parent
+        frame = current and current.gr_frame
+    return fallback or "<unknown>"
+
+
+@pytest.fixture
+def query_budget():
+    """Fail if the ``with`` block executes more than ``budget`` statements.
+
+    Counts statements on every engine, which in the tests are the mock
+    session's sync and async engines. On failure, reports the statements
+    grouped by the renova line that issued them::
+
+        with query_budget(4):
+            http.get("/home")
+    """
+
+    @contextmanager
+    def budget(limit: int):
+        statements: list[tuple[str, str]] = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append((call_site(sys._getframe(1)), statement))
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        if len(statements) > limit:
+            by_site: dict[str, list[str]] = defaultdict(list)
+            for site, statement in statements:
+                by_site[site].append(statement)
+            report = [f"{len(statements)} statements over a budget of {limit}:"]
+            for site, issued in sorted(by_site.items(), key=lambda i: -len(i[1])):
+                report.append(f"  {len(issued)} x {site}")
+                report += [f"      {' '.join(s.split())}" for s in issued]
+            pytest.fail("\n".join(report), pytrace=False)
+
+    return budget
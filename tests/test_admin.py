@@ -0,0 +1,137 @@
+import csv
+import tracemalloc
+from datetime import date
+from io import StringIO
+
+from sqlalchemy import delete, insert
+
+from renova.main.admin import ExpenseGrouping, OwnerContext
+from renova.models.clients import Client
+from renova.models.products import InventoryProduct
+from renova.models.receipts import InventoryReceipt, InventoryReceiptItem
+from renova.models.users import Owner
+
+
+def add_products(session, count: int) -> None:
+    session.execute(delete(InventoryProduct))
+    session.execute(
+        insert(InventoryProduct),
+        [
+            {"name": f"product {i:08}", "quantity": i, "supplier": "s", "price": 1}
+            for i in range(count)
+        ],
+    )
+    session.commit()
+
+
+def report_peak(ctx: OwnerContext) -> tuple[int, int]:
+    rows = 0
+    tracemalloc.start()
+    try:
+        for chunk in ctx.generate_inventory_report():
+            rows += chunk.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return rows, peak
+
+
+def test_inventory_report_memory_is_constant(login_ctx):
+    ctx = OwnerContext(None, login_ctx.session, None)
+
+    add_products(login_ctx.session, 2_000)
+    small_rows, small_peak = report_peak(ctx)
+    add_products(login_ctx.session, 100_000)
+    large_rows, large_peak = report_peak(ctx)
+
+    assert (small_rows, large_rows) == (2_000, 100_000)
+    assert large_peak < small_peak * 1.5
+
+
+def test_inventory_report_download(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    owner = make_user(session, Owner)
+    add_products(session, 2_500)
+
+    response = client_for(owner).get("/admin/inventory_report")
+    assert response.status_code == 200
+    rows = list(csv.reader(StringIO(response.text)))
+    assert len(rows) == 2_500
+    assert rows[42] == ["product 00000042", "42"]
+
+
+def test_owner_routes_reject_other_credential_types(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    owner = make_user(session, Owner)
+    client = make_user(session, Client)
+    assert client.id == owner.id
+
+    http = client_for(client)
+    for path in (
+        "/admin",
+        "/admin/inventory_report",
+        "/admin/expense_report?start_date=2024-01-01&end_date=2024-02-01",
+        "/admin/daily_spend?start_date=2024-01-01&end_date=2024-02-01",
+    ):
+        assert http.get(path).status_code == 403, path
+    assert client_for(owner).get("/admin/inventory_report").status_code == 200
+    assert client_for(owner).get("/admin").status_code == 200
+
+
+def test_expense_report_groups_in_date_range(login_ctx):
+    session = login_ctx.session
+    session.add_all(
+        [
+            InventoryReceipt(
+                date=date(2024, 1, 31),
+                store_name="before",
+                items=[
+                    InventoryReceiptItem(
+                        name="gauze", count=100, price=1, supplier_name="a"
+                    )
+                ],
+            ),
+            InventoryReceipt(
+                date=date(2024, 2, 1),
+                store_name="first",
+                items=[
+                    InventoryReceiptItem(
+                        name="gauze", count=2, price=3, supplier_name="a"
+                    ),
+                    InventoryReceiptItem(
+                        name="tape", count=1, price=5, supplier_name="b"
+                    ),
+                ],
+            ),
+            InventoryReceipt(
+                date=date(2024, 3, 15),
+                store_name="second",
+                items=[
+                    InventoryReceiptItem(
+                        name="gauze", count=1, price=4, supplier_name="b"
+                    )
+                ],
+            ),
+            InventoryReceipt(
+                date=date(2024, 4, 1),
+                store_name="after",
+                items=[
+                    InventoryReceiptItem(
+                        name="tape", count=100, price=1, supplier_name="b"
+                    )
+                ],
+            ),
+        ]
+    )
+    session.commit()
+    ctx = OwnerContext(None, session, None)
+
+    def report(group_by):
+        content = b"".join(
+            ctx.generate_expense_report(date(2024, 2, 1), date(2024, 4, 1), group_by)
+        )
+        return list(csv.reader(StringIO(content.decode())))
+
+    assert report(ExpenseGrouping.product) == [["gauze", "10"], ["tape", "5"]]
+    assert report(ExpenseGrouping.supplier) == [["a", "6"], ["b", "9"]]
+    assert report(ExpenseGrouping.month) == [["2024-02", "11"], ["2024-03", "4"]]
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta
+
+from sqlmodel import select
+
+from renova.models.appointments import (
+    Appointment,
+    AppointmentStatus,
+    AvailabilityRule,
+    Schedule,
+    ScheduleBlock,
+    start_of_week,
+)
+from renova.models.clients import Client
+from renova.models.therapists import Therapist
+
+
+def test_schedule_loads_week_in_two_queries(login_ctx, query_budget, make_user):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    week = datetime.combine(start_of_week(date(2024, 6, 12)), datetime.min.time())
+    assert week.date() == date(2024, 6, 9)
+
+    def block(offset: timedelta) -> ScheduleBlock:
+        return ScheduleBlock(
+            therapist=therapist,
+            start_datetime=week + offset,
+            end_datetime=week + offset + timedelta(hours=1),
+        )
+
+    first, booked, next_week = (
+        block(timedelta()),
+        block(timedelta(days=3, hours=10)),
+        block(timedelta(weeks=1, hours=9)),
+    )
+    session.add_all([first, booked, next_week])
+    session.add(Appointment(schedule_block=booked, client=client))
+    session.commit()
+    therapist_id, first_id, next_week_id = therapist.id, first.id, next_week.id
+    session.expunge_all()
+
+    with query_budget(2) as statements:
+        schedule = Schedule.load(session, therapist_id, date(2024, 6, 12), weeks=2)
+        assert schedule[0][0].id == first_id
+        assert schedule[3][9] is None
+        assert schedule[3][10].appointment.client.full_name == "cli ent"
+        assert schedule[3][10].appointment.appointment_status == AppointmentStatus.pending
+        assert schedule.week(1)[0][9].id == next_week_id
+    # One query for the blocks, one for the availability rules.
+    assert len(statements) == 2
+
+
+def test_schedule_fills_free_hours_from_rules(login_ctx, make_user):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    week = datetime(2024, 6, 9)
+    manual = ScheduleBlock(
+        therapist=therapist,
+        start_datetime=week + timedelta(days=1, hours=10),
+        end_datetime=week + timedelta(days=1, hours=11),
+    )
+    session.add(manual)
+    session.add_all(
+        AvailabilityRule(
+            therapist_id=therapist.id,
+            weekday=weekday,
+            start_hour=9,
+            end_hour=17,
+            valid_from=date(2024, 1, 1),
+            valid_until=date(2024, 6, 12),
+        )
+        for weekday in range(1, 6)
+    )
+    session.commit()
+
+    schedule = Schedule.load(session, therapist.id, week.date(), weeks=2, now=week)
+    assert schedule[1][10].id == manual.id
+    assert schedule[1][9].id is None
+    assert schedule[1][9].start_datetime == week + timedelta(days=1, hours=9)
+    assert schedule[1][17] is None
+    assert schedule[0][9] is None
+    assert schedule[3][16] is not None
+    assert schedule[4][9] is None
+    assert sum(len(day) for day in schedule) == 3 * 8
+    assert len(session.exec(select(ScheduleBlock)).all()) == 1
+
+    # Slots that have started can't be booked any more; real blocks stay.
+    now = week + timedelta(days=2, hours=12)
+    schedule = Schedule.load(session, therapist.id, week.date(), weeks=2, now=now)
+    assert schedule[1][10].id == manual.id
+    assert schedule[1][9] is None and schedule[2][11] is None
+    assert schedule[2][12].start_datetime == now
+    assert sum(len(day) for day in schedule) == 1 + 5 + 8
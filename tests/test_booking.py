@@ -0,0 +1,106 @@
+import multiprocessing
+import tempfile
+import threading
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from renova.credentials import Credential
+from renova.main.client import ClientContext, SlotTakenError
+from renova.migrations import migrate
+from renova.models.appointments import Appointment, ScheduleBlock
+from renova.models.clients import Client
+from renova.models.therapists import Therapist
+
+CONTENDERS = 16
+
+
+@pytest.fixture
+def popular_slot(make_user):
+    """A database file with one schedule block and ``CONTENDERS`` clients."""
+    with tempfile.NamedTemporaryFile(suffix=".db") as file:
+        url = f"sqlite:///{file.name}"
+        engine = create_engine(url)
+        migrate(engine)
+        with Session(engine) as session:
+            block = ScheduleBlock(
+                therapist=make_user(session, Therapist),
+                start_datetime=datetime(2025, 1, 6, 10),
+                end_datetime=datetime(2025, 1, 6, 11),
+            )
+            clients = [
+                make_user(session, Client, email_address=f"client{i}@example.com")
+                for i in range(CONTENDERS)
+            ]
+            session.add(block)
+            session.commit()
+            yield url, block.id, [client.id for client in clients]
+        engine.dispose()
+
+
+def book(url: str, schedule_block_id: int, client_id: int, barrier) -> str:
+    engine = create_engine(url)
+    try:
+        with Session(engine) as session:
+            ctx = ClientContext(None, session, Credential(id=client_id, type="client"))
+            schedule_block = ctx.get_schedule_block(schedule_block_id)
+            barrier.wait()
+            try:
+                ctx.book_appointment(schedule_block)
+            except SlotTakenError:
+                return "taken"
+            return "booked"
+    finally:
+        engine.dispose()
+
+
+def process_worker(url, schedule_block_id, client_id, barrier, results):
+    results.put(book(url, schedule_block_id, client_id, barrier))
+
+
+def assert_one_winner(url: str, outcomes: list[str]):
+    assert sorted(outcomes) == ["booked"] + ["taken"] * (CONTENDERS - 1)
+    engine = create_engine(url)
+    with Session(engine) as session:
+        assert len(session.exec(select(Appointment)).all()) == 1
+    engine.dispose()
+
+
+def test_concurrent_threads_book_a_slot_once(popular_slot):
+    url, schedule_block_id, client_ids = popular_slot
+    barrier = threading.Barrier(CONTENDERS)
+    outcomes: list[str] = []
+
+    def worker(client_id: int):
+        outcomes.append(book(url, schedule_block_id, client_id, barrier))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in client_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_one_winner(url, outcomes)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_concurrent_processes_book_a_slot_once(popular_slot):
+    url, schedule_block_id, client_ids = popular_slot
+    mp = multiprocessing.get_context("fork")
+    barrier = mp.Barrier(CONTENDERS)
+    results = mp.Queue()
+    processes = [
+        mp.Process(
+            target=process_worker,
+            args=(url, schedule_block_id, client_id, barrier, results),
+        )
+        for client_id in client_ids
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+    assert_one_winner(url, outcomes)
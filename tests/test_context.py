@@ -0,0 +1,55 @@
+import pytest
+
+from renova.context import IDENTITY_CACHE, Context
+from renova.credentials import Credential
+from renova.models.clients import Client
+
+
+def test_identity_is_memoized_per_request(login_ctx, query_budget, make_user):
+    client = make_user(login_ctx.session, Client, first_name="foo", last_name="bar")
+    login_ctx.session.expunge_all()
+    ctx = Context(None, login_ctx.session, Credential(id=client.id, type="client"))
+
+    with query_budget(1) as statements:
+        assert ctx.client is ctx.client
+        assert ctx.user is ctx.client
+    assert len(statements) == 1
+
+
+def test_identity_cache_across_requests(
+    login_ctx, monkeypatch, query_budget, make_user
+):
+    monkeypatch.setattr(IDENTITY_CACHE, "ttl", 60.0)
+    IDENTITY_CACHE.clear()
+    client = make_user(login_ctx.session, Client, first_name="foo", last_name="bar")
+    credential = Credential(id=client.id, type="client")
+    login_ctx.session.expunge_all()
+    Context(None, login_ctx.session, credential).client
+    login_ctx.session.expunge_all()
+
+    with query_budget(0):
+        cached = Context(None, login_ctx.session, credential).client
+    assert cached.full_name == "foo bar"
+
+    ctx = Context(None, login_ctx.session, credential)
+    ctx._invalidate_user(ctx.client)
+    login_ctx.session.expunge_all()
+    with query_budget(1) as statements:
+        Context(None, login_ctx.session, credential).client
+    assert len(statements) == 1
+    IDENTITY_CACHE.clear()
+
+
+def test_query_budget_reports_statements_by_call_site(
+    login_ctx, query_budget, make_user
+):
+    client = make_user(login_ctx.session, Client, first_name="foo", last_name="bar")
+    credential = Credential(id=client.id, type="client")
+    with pytest.raises(pytest.fail.Exception) as failure:
+        with query_budget(1):
+            for _ in range(2):
+                login_ctx.session.expunge_all()
+                Context(None, login_ctx.session, credential).client
+    report = str(failure.value)
+    assert report.startswith("2 statements over a budget of 1:")
+    assert "  2 x context.py:" in report and "in _get_user" in report
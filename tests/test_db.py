@@ -0,0 +1,120 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import Session
+from starlette.requests import Request
+
+from renova.credentials import Credential
+
+from renova.db import (
+    SQLITE_PRAGMAS,
+    SQLITE_READER_PRAGMAS,
+    create_sqlite_engine,
+    split_url,
+)
+from renova.documents import StoredFile
+from renova.main import database_busy, pool_busy
+from renova.main.therapist import TherapistContext
+from renova.migrations import migrate
+from renova.main.templates import templates, warm_templates
+from renova.models.clients import Client
+from renova.models.therapists import Therapist
+
+
+def test_split_url():
+    sync_url, async_url = split_url("sqlite:///renova.db")
+    assert async_url.drivername == "sqlite+aiosqlite"
+    assert split_url(async_url) == (sync_url, async_url)
+    # Bookings and rollups need INSERT ... ON CONFLICT.
+    with pytest.raises(ValueError):
+        split_url("mysql://renova@localhost/renova")
+
+
+def test_production_pragmas(tmp_path):
+    url = f"sqlite:///{tmp_path / 'renova.db'}"
+    writer = create_sqlite_engine(url, pool_size=1, max_overflow=0)
+    reader = create_sqlite_engine(url, pragmas=SQLITE_READER_PRAGMAS)
+
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_locked_database_is_503(tmp_path):
+    url = f"sqlite:///{tmp_path / 'renova.db'}"
+    engine = create_sqlite_engine(url, pragmas=SQLITE_PRAGMAS | {"busy_timeout": 50})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    holder = sqlite3.connect(tmp_path / "renova.db", isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(OperationalError) as locked, engine.begin() as conn:
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+    request = Request({"type": "http", "method": "PUT", "path": "/", "headers": []})
+    response = asyncio.run(database_busy(request, locked.value))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = asyncio.run(pool_busy(request, PoolTimeoutError()))
+    assert response.status_code == 503
+
+
+def test_reads_leave_the_writer_free(tmp_path, make_user):
+    url = f"sqlite:///{tmp_path / 'renova.db'}"
+    writer = create_sqlite_engine(url, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    reader = create_sqlite_engine(url, pragmas=SQLITE_READER_PRAGMAS)
+    migrate(writer)
+    with Session(writer) as session:
+        therapist, client = make_user(session, Therapist), make_user(session, Client)
+        therapist_id, client_id = therapist.id, client.id
+    credential = Credential(id=therapist_id, type="therapist")
+
+    with Session(writer) as session, Session(reader) as read_session:
+        ctx = TherapistContext(None, session, credential, read_session)
+        ctx.therapist
+        ctx.get_availability_rules()
+        ctx.get_blocks()
+        assert writer.pool.checkedout() == 0
+
+        ctx.create_schedule_block(datetime(2024, 6, 10, 9))
+        patient_file = ctx.update_patient_file(
+            client_id, datetime(2024, 1, 1), "000000000", "o", True, None
+        )
+        assert patient_file.primary_therapist_id == therapist_id
+        # Uploads write their row through the same single connection.
+        document = ctx.add_document(
+            client_id,
+            "General",
+            datetime(2024, 6, 1),
+            "application/pdf",
+            StoredFile("0" * 64, 1),
+        )
+        assert document.id is not None
+    assert writer.pool.checkedout() == 0
+
+
+def test_warm_templates(tmp_path):
+    env = templates.env
+    try:
+        assert warm_templates(str(tmp_path)) > 20
+        assert not env.auto_reload
+        assert list(tmp_path.iterdir())
+    finally:
+        env.auto_reload = True
+        env.bytecode_cache = None
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+from datetime import datetime
+
+import pytest
+from sqlmodel import select
+
+from renova.documents import DOCUMENTS, DocumentStore, DocumentTooLargeError
+from renova.models.clients import Client
+from renova.models.patient_files import MedicalDocument, PatientFile
+from renova.models.therapists import Therapist
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def test_store_deduplicates(tmp_path):
+    store = DocumentStore(tmp_path, max_size=10_000)
+    data = bytes(range(256)) * 20
+
+    first = asyncio.run(store.put(chunked(data, 100)))
+    second = asyncio.run(store.put(chunked(data, 7)))
+
+    assert first == second
+    assert first.content_hash == hashlib.sha256(data).hexdigest()
+    assert first.size == len(data)
+    assert store.path(first.content_hash).read_bytes() == data
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == [
+        store.path(first.content_hash)
+    ]
+
+
+def test_store_rejects_large_files(tmp_path):
+    store = DocumentStore(tmp_path, max_size=100)
+    with pytest.raises(DocumentTooLargeError):
+        asyncio.run(store.put(chunked(b"x" * 101, 10)))
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+    with pytest.raises(ValueError):
+        store.path("../../etc/passwd")
+
+
+@pytest.fixture
+def documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(DOCUMENTS, "root", tmp_path)
+    return DOCUMENTS
+
+
+def test_document_upload_and_download(
+    login_ctx, documents, monkeypatch, make_user, client_for
+):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    session.add(
+        PatientFile(
+            admission_date=datetime(2020, 1, 1),
+            insurance_number="000000000",
+            blood_type="o",
+            is_active=True,
+            discharge_date=None,
+            client=client,
+            primary_therapist=therapist,
+        )
+    )
+    session.commit()
+    http = client_for(therapist)
+    url = f"/clients/{client.id}/documents"
+    data = b"%PDF-1.4 " + bytes(range(256)) * 100
+
+    for _ in range(2):
+        upload = http.post(
+            url,
+            params={"hospital_name": "General", "date": "2024-06-09T10:00"},
+            content=data,
+            headers={"Content-Type": "application/pdf"},
+        )
+        assert upload.status_code == 201
+        assert "document from" in upload.text
+    rows = session.exec(
+        select(MedicalDocument).where(MedicalDocument.client_id == client.id)
+    ).all()
+    assert len(rows) == 2
+    assert {(r.content_hash, r.size, r.mime_type) for r in rows} == {
+        (hashlib.sha256(data).hexdigest(), len(data), "application/pdf")
+    }
+    assert len([p for p in documents.root.rglob("*") if p.is_file()]) == 1
+
+    download = http.get(f"{url}/{rows[0].id}")
+    assert download.status_code == 200
+    assert download.headers["content-type"] == "application/pdf"
+    assert download.headers["content-disposition"].startswith("inline;")
+    assert download.headers["x-content-type-options"] == "nosniff"
+    assert download.content == data
+    partial = http.get(f"{url}/{rows[0].id}", headers={"Range": "bytes=0-7"})
+    assert partial.status_code == 206 and partial.content == b"%PDF-1.4"
+
+    other = make_user(session, Therapist, email_address="other@example.com")
+    assert client_for(other).get(f"{url}/{rows[0].id}").status_code == 403
+    forbidden = client_for(other).post(
+        url, params={"hospital_name": "General"}, content=data
+    )
+    assert forbidden.status_code == 403
+    missing = http.post(
+        "/clients/0/documents", params={"hospital_name": "General"}, content=data
+    )
+    assert missing.status_code == 404
+
+    page = http.post(
+        url,
+        params={"hospital_name": "General"},
+        content=b"<script>alert(1)</script>",
+        headers={"Content-Type": "text/html; charset=utf-8"},
+    )
+    html = session.exec(
+        select(MedicalDocument).where(MedicalDocument.mime_type == "text/html")
+    ).one()
+    assert page.status_code == 201
+    download = http.get(f"{url}/{html.id}")
+    assert download.headers["content-type"] == "application/octet-stream"
+    assert download.headers["content-disposition"].startswith("attachment;")
+    assert download.headers["x-content-type-options"] == "nosniff"
+
+    monkeypatch.setattr(documents, "max_size", 100)
+    too_large = http.post(url, params={"hospital_name": "General"}, content=data)
+    assert too_large.status_code == 413
+    assert len(session.exec(select(MedicalDocument)).all()) == 3
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from renova.events import EVENTS, REFRESH, Broker, BrokerFullError, publish_on_commit
+from renova.main import app
+from renova.main import therapist as therapist_module
+from renova.main.therapist import changed_cells, sse_message
+from renova.models.appointments import ScheduleBlock, start_of_week
+from renova.models.clients import Client
+from renova.models.therapists import Therapist, bump_schedule_version
+
+
+def test_broker_fans_out_across_threads_and_bounds_queues():
+    async def scenario():
+        broker = Broker(max_subscribers=2, per_topic=1, queue_size=2)
+        first = broker.subscribe(1)
+        second = broker.subscribe(2)
+        with pytest.raises(BrokerFullError):
+            broker.subscribe(1)
+        with pytest.raises(BrokerFullError):
+            broker.subscribe(3)
+
+        start = datetime(2025, 1, 6, 10)
+        thread = threading.Thread(target=broker.publish, args=(1, start, start))
+        thread.start()
+        thread.join()
+        assert await first.get() == {start}
+
+        broker.publish(1, *(start + timedelta(hours=i) for i in range(5)))
+        assert await first.get() == {REFRESH}
+        assert second._queue.empty()
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        assert len(broker) == 0
+
+    asyncio.run(scenario())
+
+
+def test_changes_are_published_on_commit_only(login_ctx, monkeypatch):
+    session = login_ctx.session
+    published = []
+    monkeypatch.setattr(
+        "renova.events.EVENTS.publish",
+        lambda topic, *items: published.append((topic, set(items))),
+    )
+    start = datetime(2025, 1, 6, 10)
+    session.exec(select(ScheduleBlock)).all()
+    publish_on_commit(session, 1, start)
+    session.rollback()
+    session.commit()
+    assert published == []
+
+    publish_on_commit(session, 1, start)
+    publish_on_commit(session, 1, start, REFRESH)
+    session.commit()
+    assert published == [(1, {start, REFRESH})]
+
+
+def test_changed_cells_and_messages():
+    week = start_of_week()
+    monday = datetime.combine(week, datetime.min.time()) + timedelta(days=1)
+    starts = {monday + timedelta(hours=10), monday + timedelta(hours=20)}
+    assert changed_cells(week, starts) == [(1, 10)]
+    assert len(changed_cells(week, {REFRESH})) == 56
+    assert sse_message("schedule", "<a>\n</a>") == (
+        "event: schedule\ndata: <a>\ndata: </a>\n\n"
+    )
+
+
+async def open_stream(http, path):
+    """Start a GET on the app and return (next body chunk, disconnect)."""
+    chunks: asyncio.Queue[str] = asyncio.Queue()
+    disconnected = asyncio.Event()
+    cookies = "; ".join(f"{name}={value}" for name, value in http.cookies.items())
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookies.encode())],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            await chunks.put(message["body"].decode())
+
+    task = asyncio.create_task(app(scope, receive, send))
+
+    async def next_chunk():
+        return await asyncio.wait_for(chunks.get(), 5)
+
+    async def disconnect():
+        disconnected.set()
+        await asyncio.wait_for(task, 5)
+
+    return next_chunk, disconnect
+
+
+def test_dashboard_stream_sends_changed_cells(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    start = datetime.combine(start_of_week(), datetime.min.time()) + timedelta(
+        days=1, hours=10
+    )
+    block = ScheduleBlock(
+        therapist=therapist, start_datetime=start, end_datetime=start + timedelta(1)
+    )
+    session.add(block)
+    session.commit()
+    block_id = block.id
+    dashboard = client_for(therapist)
+    booking = client_for(client)
+
+    async def scenario():
+        next_chunk, disconnect = await open_stream(dashboard, "/dashboard/events")
+        assert await next_chunk() == "retry: 5000\n\n"
+        response = await asyncio.to_thread(
+            booking.put, f"/appointments/{block_id}", data={"weekday": 1, "hour": 10}
+        )
+        assert response.status_code == 200
+        message = await next_chunk()
+        assert message.startswith("event: schedule\n")
+        assert 'id="cell-1-10"' in message and 'hx-swap-oob="true"' in message
+        assert f"/schedule/{block_id}/confirm" in message
+        await disconnect()
+        assert len(EVENTS) == 0
+
+    asyncio.run(scenario())
+
+
+def test_dashboard_stream_catches_writes_from_other_workers(
+    login_ctx, monkeypatch, make_user, client_for
+):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    therapist_id = therapist.id
+    dashboard = client_for(therapist)
+    monkeypatch.setattr(therapist_module, "SSE_KEEPALIVE", 0.05)
+
+    async def scenario():
+        next_chunk, disconnect = await open_stream(dashboard, "/dashboard/events")
+        assert await next_chunk() == "retry: 5000\n\n"
+        assert await next_chunk() == ": keep-alive\n\n"
+        # A write committed by another process: nothing is published here.
+        await asyncio.to_thread(bump_and_commit, session, therapist_id)
+        message = await next_chunk()
+        assert message.startswith("event: schedule\n")
+        assert 'id="cell-0-9"' in message and 'id="cell-6-16"' in message
+        assert await next_chunk() == ": keep-alive\n\n"
+        await disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_dashboard_stream_ignores_writes_outside_the_grid(
+    login_ctx, monkeypatch, make_user, client_for
+):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    therapist_id = therapist.id
+    dashboard = client_for(therapist)
+    monkeypatch.setattr(therapist_module, "SSE_KEEPALIVE", 0.05)
+
+    async def scenario():
+        next_chunk, disconnect = await open_stream(dashboard, "/dashboard/events")
+        assert await next_chunk() == "retry: 5000\n\n"
+        assert await next_chunk() == ": keep-alive\n\n"
+        # Published here but not in this week, so no cell changes; the stream
+        # still takes the new version and does not refresh on the next tick.
+        last_year = datetime.now() - timedelta(days=365)
+        await asyncio.to_thread(bump_and_commit, session, therapist_id, last_year)
+        assert await next_chunk() == ": keep-alive\n\n"
+        await disconnect()
+
+    asyncio.run(scenario())
+
+
+def bump_and_commit(session, therapist_id, *starts):
+    bump_schedule_version(session, therapist_id)
+    publish_on_commit(session, therapist_id, *starts)
+    session.commit()
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from renova.main.fragments import FRAGMENTS, FragmentCache
+from renova.models.appointments import ScheduleBlock, start_of_week
+from renova.models.clients import Client
+from renova.models.therapists import Therapist
+
+
+def test_fragment_cache_evicts_and_invalidates():
+    cache = FragmentCache(maxsize=2)
+    cache.put(("a", 1), 1, "one")
+    cache.put(("b", 1), 1, "one again")
+    cache.put(("c", 2), 2, "two")
+    assert cache.get(("a", 1)) is None
+    assert cache.get(("b", 1)) == "one again"
+
+    cache.invalidate([1])
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("c", 2)) == "two"
+    assert len(cache) == 1
+
+
+def test_unchanged_cells_are_served_from_cache(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    start = datetime.combine(start_of_week(), datetime.min.time()) + timedelta(
+        days=1, hours=10
+    )
+    block = ScheduleBlock(
+        therapist=therapist, start_datetime=start, end_datetime=start + timedelta(1)
+    )
+    session.add(block)
+    session.commit()
+    block_id = block.id
+    FRAGMENTS.clear()
+
+    dashboard = client_for(therapist)
+    first = dashboard.get("/dashboard")
+    assert (FRAGMENTS.hits, FRAGMENTS.misses) == (0, 56)
+    second = dashboard.get("/dashboard")
+    assert (FRAGMENTS.hits, FRAGMENTS.misses) == (56, 56)
+    assert first.text == second.text
+
+    booking = client_for(client)
+    response = booking.put(f"/appointments/{block_id}", data={"weekday": 1, "hour": 10})
+    assert response.status_code == 200
+    session.expire_all()
+    assert session.get(ScheduleBlock, block_id).version == 1
+
+    third = dashboard.get("/dashboard")
+    assert FRAGMENTS.misses == 57
+    assert f'hx-put="/schedule/{block_id}/confirm"' in third.text
+    assert f'hx-put="/schedule/{block_id}/confirm"' not in second.text
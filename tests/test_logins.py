@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from renova.hashing import HashingPool
+
+
+def test_verify_wrong_password(login_ctx):
+    hash = login_ctx.hash("some password")
+    assert login_ctx.password_hasher.verify(hash, "some password")
+    assert not login_ctx.verify(type("U", (), {"hash": hash})(), "wrong password")
+
+
+def test_hashing_pool_round_trip():
+    pool = HashingPool(workers=1, pending=4)
+
+    async def run():
+        hash = await pool.hash("some password")
+        return (
+            await pool.verify(hash, "some password"),
+            await pool.verify(hash, "wrong password"),
+        )
+
+    try:
+        assert asyncio.run(run()) == ((True, False), (False, False))
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_pool_is_bounded():
+    pool = HashingPool(workers=0, pending=0)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(pool.hash("some password"))
+    assert e.value.status_code == 503
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from renova.metrics import METRICS, Histogram, RequestStats, _stats
+from renova.models.therapists import Therapist
+from renova.models.users import Owner
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram([1, 5])
+    for value in (0.5, 1, 3, 7):
+        histogram.observe(value)
+    assert list(histogram.samples()) == [("1", 2), ("5", 3), ("+Inf", 4)]
+    assert (histogram.sum, histogram.count) == (11.5, 4)
+
+
+def test_metrics_endpoint(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    owner = make_user(session, Owner)
+    METRICS.clear()
+
+    assert client_for(therapist).get("/dashboard").status_code == 200
+    assert client_for(therapist).get("/admin/metrics").status_code == 403
+
+    labels = {"method": "GET", "route": "/dashboard"}
+    assert METRICS.get("renova_request_duration_seconds", **labels).count == 1
+    assert METRICS.get("renova_request_sql_statements", **labels).sum > 0
+    assert METRICS.get("renova_request_template_seconds", **labels).sum > 0
+    assert METRICS.get("renova_response_size_bytes", **labels).sum > 1000
+    assert METRICS.get(
+        "renova_template_render_seconds", template="pages/dashboard.html"
+    )
+
+    response = client_for(owner).get("/admin/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE renova_request_duration_seconds histogram" in text
+    assert (
+        'renova_request_duration_seconds_count{method="GET",route="/dashboard"} 1'
+        in text
+    )
+    assert (
+        'renova_request_sql_statements_bucket{method="GET",route="/dashboard",le="+Inf"} 1'
+        in text
+    )
+    assert 'route="/admin/metrics"' in text  # the forbidden request
+    assert "renova_fragment_cache_misses_total " in text
+
+
+def test_failed_statements_are_timed_and_popped():
+    engine = create_engine("sqlite://")
+    stats = RequestStats()
+    token = _stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            assert conn.info["renova_query_start"] == []
+    finally:
+        _stats.reset(token)
+    assert stats.sql_statements == 2
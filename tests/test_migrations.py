@@ -0,0 +1,278 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import select
+
+from renova.migrations import MIGRATIONS, migrate, query_plan
+from renova.models import (
+    Appointment,
+    AppointmentStatus,
+    AvailabilityRule,
+    Client,
+    InventoryReceipt,
+    MedicalChart,
+    MedicalDocument,
+    PatientFile,
+    StatusOfWork,
+    Therapist,
+)
+from renova.models.appointments import Schedule
+from renova.models.patient_files import timeline_query
+
+# The tables as the first release created them, before any migration existed.
+# Frozen on purpose: the upgrade test must not follow the models as they change.
+BASELINE_SCHEMA = """
+CREATE TABLE owner (
+    id INTEGER NOT NULL,
+    first_name VARCHAR NOT NULL,
+    last_name VARCHAR NOT NULL,
+    date_of_birth DATE NOT NULL,
+    gender VARCHAR NOT NULL,
+    pronouns VARCHAR NOT NULL,
+    email_address VARCHAR NOT NULL,
+    phone_number VARCHAR NOT NULL,
+    address VARCHAR NOT NULL,
+    hash VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (email_address)
+);
+CREATE TABLE therapist (
+    id INTEGER NOT NULL,
+    first_name VARCHAR NOT NULL,
+    last_name VARCHAR NOT NULL,
+    date_of_birth DATE NOT NULL,
+    gender VARCHAR NOT NULL,
+    pronouns VARCHAR NOT NULL,
+    email_address VARCHAR NOT NULL,
+    phone_number VARCHAR NOT NULL,
+    address VARCHAR NOT NULL,
+    hash VARCHAR NOT NULL,
+    license_number VARCHAR NOT NULL,
+    hiring_date DATE NOT NULL,
+    years_of_experience INTEGER NOT NULL,
+    void_cheque VARCHAR NOT NULL,
+    status_of_work VARCHAR(8) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (email_address)
+);
+CREATE TABLE allergy (
+    id INTEGER NOT NULL,
+    allergy_name VARCHAR NOT NULL,
+    severeness VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE emergencycontact (
+    id INTEGER NOT NULL,
+    contact_first_name VARCHAR NOT NULL,
+    contact_last_name VARCHAR NOT NULL,
+    contact_number INTEGER NOT NULL,
+    contact_email VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE medication (
+    id INTEGER NOT NULL,
+    medication_name VARCHAR NOT NULL,
+    dosage VARCHAR NOT NULL,
+    frequency VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE inventoryreceipt (
+    id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    store_name VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE specialization (
+    id INTEGER NOT NULL,
+    "specializationType" VARCHAR NOT NULL,
+    years_of_experience INTEGER NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE inventoryproduct (
+    id INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    quantity INTEGER NOT NULL,
+    supplier VARCHAR NOT NULL,
+    price INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE TABLE client (
+    id INTEGER NOT NULL,
+    first_name VARCHAR NOT NULL,
+    last_name VARCHAR NOT NULL,
+    date_of_birth DATE NOT NULL,
+    gender VARCHAR NOT NULL,
+    pronouns VARCHAR NOT NULL,
+    email_address VARCHAR NOT NULL,
+    phone_number VARCHAR NOT NULL,
+    address VARCHAR NOT NULL,
+    hash VARCHAR NOT NULL,
+    emergency_contact_id INTEGER,
+    PRIMARY KEY (id),
+    UNIQUE (email_address),
+    FOREIGN KEY(emergency_contact_id) REFERENCES emergencycontact (id)
+);
+CREATE TABLE scheduleblock (
+    id INTEGER NOT NULL,
+    therapist_id INTEGER,
+    start_datetime DATETIME NOT NULL,
+    end_datetime DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(therapist_id) REFERENCES therapist (id)
+);
+CREATE TABLE inventoryreceiptitem (
+    id INTEGER NOT NULL,
+    receipt_id INTEGER,
+    name VARCHAR NOT NULL,
+    count INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    supplier_name VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(receipt_id) REFERENCES inventoryreceipt (id)
+);
+CREATE TABLE appointment (
+    schedule_block_id INTEGER NOT NULL,
+    client_id INTEGER,
+    appointment_status VARCHAR(9) NOT NULL,
+    PRIMARY KEY (schedule_block_id),
+    FOREIGN KEY(schedule_block_id) REFERENCES scheduleblock (id),
+    FOREIGN KEY(client_id) REFERENCES client (id)
+);
+CREATE TABLE patientfile (
+    client_id INTEGER NOT NULL,
+    primary_therapist_id INTEGER,
+    admission_date DATETIME NOT NULL,
+    insurance_number VARCHAR NOT NULL,
+    blood_type VARCHAR NOT NULL,
+    is_active BOOLEAN NOT NULL,
+    discharge_date DATETIME,
+    PRIMARY KEY (client_id),
+    FOREIGN KEY(client_id) REFERENCES client (id),
+    FOREIGN KEY(primary_therapist_id) REFERENCES therapist (id)
+);
+CREATE TABLE medicalchart (
+    id INTEGER NOT NULL,
+    client_id INTEGER,
+    date DATETIME NOT NULL,
+    note VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(client_id) REFERENCES patientfile (client_id)
+);
+CREATE TABLE medicaldocument (
+    id INTEGER NOT NULL,
+    client_id INTEGER,
+    date DATETIME NOT NULL,
+    hospital_name VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(client_id) REFERENCES patientfile (client_id)
+);
+CREATE TABLE patientfileallergylink (
+    client_id INTEGER NOT NULL,
+    allergy_id INTEGER NOT NULL,
+    PRIMARY KEY (client_id, allergy_id),
+    FOREIGN KEY(client_id) REFERENCES patientfile (client_id),
+    FOREIGN KEY(allergy_id) REFERENCES allergy (id)
+);
+CREATE TABLE patientfilemedicationlink (
+    client_id INTEGER NOT NULL,
+    medication_id INTEGER NOT NULL,
+    PRIMARY KEY (client_id, medication_id),
+    FOREIGN KEY(client_id) REFERENCES patientfile (client_id),
+    FOREIGN KEY(medication_id) REFERENCES medication (id)
+)
+"""
+
+HOT_QUERIES = {
+    "schedule": Schedule.query(1, date(2024, 6, 9), weeks=1),
+    "availability": AvailabilityRule.query(1, date(2024, 6, 9), date(2024, 6, 16)),
+    "client_appointments": select(Appointment).where(Appointment.client_id == 1),
+    "client_upcoming_appointments": Appointment.query(
+        client_id=1, start=datetime(2024, 6, 9)
+    ),
+    "therapist_pending_appointments": Appointment.query(
+        therapist_id=1,
+        start=datetime(2024, 6, 9),
+        statuses=[AppointmentStatus.pending],
+        after=(datetime(2024, 6, 10), 1),
+    ),
+    "pending_therapists": select(Therapist).where(
+        Therapist.status_of_work == StatusOfWork.pending
+    ),
+    "receipts_by_date": select(InventoryReceipt).where(
+        InventoryReceipt.date >= date(2024, 1, 1),
+        InventoryReceipt.date < date(2024, 2, 1),
+    ),
+    "therapist_patient_files": select(PatientFile).where(
+        PatientFile.primary_therapist_id == 1
+    ),
+    "chart_timeline": timeline_query(
+        MedicalChart, "chart", 1, (datetime(2024, 6, 9), "document", 1)
+    ),
+    "document_timeline": timeline_query(
+        MedicalDocument, "document", 1, (datetime(2024, 6, 9), "document", 1)
+    ),
+    "login": select(Client).where(Client.email_address == "foo.bar@example.com"),
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'renova.db'}")
+
+
+def test_fresh_database_is_stamped(engine):
+    assert migrate(engine) == max(MIGRATIONS)
+    assert migrate(engine) == max(MIGRATIONS)
+    indexes = {i["name"] for i in inspect(engine).get_indexes("scheduleblock")}
+    assert "ix_scheduleblock_therapist_id_start_datetime" in indexes
+
+
+def test_legacy_database_is_migrated(engine):
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA.split(";"):
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO therapist VALUES (1, 'Ada', 'Lovelace', '1990-01-01',"
+            " 'female', 'she/her', 'ada@example.com', '5145550000', '1 Main St',"
+            " 'x', '123', '2020-01-01', 3, '000', 'FULLTIME')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO scheduleblock VALUES"
+            " (1, 1, '2024-06-10 09:00:00', '2024-06-10 10:00:00')"
+        )
+
+    assert migrate(engine) == max(MIGRATIONS)
+    inspector = inspect(engine)
+    columns = {
+        table: {c["name"] for c in inspector.get_columns(table)}
+        for table in ("therapist", "scheduleblock", "medicaldocument")
+    }
+    assert "schedule_version" in columns["therapist"]
+    assert "version" in columns["scheduleblock"]
+    assert {"content_hash", "size", "mime_type"} <= columns["medicaldocument"]
+    indexes = {i["name"] for i in inspector.get_indexes("appointment")}
+    assert "ix_appointment_client_id" in indexes
+    indexes = {i["name"] for i in inspector.get_indexes("scheduleblock")}
+    assert "ix_scheduleblock_therapist_id_start_datetime" in indexes
+    assert {"availabilityrule", "dailyspend"} <= set(inspector.get_table_names())
+    with engine.connect() as connection:
+        versions = connection.execute(text("SELECT version FROM schema_version"))
+        assert [v for (v,) in versions] == sorted(MIGRATIONS)
+        row = connection.execute(
+            text(
+                "SELECT s.version, t.schedule_version FROM scheduleblock s"
+                " JOIN therapist t ON t.id = s.therapist_id"
+            )
+        ).one()
+        assert tuple(row) == (0, 0)
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_queries_use_indexes(engine, name):
+    migrate(engine)
+    with engine.connect() as connection:
+        plan = query_plan(connection, HOT_QUERIES[name])
+    assert plan
+    assert not [step for step in plan if step.startswith("SCAN")], plan
@@ -0,0 +1,350 @@
+from datetime import date, datetime, timedelta
+
+from sqlmodel import select
+
+from renova.etags import BUILD, build_id, make_etag
+from renova.models.appointments import (
+    Appointment,
+    AppointmentStatus,
+    AvailabilityRule,
+    ScheduleBlock,
+    start_of_week,
+)
+from renova.models.clients import Client
+from renova.models.therapists import Therapist
+
+
+def test_home_and_booking_pages(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    today = date.today()
+    start = datetime.combine(
+        today - timedelta((today.weekday() + 1) % 7), datetime.min.time()
+    ) + timedelta(days=1, hours=10)
+    block = ScheduleBlock(
+        therapist=therapist, start_datetime=start, end_datetime=start + timedelta(hours=1)
+    )
+    session.add(Appointment(schedule_block=block, client=client))
+    session.commit()
+
+    http = client_for(client)
+    home = http.get("/home")
+    assert home.status_code == 200
+    assert "thera pist" in home.text
+
+    booking = http.get(f"/booking/{therapist.id}")
+    assert booking.status_code == 200
+    assert f'hx-delete="/appointments/{block.id}"' in booking.text
+
+    assert http.get("/booking/999").status_code == 404
+
+
+def test_home_pages_upcoming_and_past_appointments(
+    login_ctx, query_budget, make_user, client_for
+):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    # Blocks start half an hour off the hour from now, whatever the time.
+    now = datetime.now()
+    blocks = {}
+    for hours in range(-30, 30):
+        block = ScheduleBlock(
+            therapist=therapist,
+            start_datetime=now + timedelta(hours=hours, minutes=30),
+            end_datetime=now + timedelta(hours=hours + 1, minutes=30),
+        )
+        session.add(Appointment(schedule_block=block, client=client))
+        blocks[hours] = block
+    session.commit()
+    ids = {hours: block.id for hours, block in blocks.items()}
+    http = client_for(client)
+
+    with query_budget(3):
+        home = http.get("/home").text
+    upcoming, past = home.split("Past appointments")
+    assert upcoming.count("hx-delete=") == 12 and past.count("hx-delete=") == 0
+    assert f"/home/appointments/{ids[0]}" in upcoming
+    assert f"/home/appointments/{ids[12]}" not in upcoming
+    assert past.count("thera pist") == 12
+
+    seen = []
+    url = "/home/appointments?when=upcoming"
+    while url:
+        with query_budget(2):
+            page = http.get(url)
+        assert page.status_code == 200
+        seen += [
+            int(line.split("/home/appointments/")[1].split('"')[0])
+            for line in page.text.splitlines()
+            if "hx-delete=" in line
+        ]
+        more = [line for line in page.text.splitlines() if "hx-get=" in line]
+        url = (
+            more[0].split('hx-get="')[1].split('"')[0].replace("&amp;", "&")
+            if more
+            else None
+        )
+    assert seen == [ids[hours] for hours in range(0, 30)]
+
+    assert http.get("/home/appointments?when=past&after=nope").status_code == 400
+
+    response = http.delete(f"/home/appointments/{ids[5]}")
+    assert (response.status_code, response.text) == (200, "")
+    assert http.delete(f"/home/appointments/{ids[5]}").status_code == 404
+    assert session.get(ScheduleBlock, ids[5]).appointment is None
+
+
+def test_dashboard_page(login_ctx, make_user, client_for):
+    therapist, client = make_user(login_ctx.session, Therapist), make_user(
+        login_ctx.session, Client
+    )
+    assert client_for(therapist).get("/dashboard").status_code == 200
+    assert client_for(client).get("/dashboard").status_code == 403
+
+
+def test_schedule_batch(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    week = date(2025, 1, 5)
+    start = datetime(2025, 1, 6, 10)
+    booked = ScheduleBlock(
+        therapist=therapist,
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=1),
+    )
+    free = ScheduleBlock(
+        therapist=therapist,
+        start_datetime=start + timedelta(hours=2),
+        end_datetime=start + timedelta(hours=3),
+    )
+    session.add_all([booked, free, Appointment(schedule_block=booked, client=client)])
+    session.commit()
+    booked_id, free_id = booked.id, free.id
+
+    http = client_for(therapist)
+    response = http.post(
+        "/schedule/batch",
+        json={
+            "week": week.isoformat(),
+            "operations": [
+                {"op": "create", "weekday": 2, "hour": 9},
+                {"op": "create", "weekday": 1, "hour": 12},
+                {"op": "delete", "schedule_block_id": free_id},
+                {"op": "confirm", "schedule_block_id": booked_id},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    assert response.text.count('hx-swap-oob="true"') == 3
+    assert 'id="cell-1-10"' in response.text and "bg-green-300" in response.text
+
+    session.expire_all()
+    blocks = session.exec(
+        select(ScheduleBlock).where(ScheduleBlock.therapist_id == therapist.id)
+    ).all()
+    assert sorted(b.start_datetime for b in blocks) == [
+        start,
+        start + timedelta(hours=2),
+        datetime(2025, 1, 7, 9),
+    ]
+
+    # The whole batch is rejected when any operation conflicts.
+    conflict = http.post(
+        "/schedule/batch",
+        json={
+            "week": week.isoformat(),
+            "operations": [
+                {"op": "create", "weekday": 3, "hour": 9},
+                {"op": "delete", "schedule_block_id": booked_id},
+            ],
+        },
+    )
+    assert conflict.status_code == 409
+    overlap = http.post(
+        "/schedule/batch",
+        json={
+            "week": week.isoformat(),
+            "operations": [{"op": "create", "weekday": 1, "hour": 10}],
+        },
+    )
+    assert overlap.status_code == 409
+    assert len(session.exec(select(ScheduleBlock)).all()) == 3
+
+
+def test_schedule_blocks_of_other_therapists_are_not_found(
+    login_ctx, make_user, client_for
+):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    other = make_user(session, Therapist, email_address="other@example.com")
+    start = datetime(2025, 1, 6, 10)
+    booked = ScheduleBlock(
+        therapist=therapist,
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=1),
+    )
+    session.add(Appointment(schedule_block=booked, client=client))
+    session.commit()
+    block_id, version = booked.id, therapist.schedule_version
+    cell = {"weekday": 1, "hour": 10}
+
+    http = client_for(other)
+    assert http.delete(f"/schedule/{block_id}", params=cell).status_code == 404
+    assert http.put(f"/schedule/{block_id}/confirm", data=cell).status_code == 404
+    assert http.delete("/schedule/0", params=cell).status_code == 404
+    session.expire_all()
+    assert session.get(ScheduleBlock, block_id).appointment.appointment_status == (
+        AppointmentStatus.pending
+    )
+    assert session.get(Therapist, other.id).schedule_version == 0
+
+    http = client_for(therapist)
+    assert http.put(f"/schedule/{block_id}/confirm", data=cell).status_code == 200
+    session.expire_all()
+    assert session.get(Therapist, therapist.id).schedule_version == version + 1
+
+
+def test_booking_a_slot_from_availability_rules(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    week = start_of_week()
+    session.add(
+        AvailabilityRule(
+            therapist_id=therapist.id,
+            weekday=2,
+            start_hour=9,
+            end_hour=17,
+            valid_from=week,
+        )
+    )
+    session.commit()
+    # Next week's, so that the slot is never in the past.
+    start = datetime.combine(week, datetime.min.time()) + timedelta(days=9, hours=9)
+
+    http = client_for(client)
+    booking = http.get(f"/booking/{therapist.id}")
+    assert booking.status_code == 200
+    assert booking.text.count(f'hx-post="/booking/{therapist.id}/slots"') == 8
+
+    form = {"start": start.isoformat(), "weekday": 2, "hour": 9}
+    response = http.post(f"/booking/{therapist.id}/slots", data=form)
+    assert response.status_code == 200
+    assert "hx-delete" in response.text
+    block_id = session.exec(select(ScheduleBlock.id)).one()
+    assert http.post(f"/booking/{therapist.id}/slots", data=form).status_code == 409
+    outside = {**form, "start": (start - timedelta(hours=1)).isoformat()}
+    assert http.post(f"/booking/{therapist.id}/slots", data=outside).status_code == 404
+
+    past = {**form, "start": (start - timedelta(weeks=2)).isoformat()}
+    assert http.post(f"/booking/{therapist.id}/slots", data=past).status_code == 422
+
+    # A concurrent booking of the block this request is about to create: the
+    # block is rolled back along with the failed booking.
+    taken = start + timedelta(hours=1)
+    session.add(Appointment(schedule_block_id=block_id + 1, client_id=client.id))
+    session.commit()
+    form = {**form, "start": taken.isoformat()}
+    assert http.post(f"/booking/{therapist.id}/slots", data=form).status_code == 409
+
+    session.expire_all()
+    (block,) = session.exec(select(ScheduleBlock)).all()
+    assert block.start_datetime == start
+    assert block.appointment.client_id == client.id
+
+
+def test_therapist_manages_availability_rules(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    http = client_for(therapist)
+    response = http.post(
+        "/availability",
+        data={
+            "weekdays": [1, 2, 3, 4, 5],
+            "start_hour": 9,
+            "end_hour": 17,
+            "valid_from": "2025-01-01",
+            "valid_until": "",
+        },
+    )
+    assert response.status_code == 200
+    assert response.text.count('hx-delete="/availability/') == 5
+
+    rules = session.exec(select(AvailabilityRule)).all()
+    assert {rule.weekday for rule in rules} == {1, 2, 3, 4, 5}
+    assert all(rule.valid_until is None for rule in rules)
+    response = http.delete(f"/availability/{rules[0].id}")
+    assert response.text.count('hx-delete="/availability/') == 4
+
+
+def test_schedule_pages_answer_304_until_the_schedule_changes(
+    login_ctx, make_user, client_for
+):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    start = datetime.combine(start_of_week(), datetime.min.time()) + timedelta(
+        days=1, hours=10
+    )
+    block = ScheduleBlock(
+        therapist=therapist, start_datetime=start, end_datetime=start + timedelta(1)
+    )
+    session.add(block)
+    session.commit()
+    block_id = block.id
+
+    dashboard = client_for(therapist)
+    booking = client_for(client)
+    pages = [(dashboard, "/dashboard"), (booking, f"/booking/{therapist.id}")]
+    etags = []
+    for http, url in pages:
+        first = http.get(url)
+        etag = first.headers["ETag"]
+        revisit = http.get(url, headers={"If-None-Match": etag})
+        assert revisit.status_code == 304
+        assert revisit.content == b""
+        etags.append(etag)
+
+    response = booking.put(f"/appointments/{block_id}", data={"weekday": 1, "hour": 10})
+    assert response.status_code == 200
+    for (http, url), etag in zip(pages, etags):
+        changed = http.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+
+def test_etags_change_with_the_build(tmp_path):
+    (tmp_path / "pages").mkdir()
+    page = tmp_path / "pages" / "home.html"
+    page.write_text("<p>v1</p>")
+    before = build_id("1.0", tmp_path)
+    assert build_id("1.0", tmp_path) == before
+    assert build_id("1.1", tmp_path) != before
+    page.write_text("<p>v2</p>")
+    assert build_id("1.0", tmp_path) != before
+    assert make_etag("dashboard", 1).startswith(f'W/"{BUILD}-')
+
+
+def test_pages_stay_within_query_budgets(
+    login_ctx, query_budget, make_user, client_for
+):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    week = datetime.combine(start_of_week(), datetime.min.time())
+    for day in range(1, 6):
+        block = ScheduleBlock(
+            therapist=therapist,
+            start_datetime=week + timedelta(days=day, hours=10),
+            end_datetime=week + timedelta(days=day, hours=11),
+        )
+        if day % 2:
+            session.add(Appointment(schedule_block=block, client=client))
+        session.add(block)
+    session.commit()
+    therapist_http, client_http = client_for(therapist), client_for(client)
+
+    # None of the budgets depend on the number of appointments.
+    with query_budget(3):
+        assert client_http.get("/home").status_code == 200
+    with query_budget(4):
+        assert therapist_http.get("/dashboard").status_code == 200
+    with query_budget(4):
+        assert client_http.get(f"/booking/{therapist.id}").status_code == 200
@@ -1,9 +1,18 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
+import pytest
+from sqlalchemy.exc import InvalidRequestError
 from sqlmodel import select
 
+from renova.credentials import Credential
+from renova.main.therapist import TherapistContext
 from renova.models.clients import Client
-from renova.models.patient_files import PatientFile
+from renova.models.patient_files import (
+    MedicalChart,
+    MedicalDocument,
+    PatientFile,
+    parse_timeline_key,
+)
 from renova.models.therapists import StatusOfWork, Therapist
 
 
@@ -57,3 +66,93 @@ def test_get_patient_files(login_ctx):
     ).all()
 
     assert all(f.primary_therapist == therapist for f in patient_files)
+
+
+def make_patient_file(session, therapist, client, charts, documents):
+    start = datetime(2020, 1, 1)
+    session.add(
+        PatientFile(
+            admission_date=start,
+            insurance_number="000000000",
+            blood_type="o",
+            is_active=True,
+            discharge_date=None,
+            client=client,
+            primary_therapist=therapist,
+        )
+    )
+    session.flush()
+    # Every third chart shares its date with a document, to exercise ties.
+    session.add_all(
+        MedicalChart(
+            client_id=client.id, date=start + timedelta(days=i), note=f"note {i}"
+        )
+        for i in range(charts)
+    )
+    session.add_all(
+        MedicalDocument(
+            client_id=client.id,
+            date=start + timedelta(days=3 * i),
+            hospital_name=f"hospital {i}",
+        )
+        for i in range(documents)
+    )
+    session.commit()
+
+
+def test_patient_timeline(login_ctx, query_budget, make_user):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    make_patient_file(session, therapist, client, charts=90, documents=30)
+    ctx = TherapistContext(None, session, Credential(id=therapist.id, type="therapist"))
+    ctx.therapist
+    client_id = client.id
+    session.expunge_all()
+
+    seen = []
+    after = None
+    while True:
+        with query_budget(3):
+            timeline = ctx.get_timeline(client_id, after, size=7)
+        seen += [entry.key for entry in timeline.entries]
+        if timeline.next is None:
+            break
+        after = parse_timeline_key(timeline.next)
+    assert len(seen) == len(set(seen)) == 120
+    assert seen == sorted(seen, reverse=True)
+
+    chart = next(e.record for e in timeline.entries if e.kind == "chart")
+    with pytest.raises(InvalidRequestError):
+        chart.note
+    assert ctx.get_chart(client_id, chart.id).note.startswith("note ")
+    with pytest.raises(InvalidRequestError):
+        ctx.get_patient_file(client_id).medical_charts
+
+
+def test_patient_file_pages(login_ctx, query_budget, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    make_patient_file(session, therapist, client, charts=30, documents=5)
+    http = client_for(therapist)
+
+    page = http.get(f"/clients/{client.id}/patient_file")
+    assert page.status_code == 200
+    assert "cli ent" in page.text and f"/clients/{client.id}/timeline" in page.text
+
+    with query_budget(4):
+        first = http.get(f"/clients/{client.id}/timeline")
+    assert first.text.count("<li") == 21 and 'hx-trigger="revealed"' in first.text
+    more = first.text.split('hx-get="')[-1].split('"')[0].replace("&amp;", "&")
+    with query_budget(4):
+        rest = http.get(more)
+    assert rest.text.count("<li") == 15 and "revealed" not in rest.text
+    assert "document from hospital 0" in rest.text
+
+    chart_id = first.text.split("/charts/")[1].split('"')[0]
+    note = http.get(f"/clients/{client.id}/charts/{chart_id}")
+    assert note.text.startswith('<p class="whitespace-pre-line">note ')
+    assert http.get(f"/clients/{client.id}/timeline?after=junk").status_code == 400
+    assert http.get("/clients/0/timeline").status_code == 404
+
+    other = make_user(session, Therapist, email_address="other@example.com")
+    assert client_for(other).get(f"/clients/{client.id}/timeline").status_code == 403
@@ -0,0 +1,55 @@
+from datetime import date
+
+from sqlmodel import select
+
+from renova.main.admin import OwnerContext
+from renova.models.products import InventoryProduct
+from renova.models.receipts import InventoryReceiptItem
+from renova.models.rollups import DailySpend, DailyStock, rebuild_rollups
+
+
+def test_rollups_follow_receipts_and_adjustments(login_ctx):
+    session = login_ctx.session
+    ctx = OwnerContext(None, session, None)
+    ctx.add_product("gauze", 0, "a", 2)
+    for day, count in [
+        (date(2024, 2, 1), 3),
+        (date(2024, 2, 1), 4),
+        (date(2024, 2, 3), 1),
+    ]:
+        ctx.record_receipt(
+            day,
+            "store",
+            [
+                InventoryReceiptItem(
+                    name="gauze", count=count, price=2, supplier_name="a"
+                )
+            ],
+        )
+    ctx.adjust_product_quantity("gauze", -2)
+
+    assert [
+        tuple(row) for row in ctx.get_daily_spend(date(2024, 2, 1), date(2024, 2, 3))
+    ] == [(date(2024, 2, 1), 7, 14)]
+    assert [
+        (m.day, m.received, m.adjusted)
+        for m in ctx.get_stock_movements(date(2024, 1, 1), date.max, "gauze")
+    ] == [
+        (date(2024, 2, 1), 7, 0),
+        (date(2024, 2, 3), 1, 0),
+        (date.today(), 0, -2),
+    ]
+    assert session.exec(select(InventoryProduct.quantity)).one() == -2
+
+    before = (
+        session.exec(select(DailySpend)).all(),
+        session.exec(select(DailyStock)).all(),
+    )
+    before = [[m.model_dump() for m in rows] for rows in before]
+    rebuild_rollups(session.connection())
+    session.expire_all()
+    after = (
+        session.exec(select(DailySpend)).all(),
+        session.exec(select(DailyStock)).all(),
+    )
+    assert [[m.model_dump() for m in rows] for rows in after] == before
@@ -0,0 +1,89 @@
+import tempfile
+from datetime import date, datetime
+
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+
+from renova.hashing import verify_password
+from renova.migrations import migrate
+from renova.models import (
+    Appointment,
+    AppointmentStatus,
+    Client,
+    DailySpend,
+    InventoryReceiptItem,
+    MedicalChart,
+    PatientFile,
+    ScheduleBlock,
+)
+from renova.seed import SeedConfig, seed
+
+CONFIG = SeedConfig(
+    today=date(2024, 6, 12),
+    therapists=3,
+    clients=40,
+    weeks=2,
+    products=10,
+    receipts=20,
+    batch_size=7,
+)
+
+
+def dump(engine) -> list:
+    with Session(engine) as session:
+        # Everything but the password hash, which is salted.
+        return [
+            row.model_dump(exclude={"hash"})
+            for model in (Client, ScheduleBlock, Appointment, MedicalChart)
+            for row in session.exec(select(model))
+        ]
+
+
+def test_seed_is_deterministic_and_consistent():
+    with (
+        tempfile.NamedTemporaryFile() as first,
+        tempfile.NamedTemporaryFile() as second,
+    ):
+        engines = [create_engine(f"sqlite:///{f.name}") for f in (first, second)]
+        for engine in engines:
+            migrate(engine)
+        counts = seed(engines[0], CONFIG)
+        assert seed(engines[1], CONFIG) == counts
+        assert dump(engines[0]) == dump(engines[1])
+
+        assert counts["client"] == 40
+        assert 0 < counts["scheduleblock"] <= 3 * 2 * 5 * 8
+        assert 0 < counts["appointment"] < counts["scheduleblock"]
+        assert 0 < counts["patientfile"] <= 40
+        with Session(engines[0]) as session:
+            client = session.exec(select(Client)).first()
+            assert verify_password(client.hash, CONFIG.password)[0]
+            assert session.exec(select(func.count(PatientFile.client_id))).one() == (
+                counts["patientfile"]
+            )
+            spend = session.exec(select(func.sum(DailySpend.spend))).one()
+            items = session.exec(
+                select(
+                    func.sum(InventoryReceiptItem.count * InventoryReceiptItem.price)
+                )
+            ).one()
+            assert spend == items
+
+            # Dates follow ``today``, whatever the clock says: the blocks span
+            # the week before and the week of June 12th, 2024.
+            starts = session.exec(select(ScheduleBlock.start_datetime)).all()
+            assert (
+                datetime(2024, 6, 3) < min(starts) < max(starts) < datetime(2024, 6, 15)
+            )
+            pending = session.exec(
+                select(ScheduleBlock.start_datetime)
+                .join(Appointment)
+                .where(Appointment.appointment_status == AppointmentStatus.pending)
+            ).all()
+            assert pending and min(pending) >= datetime(2024, 6, 12)
+
+        # Seeding again appends after the existing rows.
+        more = seed(engines[0], CONFIG)
+        assert more["client"] == 40
+        with Session(engines[0]) as session:
+            assert session.exec(select(func.count(Client.id))).one() == 80
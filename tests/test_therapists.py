@@ -0,0 +1,163 @@
+from datetime import date, datetime, timedelta
+
+from renova.credentials import Credential
+from renova.main.client import ClientContext
+from renova.main.therapist import TherapistContext
+from renova.models.appointments import (
+    Appointment,
+    AppointmentStatus,
+    ScheduleBlock,
+    parse_page_key,
+)
+from renova.models.clients import Client
+from renova.models.therapists import Therapist, match_expression
+
+
+def test_match_expression():
+    assert match_expression('jo "sm') == '"jo"* "sm"*'
+    assert match_expression("  --") == ""
+
+
+def test_find_therapists_prefix_and_sync(login_ctx, make_user):
+    session = login_ctx.session
+    jolene, john, other = (
+        make_user(
+            session,
+            Therapist,
+            first_name=first_name,
+            last_name=last_name,
+            email_address=f"{first_name}@example.com",
+        )
+        for first_name, last_name in [
+            ("Jolene", "Smith"),
+            ("John", "Doe"),
+            ("Amélie", "Joly"),
+        ]
+    )
+    ctx = ClientContext(None, session, None)
+
+    assert {t.full_name for t in ctx.find_therapists("jo")} == {
+        "Jolene Smith",
+        "John Doe",
+        "Amélie Joly",
+    }
+    assert [t.full_name for t in ctx.find_therapists("jo smi")] == ["Jolene Smith"]
+    assert [t.full_name for t in ctx.find_therapists("amelie")] == ["Amélie Joly"]
+    assert len(ctx.find_therapists("")) == 3
+    assert ctx.find_therapists(" -- ") == []
+
+    john.last_name = "Zimmer"
+    session.add(john)
+    session.commit()
+    assert [t.full_name for t in ctx.find_therapists("zim")] == ["John Zimmer"]
+    assert ctx.find_therapists("doe") == []
+
+    session.delete(jolene)
+    session.commit()
+    assert ctx.find_therapists("smith") == []
+
+
+def test_therapist_appointment_queries(login_ctx, query_budget, make_user):
+    session = login_ctx.session
+    therapist = make_user(session, Therapist)
+    other = make_user(session, Therapist, email_address="other@example.com")
+    client = make_user(session, Client)
+    today = datetime.combine(date.today(), datetime.min.time())
+    statuses = [
+        AppointmentStatus.pending,
+        AppointmentStatus.confirmed,
+        AppointmentStatus.cancelled,
+    ]
+    for owner in (therapist, other):
+        # Two years of history, a few days ahead and one session every 6 hours.
+        for hours in range(-2 * 365 * 24, 3 * 24, 6):
+            start = today + timedelta(hours=hours + 1)
+            block = ScheduleBlock(
+                therapist=owner, start_datetime=start, end_datetime=start
+            )
+            session.add(
+                Appointment(
+                    schedule_block=block,
+                    client=client,
+                    appointment_status=statuses[(hours // 6) % 3],
+                )
+            )
+    session.commit()
+    ctx = TherapistContext(None, session, Credential(id=therapist.id, type="therapist"))
+    ctx.therapist
+    session.expunge_all()
+
+    with query_budget(1):
+        todays = ctx.get_todays_appointments()
+        assert [a.schedule_block.start_datetime.hour for a in todays] == [1, 7, 19]
+        assert {a.client.full_name for a in todays} == {"cli ent"}
+
+    seen = []
+    page = ctx.get_pending_appointments()
+    while True:
+        assert all(
+            a.appointment_status == AppointmentStatus.pending
+            and a.schedule_block.therapist_id == therapist.id
+            and a.schedule_block.start_datetime >= datetime.now()
+            for a in page.appointments
+        )
+        seen += [a.schedule_block.start_datetime for a in page.appointments]
+        if page.next is None:
+            break
+        with query_budget(1):
+            page = ctx.get_pending_appointments(parse_page_key(page.next))
+    assert seen == sorted(seen) and 0 < len(seen) <= 4
+
+    page = ctx.get_appointments(
+        today - timedelta(days=30),
+        today,
+        [AppointmentStatus.confirmed],
+        latest_first=True,
+        size=7,
+    )
+    starts = [a.schedule_block.start_datetime for a in page.appointments]
+    assert len(starts) == 7 and starts == sorted(starts, reverse=True)
+    assert starts[0] == today - timedelta(hours=11)
+    rest = ctx.get_appointments(
+        today - timedelta(days=30),
+        today,
+        [AppointmentStatus.confirmed],
+        latest_first=True,
+        after=parse_page_key(page.next),
+        size=1000,
+    )
+    assert rest.next is None
+    assert len(starts) + len(rest.appointments) == 40
+    assert rest.appointments[0].schedule_block.start_datetime < starts[-1]
+
+
+def test_dashboard_appointment_views(login_ctx, make_user, client_for):
+    session = login_ctx.session
+    therapist, client = make_user(session, Therapist), make_user(session, Client)
+    start = datetime.combine(date.today(), datetime.min.time()) + timedelta(days=1)
+    for hour in range(25):
+        block = ScheduleBlock(
+            therapist=therapist,
+            start_datetime=start + timedelta(hours=hour),
+            end_datetime=start + timedelta(hours=hour + 1),
+        )
+        session.add(Appointment(schedule_block=block, client=client))
+    session.commit()
+    http = client_for(therapist)
+
+    pending = http.get("/dashboard/appointments?view=pending")
+    assert pending.status_code == 200
+    assert "Waiting for confirmation" in pending.text
+    assert pending.text.count("cli ent") == 20
+    more = pending.text.split('hx-get="')[1].split('"')[0].replace("&amp;", "&")
+    rest = http.get(more)
+    assert rest.text.count("cli ent") == 5 and "<ul" not in rest.text
+
+    today = http.get("/dashboard/appointments?view=today")
+    assert "No appointments." in today.text
+    filtered = http.get(
+        "/dashboard/appointments",
+        params={"start": start.date().isoformat(), "status": "CONFIRMED"},
+    )
+    assert "No appointments." in filtered.text
+    assert client_for(client).get("/dashboard/appointments").status_code == 403